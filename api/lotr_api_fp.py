@@ -1,97 +1,1620 @@
-from asyncio.log import logger
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
 from functools import partial
+import contextvars
 import json
-from typing import Callable, Union
-import aiohttp
-import requests
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Deque, Dict, Iterator, List, Sequence, Union
+
+import api.lotr_cache_fp as lotr_cache_fp
+import api.lotr_deadline_fp as lotr_deadline_fp
+import api.lotr_export_fp as lotr_export_fp
+import api.lotr_filter_fp as lotr_filter_fp
+import api.lotr_json_fp as lotr_json_fp
+import api.lotr_keypool_fp as lotr_keypool_fp
+import api.lotr_loader_fp as lotr_loader_fp
+import api.lotr_metrics_fp as lotr_metrics_fp
+import api.lotr_ratelimit_fp as lotr_ratelimit_fp
+import api.lotr_retry_fp as lotr_retry_fp
+import api.lotr_search_fp as lotr_search_fp
+import api.lotr_store_fp as lotr_store_fp
+import api.lotr_sync_fp as lotr_sync_fp
+
+# The transports are imported by the functions using them, on first use: a process only making blocking calls
+# never loads aiohttp, and one only making non-blocking calls never loads requests.
+if TYPE_CHECKING:
+    import aiohttp
+    import requests
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Default base URL for lord of the ring API.
+BASE_URL: str = "https://the-one-api.dev/v2"
+
+# Secondary indexes of the datasets loaded by aio_load_datasets(), by endpoint.
+DATASET_INDEXES: dict = {
+    "movie": {
+        "hash_fields": ("_id",),
+        "sorted_fields": (
+            "runtimeInMinutes",
+            "budgetInMillions",
+            "boxOfficeRevenueInMillions",
+            "academyAwardNominations",
+            "academyAwardWins",
+            "rottenTomatoesScore",
+        ),
+    },
+    "quote": {"hash_fields": ("_id", "movie", "character"), "text_fields": ("dialog",)},
+    "character": {"hash_fields": ("_id",)},
+}
+
+
+def get_headers(api_key: str) -> dict:
+    """
+    get_headrs() return a dictionary bearer http header.
+    Args:
+        api_key (str): [API key]
+
+    Returns:
+        dict: [Dictionary object to be put into the http header for HTTP API calls]
+    """
+    return {"Authorization": f"Bearer {api_key}"}
+
+
+def create_blocking_pool(
+    pool_connections: int = 10, pool_maxsize: int = 10, pool_block: bool = True
+) -> dict:
+    """
+    Create the connection pool settings for a long-lived requests session.
+    The session is opened on the first blocking call and then shared by every thread using the client,
+    so that one client can be handed over to the workers of a ThreadPoolExecutor.
+    With pool_block, a worker waits for a free pooled connection instead of opening a throw-away one,
+    so pool_maxsize should be set to the number of worker threads.
+
+    Args:
+        pool_connections (int): [Number of hosts to keep a connection pool for]
+        pool_maxsize (int): [Max number of connections kept alive per host]
+        pool_block (bool): [Wait for a free connection when the pool is exhausted]
+
+    Returns:
+        dict: [Blocking pool holding the adapter options and the shared session]
+    """
+    return {
+        "adapter_options": {
+            "pool_connections": pool_connections,
+            "pool_maxsize": pool_maxsize,
+            "pool_block": pool_block,
+        },
+        "session": None,
+        "lock": threading.Lock(),
+    }
+
+
+def __acquire_blocking_session__(pool: dict) -> requests.Session:
+    """
+    Return the shared requests session of the pool, opening it on first use.
+    The creation is guarded by the pool lock so that concurrent threads end up with the same session.
+
+    Args:
+        pool (dict): [Blocking pool created by create_blocking_pool()]
+
+    Returns:
+        requests.Session: [Shared session of the pool]
+    """
+    session: requests.Session = pool["session"]
+    if session is not None:
+        return session
+    with pool["lock"]:
+        if pool["session"] is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter: HTTPAdapter = HTTPAdapter(**pool["adapter_options"])
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            pool["session"] = session
+        return pool["session"]
+
+
+def close_blocking_pool(pool: dict) -> None:
+    """
+    Close the shared requests session of the pool and release all its connections.
+    The pool can still be used afterwards; a new session would be opened on the next call.
+
+    Args:
+        pool (dict): [Blocking pool created by create_blocking_pool()]
+    """
+    with pool["lock"]:
+        session: requests.Session = pool["session"]
+        pool["session"] = None
+    if session is not None:
+        session.close()
+    return
+
+
+def fetch_response(
+    endpoint: str,
+    api_key: str,
+    id: str,
+    query: str,
+    filter: str,
+    base_url: str = BASE_URL,
+    session: requests.Session = None,
+    headers: dict = None,
+    validators: dict = None,
+    timeout: dict = None,
+    decoder: Callable = None,
+    trace: dict = None,
+) -> dict:
+    """
+    Blocking I/O for HTTP GET request, keeping the status and the headers of the response.
+    requests has no total timeout, so the read timeout is capped by the total one.
+
+    Args:
+        endpoint (str): [path to the API function call]
+        api_key (str): [API key]
+        id (str): [Search for a specific ID. E.g. movie ID or Quote ID]
+        query (str): [Additional sub-path for the API. E.g. /movie/{id}/quote]
+        filter (str): [Filtering of the result.]
+        base_url (str): [Base URL of the API gateway server]
+        session (requests.Session): [Shared session to reuse. A one-off connection is made if None]
+        headers (dict): [Prebuilt HTTP headers. Built from the api_key if None]
+        validators (dict): [Conditional request headers. E.g. {"If-None-Match": etag}]
+        timeout (dict): [Timeouts created by lotr_deadline_fp.create_timeout(), cut down to the current deadline. No timeout if None]
+        decoder (Callable): [JSON decoder of the body. lotr_json_fp.DEFAULT_DECODER (orjson when installed) if None]
+        trace (dict): [Filled with the time to the headers ("ttfb") and the bytes received. Not traced if None]
+
+    Returns:
+        dict: [{"status": HTTP status, "headers": response headers, "data": JSON response, None if not modified}]
+    """
+    import requests
+
+    # url:str = f"{BASE_URL}/{endpoint}"
+    url: str = __composeUrl__(
+        endpoint=endpoint, id=id, query=query, filter=filter, base_url=base_url
+    )
+    if headers is None:
+        headers = get_headers(api_key=api_key)
+    if validators:
+        headers = {**headers, **validators}
+    limits: dict = lotr_deadline_fp.request_timeout(timeout)
+    read: float = min(
+        (value for value in (limits["read"], limits["total"]) if value is not None), default=None
+    )
+    get: Callable = requests.get if session is None else session.get
+    response: requests.Response = get(url, headers=headers, timeout=(limits["connect"], read))
+    if trace is not None:
+        # requests has no connection hooks: its elapsed time runs from sending until the headers are read.
+        trace["ttfb"] = response.elapsed.total_seconds()
+        trace["bytes"] = len(response.content)
+    return {
+        "status": response.status_code,
+        "headers": response.headers,
+        "data": None if response.status_code == 304 else __decode_body__(response, decoder),
+    }
+
+
+def __decode_body__(response: requests.Response, decoder: Callable = None) -> json:
+    """
+    Decode the JSON body of a blocking response from its bytes, failing like requests.Response.json() does.
+    """
+    try:
+        return lotr_json_fp.loads(response.content, decoder)
+    except ValueError as error:
+        import requests
+
+        raise requests.exceptions.JSONDecodeError(str(error), response.text, 0) from error
+
+
+def fetch_data(
+    endpoint: str,
+    api_key: str,
+    id: str,
+    query: str,
+    filter: str,
+    base_url: str = BASE_URL,
+    session: requests.Session = None,
+    headers: dict = None,
+    retry: dict = None,
+    decoder: Callable = None,
+) -> json:
+    """
+    Blocking I/O for HTTP GET request.
+
+    Args:
+        endpoint (str): [path to the API function call]
+        api_key (str): [API key]
+        id (str): [Search for a specific ID. E.g. movie ID or Quote ID]
+        query (str): [Additional sub-path for the API. E.g. /movie/{id}/quote]
+        filter (str): [Filtering of the result.]
+        base_url (str): [Base URL of the API gateway server]
+        session (requests.Session): [Shared session to reuse. A one-off connection is made if None]
+        headers (dict): [Prebuilt HTTP headers. Built from the api_key if None]
+        retry (dict): [Retry policy created by lotr_retry_fp.create_retry_policy(). No retry if None]
+        decoder (Callable): [JSON decoder of the body. lotr_json_fp.DEFAULT_DECODER (orjson when installed) if None]
+
+    Returns:
+        json: [JSON response from the API call]
+    """
+    fetch: Callable = (
+        fetch_response if retry is None else __blocking_resilient_api_call__(fetch_response, policy=retry)
+    )
+    return fetch(
+        endpoint=endpoint,
+        api_key=api_key,
+        id=id,
+        query=query,
+        filter=filter,
+        base_url=base_url,
+        session=session,
+        headers=headers,
+        decoder=decoder,
+    )["data"]
+
+
+def iter_docs(
+    endpoint: str,
+    api_key: str,
+    id: str,
+    query: str,
+    filter: str,
+    base_url: str = BASE_URL,
+    session: requests.Session = None,
+    headers: dict = None,
+    timeout: dict = None,
+    decoder: Callable = None,
+    chunk_size: int = 65536,
+    envelope: dict = None,
+) -> Iterator[dict]:
+    """
+    Blocking I/O for HTTP GET request, yielding the documents one at a time as the body streams in,
+    instead of decoding the whole body at once. Only the document being read is held in memory.
+    ```
+    for quote in lotr_api_fp.iter_docs(endpoint="quote", api_key=api_key, id=None, query=None, filter="limit=5000"):
+        ...
+    ```
+
+    Args:
+        endpoint (str): [path to the API function call]
+        api_key (str): [API key]
+        id (str): [Search for a specific ID. E.g. movie ID or Quote ID]
+        query (str): [Additional sub-path for the API. E.g. /movie/{id}/quote]
+        filter (str): [Filtering of the result.]
+        base_url (str): [Base URL of the API gateway server]
+        session (requests.Session): [Shared session to reuse. A one-off connection is made if None]
+        headers (dict): [Prebuilt HTTP headers. Built from the api_key if None]
+        timeout (dict): [Timeouts created by lotr_deadline_fp.create_timeout(), cut down to the current deadline. No timeout if None]
+        decoder (Callable): [JSON decoder of each document. lotr_json_fp.DEFAULT_DECODER (orjson when installed) if None]
+        chunk_size (int): [Number of bytes read at once]
+        envelope (dict): [Filled with the other fields of the page (total, pages...) once the body is read]
+
+    Raises:
+        requests.HTTPError: [The response is not a success]
+
+    Yields:
+        dict: [documents]
+    """
+    import requests
+
+    url: str = __composeUrl__(
+        endpoint=endpoint, id=id, query=query, filter=filter, base_url=base_url
+    )
+    if headers is None:
+        headers = get_headers(api_key=api_key)
+    limits: dict = lotr_deadline_fp.request_timeout(timeout)
+    read: float = min(
+        (value for value in (limits["read"], limits["total"]) if value is not None), default=None
+    )
+    get: Callable = requests.get if session is None else session.get
+    with get(url, headers=headers, timeout=(limits["connect"], read), stream=True) as response:
+        response.raise_for_status()
+        parser: dict = lotr_json_fp.create_docs_parser(decoder)
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            yield from lotr_json_fp.docs_parser_feed(parser, chunk)
+        fields: dict = lotr_json_fp.docs_parser_close(parser)
+    if envelope is not None:
+        envelope.update(fields)
+    return
+
+
+def __composeUrl__(
+    endpoint: str, id: str, query: str, filter: str, base_url: str = BASE_URL
+) -> str:
+    """
+    Combine all the parameters into a URL for the API call.
+
+    Args:
+        endpoint (str): [path to the API function call]
+        id (str): [Search for a specific ID. E.g. movie ID or Quote ID]
+        query (str): [Additional sub-path for the API. E.g. /movie/{id}/quote]
+        filter (str): [Filtering of the result.]
+        base_url (str): [Base URL of the API gateway server]
+
+    Returns:
+        str: [URL path to the API call]
+    """
+    url: str = f"{base_url}/{endpoint}"
+    if id is not None and not id.isspace():
+        url = url + "/" + id
+    if query is not None and not query.isspace():
+        url = url + "/" + query
+    if filter is not None and not filter.isspace():
+        url = url + "?" + filter
+    return url
+
+
+def create_session_pool(
+    limit: int = 100,
+    limit_per_host: int = 0,
+    ttl_dns_cache: int = 10,
+    keepalive_timeout: float = 15.0,
+    trace_configs: list = None,
+) -> dict:
+    """
+    Create the connection pool settings for a long-lived aiohttp session.
+    The session itself is only opened on the first non-blocking call, inside the running event loop,
+    and then shared by every aio_* function of the client so that connections are kept alive and reused.
+    A session is bound to its event loop: each loop using the pool (e.g. each asyncio.run()) gets its own,
+    closed when that loop shuts down or by aio_close_session_pool().
+
+    Args:
+        limit (int): [Max number of simultaneous connections. 0 means no limit]
+        limit_per_host (int): [Max number of simultaneous connections to the same host. 0 means no limit]
+        ttl_dns_cache (int): [Seconds to cache the resolved DNS entries. None caches forever]
+        keepalive_timeout (float): [Seconds to keep an idle connection open for reuse]
+        trace_configs (list): [aiohttp trace hooks of the session. E.g. [lotr_metrics_fp.create_trace_config()]]
+
+    Returns:
+        dict: [Session pool holding the connector options and the shared session of each event loop]
+    """
+    return {
+        "connector_options": {
+            "limit": limit,
+            "limit_per_host": limit_per_host,
+            "ttl_dns_cache": ttl_dns_cache,
+            "keepalive_timeout": keepalive_timeout,
+        },
+        "trace_configs": trace_configs,
+        "traced": False,
+        # {event loop: (session, guard closing the session when the loop shuts down)}
+        "sessions": {},
+    }
+
+
+async def __close_with_loop__(
+    pool: dict, loop: asyncio.AbstractEventLoop, session: aiohttp.ClientSession
+) -> AsyncIterator[None]:
+    """
+    Guard of a session, started in its event loop. asyncio.run() closes the asynchronous generators
+    still open in its loop before closing the loop, which closes the session while its loop still runs.
+    Otherwise the connections of the session would be left open once its loop is closed.
+    """
+    try:
+        yield
+    finally:
+        if pool["sessions"].get(loop, (None, None))[0] is session:
+            del pool["sessions"][loop]
+        if not session.closed:
+            await session.close()
+
+
+async def __acquire_session__(pool: dict) -> aiohttp.ClientSession:
+    """
+    Return the shared aiohttp session of the pool for the running event loop, opening it on first use.
+    A session is bound to the event loop it was created in, so a new one is opened
+    when the client is used again from another loop (e.g. a second asyncio.run()).
+    The trace hooks timing the requests are added when a client with metrics uses the pool.
+
+    Args:
+        pool (dict): [Session pool created by create_session_pool()]
+
+    Returns:
+        aiohttp.ClientSession: [Shared session of the pool]
+    """
+    import aiohttp
+
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    session, guard = pool["sessions"].get(loop, (None, None))
+    if session is None or session.closed:
+        if guard is not None:
+            await guard.aclose()
+        trace_configs: list = list(pool.get("trace_configs") or ())
+        if pool.get("traced"):
+            trace_configs.append(lotr_metrics_fp.create_trace_config())
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(**pool["connector_options"]),
+            trace_configs=trace_configs or None,
+        )
+        guard = __close_with_loop__(pool, loop, session)
+        # The first step registers the guard with the running loop.
+        await guard.__anext__()
+        pool["sessions"][loop] = (session, guard)
+    return session
+
+
+async def aio_close_session_pool(pool: dict) -> None:
+    """
+    Close the shared aiohttp sessions of the pool and release all their connections.
+    The session of another event loop is closed in that loop if it still runs in another thread;
+    the sessions of the loops already shut down were closed with them.
+    The pool can still be used afterwards; a new session would be opened on the next call.
+
+    Args:
+        pool (dict): [Session pool created by create_session_pool()]
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    sessions: list = list(pool["sessions"].items())
+    pool["sessions"].clear()
+    for session_loop, (session, guard) in sessions:
+        if session_loop is loop:
+            await guard.aclose()
+        elif session_loop.is_running():
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(guard.aclose(), session_loop))
+    return
+
+
+async def aio_fetch_response(
+    endpoint: str,
+    api_key: str,
+    id: str,
+    query: str,
+    filter: str,
+    base_url: str = BASE_URL,
+    session: aiohttp.ClientSession = None,
+    validators: dict = None,
+    timeout: dict = None,
+    decoder: Callable = None,
+    trace: dict = None,
+) -> dict:
+    """
+    Non-blocking I/O for HTTP GET request, keeping the status and the headers of the response.
+
+    Args:
+        endpoint (str): [path to the API function call]
+        api_key (str): [API key]
+        id (str): [Search for a specific ID. E.g. movie ID or Quote ID]
+        query (str): [Additional sub-path for the API. E.g. /movie/{id}/quote]
+        filter (str): [Filtering of the result.]
+        base_url (str): [Base URL of the API gateway server]
+        session (aiohttp.ClientSession): [Shared session to reuse. A one-off session is opened if None]
+        validators (dict): [Conditional request headers. E.g. {"If-None-Match": etag}]
+        timeout (dict): [Timeouts created by lotr_deadline_fp.create_timeout(), cut down to the current deadline. No timeout if None]
+        decoder (Callable): [JSON decoder of the body. lotr_json_fp.DEFAULT_DECODER (orjson when installed) if None]
+        trace (dict): [Filled by the trace hooks of the session, see lotr_metrics_fp.create_trace_config(). Not traced if None]
+
+    Returns:
+        dict: [{"status": HTTP status, "headers": response headers, "data": JSON response, None if not modified}]
+    """
+    import aiohttp
+
+    url: str = __composeUrl__(
+        endpoint=endpoint, id=id, query=query, filter=filter, base_url=base_url
+    )
+
+    logger.debug("Making request to url=%s", url)
+
+    headers: dict = get_headers(api_key=api_key)
+    if validators:
+        headers.update(validators)
+
+    limits: dict = lotr_deadline_fp.request_timeout(timeout)
+    client_timeout: aiohttp.ClientTimeout = aiohttp.ClientTimeout(
+        total=limits["total"], connect=limits["connect"], sock_read=limits["read"]
+    )
+    if session is None:
+        async with aiohttp.ClientSession() as session:
+            return await __aio_read_response__(
+                session=session,
+                url=url,
+                headers=headers,
+                timeout=client_timeout,
+                decoder=decoder,
+                trace=trace,
+            )
+    return await __aio_read_response__(
+        session=session,
+        url=url,
+        headers=headers,
+        timeout=client_timeout,
+        decoder=decoder,
+        trace=trace,
+    )
+
+
+async def __aio_read_response__(
+    session: aiohttp.ClientSession,
+    url: str,
+    headers: dict,
+    timeout: aiohttp.ClientTimeout = None,
+    decoder: Callable = None,
+    trace: dict = None,
+) -> dict:
+    """
+    Send the GET request on the session and read the response envelope.
+    The connection goes back to the pool when the response is read, and is closed if the call is cancelled.
+
+    Args:
+        session (aiohttp.ClientSession): [Session to send the request on]
+        url (str): [URL of the API call]
+        headers (dict): [HTTP headers]
+        timeout (aiohttp.ClientTimeout): [Timeouts of the request. The timeouts of the session if None]
+        decoder (Callable): [JSON decoder of the body. lotr_json_fp.DEFAULT_DECODER if None]
+        trace (dict): [Passed to the trace hooks of the session as trace_request_ctx. Not traced if None]
+
+    Returns:
+        dict: [{"status": HTTP status, "headers": response headers, "data": JSON response, None if not modified}]
+    """
+    options: dict = {} if timeout is None else {"timeout": timeout}
+    if trace is not None:
+        options["trace_request_ctx"] = trace
+    async with session.get(url=url, headers=headers, **options) as response:
+        # return await response.text()
+        return {
+            "status": response.status,
+            "headers": response.headers,
+            "data": None
+            if response.status == 304
+            else await response.json(loads=decoder or lotr_json_fp.DEFAULT_DECODER),
+        }
+
+
+async def aio_fetch_data(
+    endpoint: str,
+    api_key: str,
+    id: str,
+    query: str,
+    filter: str,
+    base_url: str = BASE_URL,
+    session: aiohttp.ClientSession = None,
+    retry: dict = None,
+    decoder: Callable = None,
+) -> json:
+    """
+    Non-blocking I/O for HTTP GET request
+
+    Args:
+        endpoint (str): [path to the API function call]
+        api_key (str): [API key]
+        id (str): [Search for a specific ID. E.g. movie ID or Quote ID]
+        query (str): [Additional sub-path for the API. E.g. /movie/{id}/quote]
+        filter (str): [Filtering of the result.]
+        base_url (str): [Base URL of the API gateway server]
+        session (aiohttp.ClientSession): [Shared session to reuse. A one-off session is opened if None]
+        retry (dict): [Retry policy created by lotr_retry_fp.create_retry_policy(). No retry if None]
+        decoder (Callable): [JSON decoder of the body. lotr_json_fp.DEFAULT_DECODER (orjson when installed) if None]
+
+    Returns:
+        json: [JSON response from the API call]
+    """
+    fetch: Callable = (
+        aio_fetch_response if retry is None else __resilient_api_call__(aio_fetch_response, policy=retry)
+    )
+    response: dict = await fetch(
+        endpoint=endpoint,
+        api_key=api_key,
+        id=id,
+        query=query,
+        filter=filter,
+        base_url=base_url,
+        session=session,
+        decoder=decoder,
+    )
+    return response["data"]
+
+
+async def aio_iter_docs(
+    endpoint: str,
+    api_key: str,
+    id: str,
+    query: str,
+    filter: str,
+    base_url: str = BASE_URL,
+    session: aiohttp.ClientSession = None,
+    timeout: dict = None,
+    decoder: Callable = None,
+    chunk_size: int = 65536,
+    envelope: dict = None,
+) -> AsyncIterator[dict]:
+    """
+    Non-blocking I/O for HTTP GET request, yielding the documents one at a time as the body streams in,
+    instead of decoding the whole body at once. The first documents are usable before the body is complete
+    and only the document being read is held in memory.
+    ```
+    async for quote in lotr_api_fp.aio_iter_docs(endpoint="quote", api_key=api_key, id=None, query=None, filter="limit=5000"):
+        ...
+    ```
+
+    Args:
+        endpoint (str): [path to the API function call]
+        api_key (str): [API key]
+        id (str): [Search for a specific ID. E.g. movie ID or Quote ID]
+        query (str): [Additional sub-path for the API. E.g. /movie/{id}/quote]
+        filter (str): [Filtering of the result.]
+        base_url (str): [Base URL of the API gateway server]
+        session (aiohttp.ClientSession): [Shared session to reuse. A one-off session is opened if None]
+        timeout (dict): [Timeouts created by lotr_deadline_fp.create_timeout(), cut down to the current deadline. No timeout if None]
+        decoder (Callable): [JSON decoder of each document. lotr_json_fp.DEFAULT_DECODER (orjson when installed) if None]
+        chunk_size (int): [Max number of bytes read at once]
+        envelope (dict): [Filled with the other fields of the page (total, pages...) once the body is read]
+
+    Raises:
+        aiohttp.ClientResponseError: [The response is not a success]
+
+    Yields:
+        dict: [documents]
+    """
+    import aiohttp
+
+    if session is None:
+        async with aiohttp.ClientSession() as session:
+            async for doc in aio_iter_docs(
+                endpoint, api_key, id, query, filter, base_url, session, timeout, decoder, chunk_size, envelope
+            ):
+                yield doc
+        return
+    url: str = __composeUrl__(
+        endpoint=endpoint, id=id, query=query, filter=filter, base_url=base_url
+    )
+    limits: dict = lotr_deadline_fp.request_timeout(timeout)
+    client_timeout: aiohttp.ClientTimeout = aiohttp.ClientTimeout(
+        total=limits["total"], connect=limits["connect"], sock_read=limits["read"]
+    )
+    async with session.get(
+        url=url, headers=get_headers(api_key=api_key), timeout=client_timeout
+    ) as response:
+        response.raise_for_status()
+        parser: dict = lotr_json_fp.create_docs_parser(decoder)
+        async for chunk in response.content.iter_chunked(chunk_size):
+            for doc in lotr_json_fp.docs_parser_feed(parser, chunk):
+                yield doc
+        fields: dict = lotr_json_fp.docs_parser_close(parser)
+    if envelope is not None:
+        envelope.update(fields)
+    return
+
+
+def __pooled_api_call__(fn: Callable, pool: dict) -> Callable:
+    """
+    Wrap non-blocking API calls so that they run on the shared session of the pool.
+
+    Args:
+        fn (Callable): [non-blocking function accepting a session keyword argument]
+        pool (dict): [Session pool created by create_session_pool()]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    async def wrapper(*args, **kwargs) -> Union[dict, str]:
+        session: aiohttp.ClientSession = await __acquire_session__(pool)
+        return await fn(*args, session=session, **kwargs)
+
+    return wrapper
+
+
+def __blocking_pooled_api_call__(fn: Callable, pool: dict) -> Callable:
+    """
+    Wrap blocking API calls so that they run on the shared session of the pool.
+
+    Args:
+        fn (Callable): [blocking function accepting a session keyword argument]
+        pool (dict): [Blocking pool created by create_blocking_pool()]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    def wrapper(*args, **kwargs) -> Union[dict, str]:
+        return fn(*args, session=__acquire_blocking_session__(pool), **kwargs)
+
+    return wrapper
+
+
+def __streamed_api_call__(
+    fn: Callable, pool: dict, rate_limit: dict = None, key_pool: dict = None
+) -> Callable:
+    """
+    Wrap non-blocking streaming API calls (async generators) so that they run on the shared session of the pool,
+    after taking a token of the rate limit and a key of the key pool.
+
+    Args:
+        fn (Callable): [non-blocking async generator accepting api_key and session keyword arguments]
+        pool (dict): [Session pool created by create_session_pool()]
+        rate_limit (dict): [Rate limit policy created by lotr_ratelimit_fp.create_rate_limit_policy(). No limit if None]
+        key_pool (dict): [Key pool created by lotr_keypool_fp.create_key_pool(). The api_key of the call if None]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    async def wrapper(
+        *args,
+        api_key: str = None,
+        priority: int = lotr_ratelimit_fp.PRIORITY_INTERACTIVE,
+        **kwargs,
+    ) -> AsyncIterator[dict]:
+        import aiohttp
+
+        if rate_limit is not None:
+            await lotr_ratelimit_fp.aio_acquire(rate_limit, priority=priority)
+        key: dict = None if key_pool is None else await lotr_keypool_fp.aio_select_key(key_pool)
+        session: aiohttp.ClientSession = await __acquire_session__(pool)
+        try:
+            async for doc in fn(
+                *args, api_key=api_key if key is None else key["api_key"], session=session, **kwargs
+            ):
+                yield doc
+        except aiohttp.ClientResponseError as error:
+            if key is not None:
+                lotr_keypool_fp.record_response(key_pool, key, error.status, error.headers)
+            raise
+
+    return wrapper
+
+
+def __blocking_streamed_api_call__(
+    fn: Callable, pool: dict, rate_limit: dict = None, key_pool: dict = None
+) -> Callable:
+    """
+    Wrap blocking streaming API calls (generators) so that they run on the shared session of the pool,
+    after taking a token of the rate limit and a key of the key pool.
+
+    Args:
+        fn (Callable): [blocking generator accepting api_key, headers and session keyword arguments]
+        pool (dict): [Blocking pool created by create_blocking_pool()]
+        rate_limit (dict): [Rate limit policy created by lotr_ratelimit_fp.create_rate_limit_policy(). No limit if None]
+        key_pool (dict): [Key pool created by lotr_keypool_fp.create_key_pool(). The api_key of the call if None]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    def wrapper(
+        *args,
+        api_key: str = None,
+        priority: int = lotr_ratelimit_fp.PRIORITY_INTERACTIVE,
+        **kwargs,
+    ) -> Iterator[dict]:
+        import requests
+
+        if rate_limit is not None:
+            lotr_ratelimit_fp.acquire(rate_limit)
+        key: dict = None if key_pool is None else lotr_keypool_fp.select_key(key_pool)
+        if key is not None:
+            api_key = key["api_key"]
+        try:
+            yield from fn(
+                *args,
+                api_key=api_key,
+                headers=get_headers(api_key=api_key),
+                session=__acquire_blocking_session__(pool),
+                **kwargs,
+            )
+        except requests.HTTPError as error:
+            if key is not None:
+                lotr_keypool_fp.record_response(
+                    key_pool, key, error.response.status_code, error.response.headers
+                )
+            raise
+
+    return wrapper
+
+
+def __key_pooled_api_call__(fn: Callable, pool: dict) -> Callable:
+    """
+    Wrap non-blocking API calls returning a response envelope so that each one is sent with a key of the pool,
+    whose quota is then updated from the response.
+
+    Args:
+        fn (Callable): [non-blocking function returning a response envelope]
+        pool (dict): [Key pool created by lotr_keypool_fp.create_key_pool()]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    async def wrapper(*args, api_key: str = None, **kwargs) -> dict:
+        key: dict = await lotr_keypool_fp.aio_select_key(pool)
+        response: dict = await fn(*args, api_key=key["api_key"], **kwargs)
+        lotr_keypool_fp.record_response(pool, key, response["status"], response["headers"])
+        return response
+
+    return wrapper
+
+
+def __blocking_key_pooled_api_call__(fn: Callable, pool: dict) -> Callable:
+    """
+    Wrap blocking API calls returning a response envelope so that each one is sent with a key of the pool,
+    whose quota is then updated from the response.
+
+    Args:
+        fn (Callable): [blocking function returning a response envelope]
+        pool (dict): [Key pool created by lotr_keypool_fp.create_key_pool()]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    def wrapper(*args, api_key: str = None, headers: dict = None, **kwargs) -> dict:
+        key: dict = lotr_keypool_fp.select_key(pool)
+        response: dict = fn(
+            *args, api_key=key["api_key"], headers=get_headers(api_key=key["api_key"]), **kwargs
+        )
+        lotr_keypool_fp.record_response(pool, key, response["status"], response["headers"])
+        return response
+
+    return wrapper
+
+
+def __instrumented_api_call__(fn: Callable, metrics: dict) -> Callable:
+    """
+    Wrap non-blocking API calls returning a response envelope so that each request sent is timed and counted.
+
+    Args:
+        fn (Callable): [non-blocking function returning a response envelope, accepting a trace keyword argument]
+        metrics (dict): [Metrics created by lotr_metrics_fp.create_metrics()]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    async def wrapper(*args, **kwargs) -> dict:
+        trace: dict = {}
+        started: float = time.perf_counter()
+        try:
+            response: dict = await fn(*args, trace=trace, **kwargs)
+        except asyncio.CancelledError:
+            # Not a failure: e.g. the slower copy of a hedged request, or a shared request nobody waits for anymore.
+            lotr_metrics_fp.count(metrics, "cancelled")
+            raise
+        except Exception as error:
+            lotr_metrics_fp.record_request(metrics, kwargs, trace, started, error=error)
+            raise
+        lotr_metrics_fp.record_request(metrics, kwargs, trace, started, status=response["status"])
+        return response
+
+    return wrapper
+
+
+def __blocking_instrumented_api_call__(fn: Callable, metrics: dict) -> Callable:
+    """
+    Wrap blocking API calls returning a response envelope so that each request sent is timed and counted.
+
+    Args:
+        fn (Callable): [blocking function returning a response envelope, accepting a trace keyword argument]
+        metrics (dict): [Metrics created by lotr_metrics_fp.create_metrics()]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    def wrapper(*args, **kwargs) -> dict:
+        trace: dict = {}
+        started: float = time.perf_counter()
+        try:
+            response: dict = fn(*args, trace=trace, **kwargs)
+        except Exception as error:
+            lotr_metrics_fp.record_request(metrics, kwargs, trace, started, error=error)
+            raise
+        lotr_metrics_fp.record_request(metrics, kwargs, trace, started, status=response["status"])
+        return response
+
+    return wrapper
+
+
+def __cache_key__(kwargs: dict, base_url: str = BASE_URL) -> str:
+    """
+    Compose the URL of an API call from its keyword arguments, to be used as a cache key.
+
+    Args:
+        kwargs (dict): [Keyword arguments of the API call]
+        base_url (str): [Base URL of the API gateway server]
+
+    Returns:
+        str: [URL path to the API call]
+    """
+    return __composeUrl__(
+        endpoint=kwargs.get("endpoint"),
+        id=kwargs.get("id"),
+        query=kwargs.get("query"),
+        filter=kwargs.get("filter"),
+        base_url=base_url,
+    )
+
+
+def __data_api_call__(fn: Callable) -> Callable:
+    """
+    Wrap non-blocking API calls returning a response envelope so that they return the JSON data only.
+
+    Args:
+        fn (Callable): [non-blocking function returning {"status", "headers", "data"}]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    async def wrapper(*args, **kwargs) -> Union[dict, str]:
+        response: dict = await fn(*args, **kwargs)
+        return response["data"]
+
+    return wrapper
+
+
+def __blocking_data_api_call__(fn: Callable) -> Callable:
+    """
+    Wrap blocking API calls returning a response envelope so that they return the JSON data only.
+
+    Args:
+        fn (Callable): [blocking function returning {"status", "headers", "data"}]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    def wrapper(*args, **kwargs) -> Union[dict, str]:
+        return fn(*args, **kwargs)["data"]
+
+    return wrapper
+
+
+def __persistent_lookup__(backend: dict, key: str, endpoint: str) -> tuple:
+    """
+    Look up the persistent cache before going to the network.
+
+    Args:
+        backend (dict): [Persistent cache backend. E.g. lotr_cache_fp.create_sqlite_cache()]
+        key (str): [Composed URL of the API call]
+        endpoint (str): [Endpoint of the API call]
+
+    Returns:
+        tuple: [(stored entry or None, response envelope if the entry is fresh, conditional request headers)]
+    """
+    entry: dict = backend["get"](key)
+    if entry is None:
+        return None, None, None
+    if lotr_cache_fp.is_fresh(backend, entry, endpoint=endpoint):
+        return entry, {"status": 200, "headers": {}, "data": entry["data"]}, None
+    return entry, None, lotr_cache_fp.validators_of(entry)
+
+
+def __persistent_store__(
+    backend: dict, key: str, endpoint: str, entry: dict, response: dict
+) -> dict:
+    """
+    Keep the persistent cache up to date with a network response.
+    A 304 answer to a conditional request renews the stored entry, which is then returned as the response.
+
+    Args:
+        backend (dict): [Persistent cache backend. E.g. lotr_cache_fp.create_sqlite_cache()]
+        key (str): [Composed URL of the API call]
+        endpoint (str): [Endpoint of the API call]
+        entry (dict): [Stored entry sent for revalidation, or None]
+        response (dict): [Response envelope from the network]
+
+    Returns:
+        dict: [Response envelope to be returned to the caller]
+    """
+    if response["status"] == 304 and entry is not None:
+        backend["touch"](key)
+        return {**response, "status": 200, "data": entry["data"]}
+    data = response["data"]
+    if response["status"] == 200 and isinstance(data, dict) and "docs" in data:
+        backend["set"](
+            key,
+            data,
+            endpoint=endpoint,
+            etag=response["headers"].get("ETag"),
+            last_modified=response["headers"].get("Last-Modified"),
+        )
+    return response
+
+
+def __persistent_cached_api_call__(
+    fn: Callable, backend: dict, base_url: str = BASE_URL, metrics: dict = None
+) -> Callable:
+    """
+    Wrap non-blocking API calls returning a response envelope so that the persistent cache is consulted first.
+    A fresh entry is served without any network call. A stale entry is revalidated with a conditional request.
+    The backend is read and written in the default executor: a SQLite query waiting on the write lock
+    of another process would otherwise stall every coroutine of the event loop.
+
+    Args:
+        fn (Callable): [non-blocking function returning {"status", "headers", "data"}]
+        backend (dict): [Persistent cache backend. E.g. lotr_cache_fp.create_sqlite_cache()]
+        base_url (str): [Base URL of the API gateway server]
+        metrics (dict): [Metrics created by lotr_metrics_fp.create_metrics(), counting the fresh entries served. None if not counted]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    async def wrapper(*args, **kwargs) -> dict:
+        key: str = __cache_key__(kwargs, base_url=base_url)
+        endpoint: str = kwargs.get("endpoint")
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        entry, response, validators = await loop.run_in_executor(
+            None, partial(__persistent_lookup__, backend, key, endpoint)
+        )
+        if response is not None:
+            if metrics is not None:
+                lotr_metrics_fp.count(metrics, "persistent_cache_hits")
+            return response
+        response = await fn(*args, validators=validators, **kwargs)
+        return await loop.run_in_executor(
+            None, partial(__persistent_store__, backend, key, endpoint, entry, response)
+        )
+
+    return wrapper
+
+
+def __blocking_persistent_cached_api_call__(
+    fn: Callable, backend: dict, base_url: str = BASE_URL, metrics: dict = None
+) -> Callable:
+    """
+    Wrap blocking API calls returning a response envelope so that the persistent cache is consulted first.
+    A fresh entry is served without any network call. A stale entry is revalidated with a conditional request.
+
+    Args:
+        fn (Callable): [blocking function returning {"status", "headers", "data"}]
+        backend (dict): [Persistent cache backend. E.g. lotr_cache_fp.create_sqlite_cache()]
+        base_url (str): [Base URL of the API gateway server]
+        metrics (dict): [Metrics created by lotr_metrics_fp.create_metrics(), counting the fresh entries served. None if not counted]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    def wrapper(*args, **kwargs) -> dict:
+        key: str = __cache_key__(kwargs, base_url=base_url)
+        endpoint: str = kwargs.get("endpoint")
+        entry, response, validators = __persistent_lookup__(backend, key, endpoint)
+        if response is not None:
+            if metrics is not None:
+                lotr_metrics_fp.count(metrics, "persistent_cache_hits")
+            return response
+        response = fn(*args, validators=validators, **kwargs)
+        return __persistent_store__(backend, key, endpoint, entry, response)
+
+    return wrapper
+
+
+def __single_flight_api_call__(fn: Callable, base_url: str = BASE_URL) -> Callable:
+    """
+    Wrap non-blocking API calls so that concurrent calls resolving to the same URL share one in-flight request.
+    The first caller starts the request; the others wait for it and all of them receive its result.
+    Cancelling one caller does not cancel the request still awaited by the others;
+    the request is cancelled with its last caller, so that its connection is released.
+
+    Args:
+        fn (Callable): [non-blocking function to be deduplicated]
+        base_url (str): [Base URL of the API gateway server]
+
+    Returns:
+        Callable: [returned new function]
+    """
+    inflight: dict = {}
+
+    def forget(key: str, entry: dict, task: asyncio.Future) -> None:
+        if inflight.get(key) is entry:
+            del inflight[key]
+        return
+
+    async def wrapper(*args, **kwargs) -> Union[dict, str]:
+        key: str = __cache_key__(kwargs, base_url=base_url)
+        entry: dict = inflight.get(key)
+        # A finished request is forgotten by a callback run one loop iteration later: it is not joined meanwhile.
+        if (
+            entry is None
+            or entry["task"].done()
+            or entry["task"].get_loop() is not asyncio.get_running_loop()
+        ):
+            entry = {"task": asyncio.ensure_future(fn(*args, **kwargs)), "waiters": 0}
+            inflight[key] = entry
+            entry["task"].add_done_callback(partial(forget, key, entry))
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"])
+        finally:
+            entry["waiters"] -= 1
+            if entry["waiters"] == 0 and not entry["task"].done():
+                entry["task"].cancel()
+                # A task being cancelled is not done yet: the next caller starts a new request instead of joining it.
+                forget(key, entry, entry["task"])
+
+    return wrapper
+
+
+def __cached_api_call__(
+    fn: Callable, cache: dict, base_url: str = BASE_URL, metrics: dict = None
+) -> Callable:
+    """
+    Wrap non-blocking API calls so that successful responses are served from the response cache.
+    The cache key is the composed URL of the call.
+
+    Args:
+        fn (Callable): [non-blocking function to be cached]
+        cache (dict): [Response cache created by lotr_cache_fp.create_response_cache()]
+        base_url (str): [Base URL of the API gateway server]
+        metrics (dict): [Metrics created by lotr_metrics_fp.create_metrics(), counting the hits and misses. None if not counted]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    async def wrapper(*args, **kwargs) -> Union[dict, str]:
+        key: str = __cache_key__(kwargs, base_url=base_url)
+        output = lotr_cache_fp.cache_get(cache, key)
+        if metrics is not None:
+            lotr_metrics_fp.count(
+                metrics, "cache_misses" if output is lotr_cache_fp.MISSING else "cache_hits"
+            )
+        if output is not lotr_cache_fp.MISSING:
+            return output
+        output = await fn(*args, **kwargs)
+        if isinstance(output, dict) and "docs" in output:
+            lotr_cache_fp.cache_set(cache, key, output, endpoint=kwargs.get("endpoint"))
+        return output
+
+    return wrapper
+
+
+def __blocking_cached_api_call__(
+    fn: Callable, cache: dict, base_url: str = BASE_URL, metrics: dict = None
+) -> Callable:
+    """
+    Wrap blocking API calls so that successful responses are served from the response cache.
+    The cache key is the composed URL of the call.
+
+    Args:
+        fn (Callable): [blocking function to be cached]
+        cache (dict): [Response cache created by lotr_cache_fp.create_response_cache()]
+        base_url (str): [Base URL of the API gateway server]
+        metrics (dict): [Metrics created by lotr_metrics_fp.create_metrics(), counting the hits and misses. None if not counted]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    def wrapper(*args, **kwargs) -> Union[dict, str]:
+        key: str = __cache_key__(kwargs, base_url=base_url)
+        output = lotr_cache_fp.cache_get(cache, key)
+        if metrics is not None:
+            lotr_metrics_fp.count(
+                metrics, "cache_misses" if output is lotr_cache_fp.MISSING else "cache_hits"
+            )
+        if output is not lotr_cache_fp.MISSING:
+            return output
+        output = fn(*args, **kwargs)
+        if isinstance(output, dict) and "docs" in output:
+            lotr_cache_fp.cache_set(cache, key, output, endpoint=kwargs.get("endpoint"))
+        return output
+
+    return wrapper
+
+
+def __rate_limited_api_call__(fn: Callable, policy: dict) -> Callable:
+    """
+    Wrap non-blocking API calls so that each one waits for a token of the rate limit policy.
+    The optional 'priority' keyword argument of the call orders the waiting calls (lower value first).
+
+    Args:
+        fn (Callable): [non-blocking function to be rate limited]
+        policy (dict): [Rate limit policy created by lotr_ratelimit_fp.create_rate_limit_policy()]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    async def wrapper(
+        *args, priority: int = lotr_ratelimit_fp.PRIORITY_INTERACTIVE, **kwargs
+    ) -> Union[dict, str]:
+        await lotr_ratelimit_fp.aio_acquire(policy, priority=priority)
+        return await fn(*args, **kwargs)
+
+    return wrapper
+
+
+def __blocking_rate_limited_api_call__(fn: Callable, policy: dict) -> Callable:
+    """
+    Wrap blocking API calls so that each one blocks until a token of the rate limit policy is free.
+
+    Args:
+        fn (Callable): [blocking function to be rate limited]
+        policy (dict): [Rate limit policy created by lotr_ratelimit_fp.create_rate_limit_policy()]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    def wrapper(
+        *args, priority: int = lotr_ratelimit_fp.PRIORITY_INTERACTIVE, **kwargs
+    ) -> Union[dict, str]:
+        lotr_ratelimit_fp.acquire(policy)
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def __unlimited_api_call__(fn: Callable) -> Callable:
+    """
+    Wrap non-blocking API calls of a client without rate limit so that they accept and ignore 'priority',
+    the calls of every client taking the same keyword arguments.
+
+    Args:
+        fn (Callable): [non-blocking function]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    async def wrapper(*args, priority: int = None, **kwargs) -> Union[dict, str]:
+        return await fn(*args, **kwargs)
+
+    return wrapper
+
+
+def __blocking_unlimited_api_call__(fn: Callable) -> Callable:
+    """
+    Wrap blocking API calls of a client without rate limit so that they accept and ignore 'priority'.
+
+    Args:
+        fn (Callable): [blocking function]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    def wrapper(*args, priority: int = None, **kwargs) -> Union[dict, str]:
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def __retried_api_call__(
+    fn: Callable, policy: dict, retry_after: bool = True, metrics: dict = None
+) -> Callable:
+    """
+    Wrap non-blocking API calls returning a response envelope so that transient failures are retried,
+    waiting between attempts as told by the retry policy.
+    Once the attempts are spent, the last response is returned or the last error raised.
+
+    Args:
+        fn (Callable): [non-blocking function returning a response envelope]
+        policy (dict): [Retry policy created by lotr_retry_fp.create_retry_policy()]
+        retry_after (bool): [Wait for the Retry-After of a throttled response, otherwise back off as for any failure]
+        metrics (dict): [Metrics created by lotr_metrics_fp.create_metrics(), counting the retries. None if not counted]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    async def wrapper(*args, **kwargs) -> dict:
+        import aiohttp
+
+        attempt: int = 0
+        while True:
+            try:
+                response: dict = await fn(*args, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                delay: float = lotr_retry_fp.retry_delay(
+                    policy,
+                    attempt,
+                    error=error,
+                    connect_error=isinstance(error, aiohttp.ClientConnectorError),
+                )
+                if delay is None:
+                    raise
+            else:
+                delay = lotr_retry_fp.retry_delay(
+                    policy,
+                    attempt,
+                    status=response["status"],
+                    headers=response["headers"] if retry_after else None,
+                )
+                if delay is None:
+                    return response
+            if metrics is not None:
+                lotr_metrics_fp.count(metrics, "retries")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    return wrapper
+
+
+def __blocking_retried_api_call__(
+    fn: Callable, policy: dict, retry_after: bool = True, metrics: dict = None
+) -> Callable:
+    """
+    Wrap blocking API calls returning a response envelope so that transient failures are retried,
+    sleeping between attempts as told by the retry policy.
+    Once the attempts are spent, the last response is returned or the last error raised.
+
+    Args:
+        fn (Callable): [blocking function returning a response envelope]
+        policy (dict): [Retry policy created by lotr_retry_fp.create_retry_policy()]
+        retry_after (bool): [Wait for the Retry-After of a throttled response, otherwise back off as for any failure]
+        metrics (dict): [Metrics created by lotr_metrics_fp.create_metrics(), counting the retries. None if not counted]
+
+    Returns:
+        Callable: [returned new function]
+    """
 
-# Default base URL for lord of the ring API.
-BASE_URL: str = "https://the-one-api.dev/v2"
+    def wrapper(*args, **kwargs) -> dict:
+        import requests
 
+        attempt: int = 0
+        while True:
+            try:
+                response: dict = fn(*args, **kwargs)
+            except (requests.RequestException, asyncio.TimeoutError) as error:
+                delay: float = lotr_retry_fp.retry_delay(
+                    policy,
+                    attempt,
+                    error=error,
+                    connect_error=isinstance(error, requests.ConnectionError),
+                )
+                if delay is None:
+                    raise
+            else:
+                delay = lotr_retry_fp.retry_delay(
+                    policy,
+                    attempt,
+                    status=response["status"],
+                    headers=response["headers"] if retry_after else None,
+                )
+                if delay is None:
+                    return response
+            if metrics is not None:
+                lotr_metrics_fp.count(metrics, "retries")
+            time.sleep(delay)
+            attempt += 1
 
-def get_headers(api_key: str) -> dict:
+    return wrapper
+
+
+def __hedged_api_call__(fn: Callable, policy: dict) -> Callable:
     """
-    get_headrs() return a dictionary bearer http header.
+    Wrap non-blocking API calls so that a call slower than the hedging threshold of the policy
+    is sent a second time, the first answer being used and the other call cancelled.
+
     Args:
-        api_key (str): [API key]
+        fn (Callable): [non-blocking function to be hedged]
+        policy (dict): [Retry policy created by lotr_retry_fp.create_retry_policy()]
 
     Returns:
-        dict: [Dictionary object to be put into the http header for HTTP API calls]
+        Callable: [returned new function]
     """
-    return {"Authorization": f"Bearer {api_key}"}
+
+    async def attempt(*args, **kwargs) -> dict:
+        start: float = time.monotonic()
+        response: dict = await fn(*args, **kwargs)
+        lotr_retry_fp.record_latency(policy, time.monotonic() - start)
+        return response
+
+    async def wrapper(*args, **kwargs) -> dict:
+        threshold: float = lotr_retry_fp.hedge_threshold(policy)
+        if threshold is None:
+            return await attempt(*args, **kwargs)
+        first: asyncio.Task = asyncio.ensure_future(attempt(*args, **kwargs))
+        tasks: set = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=threshold)
+            if not done:
+                lotr_retry_fp.record_hedge(policy)
+                tasks.add(asyncio.ensure_future(attempt(*args, **kwargs)))
+            while True:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                winners: list = [task for task in done if task.exception() is None]
+                if winners or not tasks:
+                    break
+            winner: asyncio.Task = winners[0] if winners else done.pop()
+            if winner is not first:
+                lotr_retry_fp.record_hedge(policy, won=True)
+            return winner.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return wrapper
 
 
-def fetch_data(endpoint: str, api_key: str, id: str, query: str, filter: str) -> json:
+def __blocking_hedged_api_call__(fn: Callable, policy: dict) -> Callable:
     """
-    Blocking I/O for HTTP GET request.
+    Wrap blocking API calls so that a call slower than the hedging threshold of the policy
+    is sent a second time from another thread, the first answer being used.
+    A blocking call can not be cancelled: the slower one runs to its end and is dropped.
 
     Args:
-        endpoint (str): [path to the API function call]
-        api_key (str): [API key]
-        id (str): [Search for a specific ID. E.g. movie ID or Quote ID]
-        query (str): [Additional sub-path for the API. E.g. /movie/{id}/quote]
-        filter (str): [Filtering of the result.]
+        fn (Callable): [blocking function to be hedged]
+        policy (dict): [Retry policy created by lotr_retry_fp.create_retry_policy()]
 
     Returns:
-        json: [JSON response from the API call]
+        Callable: [returned new function]
     """
-    # url:str = f"{BASE_URL}/{endpoint}"
-    url: str = __composeUrl__(endpoint=endpoint, id=id, query=query, filter=filter)
-    response: requests.Response = requests.get(
-        url, headers=get_headers(api_key=api_key)
+
+    def attempt(*args, **kwargs) -> dict:
+        start: float = time.monotonic()
+        response: dict = fn(*args, **kwargs)
+        lotr_retry_fp.record_latency(policy, time.monotonic() - start)
+        return response
+
+    def wrapper(*args, **kwargs) -> dict:
+        threshold: float = lotr_retry_fp.hedge_threshold(policy)
+        if threshold is None:
+            return attempt(*args, **kwargs)
+        outcomes: queue.Queue = queue.Queue()
+
+        def run(index: int) -> None:
+            try:
+                outcomes.put((index, None, attempt(*args, **kwargs)))
+            except Exception as error:
+                outcomes.put((index, error, None))
+            return
+
+        def start(index: int) -> None:
+            # The copy of the context carries the deadline to the thread.
+            threading.Thread(
+                target=contextvars.copy_context().run, args=(run, index), daemon=True
+            ).start()
+            return
+
+        start(0)
+        try:
+            index, error, response = outcomes.get(timeout=threshold)
+        except queue.Empty:
+            lotr_retry_fp.record_hedge(policy)
+            start(1)
+            index, error, response = outcomes.get()
+            if error is not None:
+                index, error, response = outcomes.get()
+            if index == 1:
+                lotr_retry_fp.record_hedge(policy, won=True)
+        if error is not None:
+            raise error
+        return response
+
+    return wrapper
+
+
+def __resilient_api_call__(
+    fn: Callable, policy: dict, retry_after: bool = True, metrics: dict = None
+) -> Callable:
+    """
+    Wrap non-blocking API calls returning a response envelope with the hedging and the retries of the policy.
+
+    Args:
+        fn (Callable): [non-blocking function returning a response envelope]
+        policy (dict): [Retry policy created by lotr_retry_fp.create_retry_policy()]
+        retry_after (bool): [Wait for the Retry-After of a throttled response, otherwise back off as for any failure]
+        metrics (dict): [Metrics created by lotr_metrics_fp.create_metrics(), counting the retries. None if not counted]
+
+    Returns:
+        Callable: [returned new function]
+    """
+    return __retried_api_call__(
+        __hedged_api_call__(fn, policy=policy),
+        policy=policy,
+        retry_after=retry_after,
+        metrics=metrics,
     )
-    return response.json()
 
 
-def __composeUrl__(endpoint: str, id: str, query: str, filter: str) -> str:
+def __blocking_resilient_api_call__(
+    fn: Callable, policy: dict, retry_after: bool = True, metrics: dict = None
+) -> Callable:
     """
-    Combine all the parameters into a URL for the API call.
+    Wrap blocking API calls returning a response envelope with the hedging and the retries of the policy.
 
     Args:
-        endpoint (str): [path to the API function call]
-        id (str): [Search for a specific ID. E.g. movie ID or Quote ID]
-        query (str): [Additional sub-path for the API. E.g. /movie/{id}/quote]
-        filter (str): [Filtering of the result.]
+        fn (Callable): [blocking function returning a response envelope]
+        policy (dict): [Retry policy created by lotr_retry_fp.create_retry_policy()]
+        retry_after (bool): [Wait for the Retry-After of a throttled response, otherwise back off as for any failure]
+        metrics (dict): [Metrics created by lotr_metrics_fp.create_metrics(), counting the retries. None if not counted]
 
     Returns:
-        str: [URL path to the API call]
+        Callable: [returned new function]
     """
-    url: str = f"{BASE_URL}/{endpoint}"
-    if id is not None and not id.isspace():
-        url = url + "/" + id
-    if query is not None and not query.isspace():
-        url = url + "/" + query
-    if filter is not None and not filter.isspace():
-        url = url + "?" + filter
-    return url
+    return __blocking_retried_api_call__(
+        __blocking_hedged_api_call__(fn, policy=policy),
+        policy=policy,
+        retry_after=retry_after,
+        metrics=metrics,
+    )
 
 
-async def aio_fetch_data(
-    endpoint: str, api_key: str, id: str, query: str, filter: str
-) -> json:
+def __is_blank__(value: str) -> bool:
     """
-    Non-blocking I/O for HTTP GET request
+    Tell whether an optional URL part is left out, the same way as __composeUrl__().
+    """
+    return value is None or value.isspace()
+
+
+def __answer_locally__(datasets: dict, kwargs: dict) -> dict:
+    """
+    Answer an API call from the locally held datasets, with the same result semantics as the API gateway server.
 
     Args:
-        endpoint (str): [path to the API function call]
-        api_key (str): [API key]
-        id (str): [Search for a specific ID. E.g. movie ID or Quote ID]
-        query (str): [Additional sub-path for the API. E.g. /movie/{id}/quote]
-        filter (str): [Filtering of the result.]
+        datasets (dict): [Documents held in memory by endpoint. E.g. {"movie": [...], "quote": [...]}]
+        kwargs (dict): [Keyword arguments of the API call]
 
     Returns:
-        json: [JSON response from the API call]
+        dict: [Page envelope, or None if the call cannot be answered locally]
+    """
+    endpoint: str = kwargs.get("endpoint")
+    id: str = kwargs.get("id")
+    query: str = kwargs.get("query")
+    filter: str = kwargs.get("filter")
+    if __is_blank__(filter):
+        filter = None
+    if endpoint in datasets and __is_blank__(id) and __is_blank__(query):
+        return lotr_filter_fp.apply_filter(datasets[endpoint], filter)
+    if endpoint in datasets and __is_blank__(query):
+        output: dict = lotr_filter_fp.apply_filter(
+            datasets[endpoint], f"_id={id}" if filter is None else f"_id={id}&{filter}"
+        )
+        # Unknown ids are left to the server, which tells what went wrong.
+        return output if output["docs"] else None
+    if (
+        endpoint in ("movie", "character")
+        and query == "quote"
+        and "quote" in datasets
+        and not __is_blank__(id)
+    ):
+        return lotr_filter_fp.apply_filter(
+            datasets["quote"], f"{endpoint}={id}" if filter is None else f"{endpoint}={id}&{filter}"
+        )
+    return None
+
+
+def __local_api_call__(fn: Callable, datasets: dict) -> Callable:
+    """
+    Wrap non-blocking API calls so that calls on a locally held dataset are answered from memory.
+    Filters are evaluated by lotr_filter_fp; any other call goes on to the network.
+
+    Args:
+        fn (Callable): [non-blocking function]
+        datasets (dict): [Documents held in memory by endpoint. E.g. {"movie": [...], "quote": [...]}]
+
+    Returns:
+        Callable: [returned new function]
     """
-    url: str = __composeUrl__(endpoint=endpoint, id=id, query=query, filter=filter)
 
-    logger.info(f"Making request to url={url}")
+    async def wrapper(*args, **kwargs) -> Union[dict, str]:
+        output: dict = __answer_locally__(datasets, kwargs)
+        if output is not None:
+            return output
+        return await fn(*args, **kwargs)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            url=url, headers=get_headers(api_key=api_key)
-        ) as response:
-            # return await response.text()
-            return await response.json()
+    return wrapper
+
+
+def __blocking_local_api_call__(fn: Callable, datasets: dict) -> Callable:
+    """
+    Wrap blocking API calls so that calls on a locally held dataset are answered from memory.
+    Filters are evaluated by lotr_filter_fp; any other call goes on to the network.
+
+    Args:
+        fn (Callable): [blocking function]
+        datasets (dict): [Documents held in memory by endpoint. E.g. {"movie": [...], "quote": [...]}]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    def wrapper(*args, **kwargs) -> Union[dict, str]:
+        output: dict = __answer_locally__(datasets, kwargs)
+        if output is not None:
+            return output
+        return fn(*args, **kwargs)
+
+    return wrapper
 
 
 def __safe_api_call__(fn: Callable) -> Callable:
@@ -121,11 +1644,473 @@ def __safe_api_call__(fn: Callable) -> Callable:
     return wrapper
 
 
-def create_api_client(api_key: str) -> dict:
+def __aio_safe_api_call__(fn: Callable) -> Callable:
     """
-    Return a set of API functions bound to an API key.
+    Wrap non-blocking API calls to handle exceptions functionally, like __safe_api_call__() does for blocking ones.
+    The call is awaited within the try-except block, so that network errors and timeouts are returned
+    as a dictionary object with the error message in it. With a deadline set (lotr_deadline_fp.deadline()),
+    the whole call, waits for a pooled connection or a rate limit token included, is bounded by the time left.
+    Cancellation is not caught: it goes through and the connection of the call is released.
+
     Args:
-        api_key (str): [API key]
+        fn (Callable): [non-blocking function to be enabled to handle exception]
+
+    Returns:
+        Callable: [returned new function]
+    """
+
+    async def wrapper(*args, **kwargs) -> Union[dict, str]:
+        try:
+            left: float = lotr_deadline_fp.remaining()
+            if left is None:
+                return await fn(*args, **kwargs)
+            return await asyncio.wait_for(fn(*args, **kwargs), timeout=left)
+        except asyncio.TimeoutError as e:
+            return {"error": str(e) or "Timed out"}
+        except Exception as e:
+            return {"error": str(e)}
+
+    return wrapper
+
+
+def __compose_page_filter__(filter: str, page_size: int, page: int) -> str:
+    """
+    Append the pagination parameters to a filter.
+
+    Args:
+        filter (str): [Filtering of the result. E.g. character=5cd99d4bde30eff6ebccfe9e]
+        page_size (int): [Number of documents per page]
+        page (int): [Page number, starting from 1]
+
+    Returns:
+        str: [Filter with limit and page]
+    """
+    paging: str = f"limit={page_size}&page={page}"
+    if filter is None or filter.isspace() or filter == "":
+        return paging
+    return f"{filter}&{paging}"
+
+
+async def aio_iter_page_envelopes(
+    fetch: Callable,
+    filter: str = None,
+    page_size: int = 100,
+    window: int = 4,
+    first_page: int = 1,
+    **params,
+) -> AsyncIterator[tuple]:
+    """
+    Iterate over the pages of a paginated API call, from the first page wanted to the last one.
+    That page tells the number of pages. The following pages are then prefetched concurrently,
+    with at most 'window' pages in flight, while the pages are yielded in order as soon as they arrive.
+    Only the pages inside the window are held in memory, and no page is fetched ahead of a consumer that is not ready.
+
+    Args:
+        fetch (Callable): [non-blocking API call returning a page envelope. E.g. client["aio_fetch_all_quotes"]]
+        filter (str): [Filtering of the result, without limit & page]
+        page_size (int): [Number of documents per page]
+        window (int): [Max number of pages being fetched ahead]
+        first_page (int): [Number of the first page, e.g. to resume a crawl. Nothing is yielded past the last page]
+        **params: [Other keyword arguments of fetch. E.g. id]
+
+    Raises:
+        RuntimeError: [A page could not be fetched]
+
+    Yields:
+        tuple: [(page number, page envelope {"docs", "total", "pages", ...})]
+    """
+
+    async def fetch_page(page: int) -> dict:
+        response: dict = await fetch(
+            filter=__compose_page_filter__(filter=filter, page_size=page_size, page=page),
+            **params,
+        )
+        if not isinstance(response, dict) or "docs" not in response:
+            raise RuntimeError(f"Failed to fetch page={page}: {response}")
+        return response
+
+    first: dict = await fetch_page(page=first_page)
+    if first_page == 1 or first_page <= first["pages"]:
+        yield first_page, first
+
+    next_page: int = first_page + 1
+    pending: Deque[asyncio.Task] = deque()
+    try:
+        while next_page <= first["pages"] or pending:
+            while next_page <= first["pages"] and len(pending) < max(window, 1):
+                pending.append(asyncio.ensure_future(fetch_page(page=next_page)))
+                next_page += 1
+            page: int = next_page - len(pending)
+            response: dict = await pending.popleft()
+            yield page, response
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def aio_iter_pages(
+    fetch: Callable,
+    filter: str = None,
+    page_size: int = 100,
+    window: int = 4,
+    **params,
+) -> AsyncIterator[dict]:
+    """
+    Iterate over all the documents of a paginated API call.
+    The first page tells the number of pages. The following pages are then prefetched concurrently,
+    with at most 'window' pages in flight, while the documents are yielded in order as soon as their page arrives.
+    Only the pages inside the window are held in memory.
+    ```
+    async for quote in client["aio_iter_all_quotes"](page_size=200, window=4):
+        ...
+    ```
+
+    Args:
+        fetch (Callable): [non-blocking API call returning a page envelope. E.g. client["aio_fetch_all_quotes"]]
+        filter (str): [Filtering of the result, without limit & page]
+        page_size (int): [Number of documents per page]
+        window (int): [Max number of pages being fetched ahead]
+        **params: [Other keyword arguments of fetch. E.g. id]
+
+    Raises:
+        RuntimeError: [A page could not be fetched]
+
+    Yields:
+        dict: [documents]
+    """
+    pages: AsyncIterator[tuple] = aio_iter_page_envelopes(
+        fetch, filter=filter, page_size=page_size, window=window, **params
+    )
+    try:
+        async for _, response in pages:
+            for doc in response["docs"]:
+                yield doc
+    finally:
+        # The prefetched pages are cancelled as soon as the iteration is left.
+        await pages.aclose()
+
+
+async def aio_load_datasets(
+    fetch: Callable,
+    datasets: dict,
+    endpoints: tuple = ("movie", "quote"),
+    page_size: int = 1000,
+    window: int = 4,
+    compact: bool = True,
+    indexes: dict = None,
+    **params,
+) -> dict:
+    """
+    Download whole collections into the local datasets, so that later calls on them are answered from memory.
+    The collections are crawled page by page with aio_iter_pages() and each dataset is replaced at once when complete.
+    By default the documents are kept in a compact columnar store (lotr_store_fp) while they stream in,
+    which takes several times less memory than the decoded JSON.
+    The secondary indexes of the store are built in the same pass, so that the quotes of a movie or a character,
+    a lookup by id and numeric comparisons on the movies are answered without scanning the whole dataset.
+
+    Args:
+        fetch (Callable): [non-blocking API call going to the network. E.g. client["aio_fetch"] of a client without datasets]
+        datasets (dict): [Documents held in memory by endpoint, updated in place]
+        endpoints (tuple): [Collections to be loaded]
+        page_size (int): [Number of documents per page]
+        window (int): [Max number of pages being fetched ahead]
+        compact (bool): [Keep the documents in a columnar store instead of a list of dictionaries]
+        indexes (dict): [Secondary indexes of the columnar store by endpoint. DATASET_INDEXES if None]
+        **params: [Other keyword arguments of fetch. E.g. priority]
+
+    Raises:
+        RuntimeError: [A page could not be fetched. The crawls of the other endpoints are cancelled first]
+
+    Returns:
+        dict: [Number of documents loaded by endpoint]
+    """
+
+    async def load(endpoint: str) -> int:
+        store: dict = lotr_store_fp.create_document_store(
+            **(DATASET_INDEXES if indexes is None else indexes).get(endpoint, {})
+        )
+        docs: list = []
+        pages: AsyncIterator[dict] = aio_iter_pages(
+            fetch=partial(fetch, endpoint=endpoint, id=None, query=None),
+            page_size=page_size,
+            window=window,
+            **params,
+        )
+        try:
+            async for doc in pages:
+                if compact:
+                    lotr_store_fp.store_append(store, doc)
+                else:
+                    docs.append(doc)
+        finally:
+            # The prefetched pages are cancelled with the crawl.
+            await pages.aclose()
+        datasets[endpoint] = lotr_store_fp.records(store) if compact else docs
+        return len(datasets[endpoint])
+
+    tasks: List[asyncio.Task] = [asyncio.ensure_future(load(endpoint)) for endpoint in endpoints]
+    try:
+        counts: list = await asyncio.gather(*tasks)
+    finally:
+        # A failed crawl stops the others, which would keep paging and spending the quota in the background.
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
+    return dict(zip(endpoints, counts))
+
+
+def __failed_by_ids__(output: Union[dict, str]) -> dict:
+    """
+    The {"error": ...} yielded by aio_iter_by_ids() for the ids of a failed call.
+    """
+    if isinstance(output, dict) and "error" in output:
+        return output
+    return {"error": f"Failed to fetch by ids: {output}"}
+
+
+async def aio_iter_by_ids(
+    ids: Sequence[str],
+    fetch: Callable,
+    endpoint: str,
+    concurrency: int = 8,
+    list_call: bool = False,
+    chunk_size: int = 100,
+) -> AsyncIterator[tuple]:
+    """
+    Fetch documents of an endpoint by id and yield them as soon as they arrive.
+    A fixed number of calls are in flight at once, whatever the number of ids, so that large batches
+    neither exhaust the sockets nor burst the rate quota. Each distinct id is fetched once.
+    With list_call, ids are fetched in chunks with one filtered list call each (_id=a,b,c) instead of
+    one call per id, which is cheaper when many ids are wanted at once.
+
+    Args:
+        ids (Sequence[str]): [Ids of the documents]
+        fetch (Callable): [non-blocking API call. E.g. client["aio_fetch"]]
+        endpoint (str): [Endpoint of the documents. E.g. quote or movie]
+        concurrency (int): [Max number of calls at once]
+        list_call (bool): [Fetch the ids with filtered list calls]
+        chunk_size (int): [Number of ids per list call]
+
+    Yields:
+        tuple: [(id, document), document being None if the server does not have it,
+            or {"error": ...} if the call of the id failed (timeout, throttled or server error after the retries).
+            A call of one id answered without documents is taken as an unknown id]
+    """
+    unique: List[str] = list(dict.fromkeys(ids))
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(id: str) -> List[tuple]:
+        async with semaphore:
+            output: dict = await fetch(endpoint=endpoint, id=id, query=None, filter=None)
+        if not isinstance(output, dict) or "error" in output:
+            return [(id, __failed_by_ids__(output))]
+        docs: list = output.get("docs")
+        return [(id, docs[0] if docs else None)]
+
+    async def fetch_chunk(chunk: List[str]) -> List[tuple]:
+        async with semaphore:
+            output: dict = await fetch(
+                endpoint=endpoint, id=None, query=None, filter=f"_id={','.join(chunk)}&limit={len(chunk)}"
+            )
+        # A list call always answers with docs, anything else is a failure of the whole chunk.
+        if not isinstance(output, dict) or "docs" not in output:
+            failed: dict = __failed_by_ids__(output)
+            return [(id, failed) for id in chunk]
+        found: dict = {doc.get("_id"): doc for doc in output["docs"]}
+        return [(id, found.get(id)) for id in chunk]
+
+    if list_call:
+        tasks: List[asyncio.Task] = [
+            asyncio.ensure_future(fetch_chunk(unique[start : start + chunk_size]))
+            for start in range(0, len(unique), chunk_size)
+        ]
+    else:
+        tasks = [asyncio.ensure_future(fetch_one(id)) for id in unique]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for found in await next_done:
+                yield found
+    finally:
+        for task in tasks:
+            task.cancel()
+    return
+
+
+async def aio_fetch_by_ids(
+    ids: Sequence[str],
+    fetch: Callable,
+    endpoint: str,
+    concurrency: int = 8,
+    list_call: bool = False,
+    chunk_size: int = 100,
+) -> List[dict]:
+    """
+    Fetch documents of an endpoint by id, with bounded concurrency. See aio_iter_by_ids().
+
+    Args:
+        ids (Sequence[str]): [Ids of the documents]
+        fetch (Callable): [non-blocking API call. E.g. client["aio_fetch"]]
+        endpoint (str): [Endpoint of the documents. E.g. quote or movie]
+        concurrency (int): [Max number of calls at once]
+        list_call (bool): [Fetch the ids with filtered list calls (_id=a,b,c)]
+        chunk_size (int): [Number of ids per list call]
+
+    Returns:
+        List[dict]: [Documents in the order of the ids, None for an unknown id, {"error": ...} for an id whose call failed]
+    """
+    found: dict = {}
+    async for id, doc in aio_iter_by_ids(
+        ids, fetch=fetch, endpoint=endpoint, concurrency=concurrency, list_call=list_call, chunk_size=chunk_size
+    ):
+        found[id] = doc
+    return [found.get(id) for id in ids]
+
+
+async def __aio_load_by_ids__(ids: List[str], **options) -> Dict[str, dict]:
+    """
+    Batch function of the data loaders of a client: the documents found by id.
+    A failed call fails the batch, so that its ids are not taken as unknown.
+    """
+    found: Dict[str, dict] = {}
+    async for id, doc in aio_iter_by_ids(ids, **options):
+        if doc is not None and "error" in doc:
+            raise RuntimeError(f"Failed to fetch id={id}: {doc['error']}")
+        if doc is not None:
+            found[id] = doc
+    return found
+
+
+async def aio_hydrate_quotes(
+    loaders: dict, quotes: Sequence[dict], fields: tuple = ("movie", "character")
+) -> List[dict]:
+    """
+    Replace the movie and character ObjectIds of quotes with the referenced documents.
+    The ids referenced by all the quotes (and by any other hydration running in the same event loop tick)
+    are collected by one data loader per field, deduplicated and fetched in one batch with bounded concurrency,
+    so that a page of quotes costs one call per distinct movie and character instead of two calls per quote.
+    The fetches go through the client, so cached responses and loaded datasets are used first.
+
+    Args:
+        loaders (dict): [Data loader by field, created by lotr_loader_fp.create_data_loader()]
+        quotes (Sequence[dict]): [Quote documents. E.g. the docs of aio_fetch_all_quotes()]
+        fields (tuple): [Reference fields to be hydrated]
+
+    Raises:
+        RuntimeError: [A referenced document could not be fetched]
+
+    Returns:
+        List[dict]: [New quote documents. A reference to an unknown document is left as its id]
+    """
+    references: List[tuple] = [
+        (i, field, quote[field])
+        for i, quote in enumerate(quotes)
+        for field in fields
+        if isinstance(quote.get(field), str) and not __is_blank__(quote[field])
+    ]
+    docs: list = await asyncio.gather(
+        *[lotr_loader_fp.aio_load(loaders[field], id) for _, field, id in references]
+    )
+    hydrated: List[dict] = [dict(quote) for quote in quotes]
+    for (i, field, _), doc in zip(references, docs):
+        if doc is not None:
+            hydrated[i][field] = doc
+    return hydrated
+
+
+def search_dataset(
+    datasets: dict,
+    query: str,
+    endpoint: str = "quote",
+    field: str = "dialog",
+    match: str = "all",
+    limit: int = 10,
+    page: int = 1,
+    offset: int = None,
+) -> dict:
+    """
+    Full-text search in a locally held dataset, ranked with BM25. No network call is made.
+    A dataset loaded in a columnar store answers from its text index, kept up to date with the store;
+    a dataset of plain dictionaries is indexed for the query.
+
+    Args:
+        datasets (dict): [Documents held in memory by endpoint, filled by aio_load_datasets()]
+        query (str): [Search query: terms, prefixes (prec*) and "quoted phrases". E.g. 'ring "my precious"']
+        endpoint (str): [Dataset searched]
+        field (str): [Text field searched]
+        match (str): ["all" for documents matching every clause, "any" for documents matching at least one]
+        limit (int): [Page size]
+        page (int): [Page number, starting from 1]
+        offset (int): [Number of documents to skip]
+
+    Returns:
+        dict: [Page envelope {"docs", "scores", "total", "limit", "offset", "page", "pages"} from the best score,
+        or an error message if the dataset is not loaded]
+    """
+    docs = datasets.get(endpoint)
+    if docs is None:
+        return {"error": f"The {endpoint} dataset is not loaded. Call 'aio_load_datasets' first."}
+    ranked: list = None
+    if isinstance(docs, lotr_store_fp.RecordList):
+        ranked = lotr_store_fp.search_text(docs.store, field, query, match=match)
+        matched: list = [lotr_store_fp.Record(docs.store, position) for position, _ in ranked or ()]
+    if ranked is None:
+        index: dict = lotr_search_fp.create_search_index()
+        for position, doc in enumerate(docs):
+            if isinstance(doc.get(field), str):
+                lotr_search_fp.index_text(index, position, doc[field])
+        ranked = lotr_search_fp.search(
+            index, query, text_of=lambda position: docs[position][field], match=match
+        )
+        matched = [docs[position] for position, _ in ranked]
+    output: dict = lotr_filter_fp.paginate(matched, limit=limit, page=page, offset=offset)
+    output["scores"] = [
+        score for _, score in ranked[output["offset"] : output["offset"] + output["limit"]]
+    ]
+    return output
+
+
+def create_api_client(
+    api_key: str,
+    base_url: str = BASE_URL,
+    session_pool: dict = None,
+    blocking_pool: dict = None,
+    response_cache: dict = None,
+    persistent_cache: dict = None,
+    single_flight: bool = True,
+    rate_limit: dict = None,
+    datasets: dict = None,
+    batch_concurrency: int = 8,
+    timeout: dict = None,
+    retry: dict = None,
+    key_pool: dict = None,
+    sync_state: dict = None,
+    decoder: Callable = None,
+    metrics: dict = None,
+) -> dict:
+    """
+    Return a set of API functions bound to an API key, or spread over the keys of a key pool.
+    All the non-blocking functions share one pooled aiohttp session and the blocking 'fetch'
+    shares one thread-safe requests session. Call 'aio_close' and 'close' once done with the client,
+    or use aio_api_client() / api_client() to have them closed automatically.
+
+    Args:
+        api_key (str): [API key. Unused with a key_pool, may then be None]
+        base_url (str): [Base URL of the API gateway server]
+        session_pool (dict): [Session pool created by create_session_pool(). A default one is created if None]
+        blocking_pool (dict): [Blocking pool created by create_blocking_pool(). A default one is created if None]
+        response_cache (dict): [Response cache created by lotr_cache_fp.create_response_cache(). No caching if None]
+        persistent_cache (dict): [Persistent cache backend consulted before the network. E.g. lotr_cache_fp.create_sqlite_cache()]
+        single_flight (bool): [Share one in-flight request between concurrent non-blocking calls to the same URL]
+        rate_limit (dict): [Rate limit policy created by lotr_ratelimit_fp.create_rate_limit_policy(). No limit if None]
+        datasets (dict): [Documents held in memory by endpoint, filled by 'aio_load_datasets'. A new one is created if None]
+        batch_concurrency (int): [Max number of calls at once for the batched lookups, e.g. 'aio_fetch_quotes_by_ids']
+        timeout (dict): [Timeouts of every request, created by lotr_deadline_fp.create_timeout(). Default ones if None]
+        retry (dict): [Retry policy created by lotr_retry_fp.create_retry_policy(), also hedging slow calls if set so. No retry if None]
+        key_pool (dict): [Key pool created by lotr_keypool_fp.create_key_pool(), each request taking one of its keys. Only api_key is used if None]
+        sync_state (dict): [Sync state created by lotr_sync_fp.create_sync_state(), kept by 'aio_sync_datasets'. A new one is created if None]
+        decoder (Callable): [JSON decoder of the bodies. lotr_json_fp.DEFAULT_DECODER (orjson when installed) if None]
+        metrics (dict): [Metrics created by lotr_metrics_fp.create_metrics(), timing and counting every request. Not instrumented if None]
 
     Returns:
         dict [API methods]
@@ -136,6 +2121,9 @@ def create_api_client(api_key: str) -> dict:
         # Non-blocking I/O API call for advance usage and this is the method being used by other API methods under the hood.
         'aio_fetch'
 
+        # Blocking / non-blocking API calls yielding the documents one at a time as the body streams in
+        'stream_docs', 'aio_stream_docs'
+
         # List of all movies, including the "The Lord of the Rings" and the "The Hobbit" trilogies
         'aio_fetch_all_movies'
 
@@ -150,19 +2138,148 @@ def create_api_client(api_key: str) -> dict:
 
         # Request one specific movie quote
         'aio_fetch_quote_by_id'
+
+        # Request all movie quotes of one specific character
+        'aio_fetch_character_quote_by_id'
+
+        # Close the shared session and release the pooled connections
+        'aio_close'
+
+        # Close the shared blocking session and release its pooled connections
+        'close'
+
+        # Iterate over all the movies, page by page
+        'aio_iter_all_movies'
+
+        # Iterate over all the movie quotes, page by page
+        'aio_iter_all_quotes'
+
+        # Iterate over all the movie quotes for one specific movie, page by page
+        'aio_iter_movie_quotes'
+
+        # Counters of the response cache (only with a response_cache)
+        'cache_stats'
+
+        # Remove all the cached responses (only with a response_cache)
+        'cache_clear'
+
+        # Counters of the rate limit policy (only with a rate_limit)
+        'rate_limit_stats'
+
+        # Counters of the retries and hedged requests (only with a retry)
+        'retry_stats'
+
+        # Counters and remaining quota of each key (only with a key_pool)
+        'key_pool_stats'
+
+        # Counters and latency histograms of the requests (only with metrics)
+        'metrics_snapshot'
+
+        # Download whole collections so that the calls on them (filters included) are answered from memory
+        'aio_load_datasets'
+
+        # Bring the local datasets up to date, downloading only the changed pages, and yield the changes
+        'aio_sync_datasets'
+
+        # Counters of the dataset sync
+        'sync_stats'
+
+        # Ranked full-text search in the dialog of the loaded quotes
+        'search_quotes'
+
+        # Replace the movie and character ids of quotes with the documents, in batches
+        'aio_hydrate_quotes'
+
+        # Request many movie quotes / movies by id with bounded concurrency, in the order of the ids
+        'aio_fetch_quotes_by_ids', 'aio_fetch_movies_by_ids'
+
+        # Same as above, yielding (id, document) as they arrive
+        'aio_iter_quotes_by_ids', 'aio_iter_movies_by_ids'
+
+        # Export all the movies / movie quotes to a NDJSON or columnar file, in constant memory and resumable
+        'aio_export_movies', 'aio_export_quotes'
     """
-    return {
+    if session_pool is None:
+        session_pool = create_session_pool()
+    if blocking_pool is None:
+        blocking_pool = create_blocking_pool()
+    if datasets is None:
+        datasets = {}
+    if sync_state is None:
+        sync_state = lotr_sync_fp.create_sync_state()
+    if timeout is None:
+        timeout = lotr_deadline_fp.create_timeout()
+    # The phases of the non-blocking requests are timed by trace hooks added to the session once opened.
+    if metrics is not None:
+        session_pool["traced"] = True
+    fetch_fn: Callable = __blocking_pooled_api_call__(
+        partial(fetch_response, timeout=timeout, decoder=decoder), pool=blocking_pool
+    )
+    aio_fetch_fn: Callable = __pooled_api_call__(
+        partial(aio_fetch_response, base_url=base_url, timeout=timeout, decoder=decoder),
+        pool=session_pool,
+    )
+    # Every request sent is timed, each attempt and each hedged copy on its own.
+    if metrics is not None:
+        fetch_fn = __blocking_instrumented_api_call__(fetch_fn, metrics=metrics)
+        aio_fetch_fn = __instrumented_api_call__(aio_fetch_fn, metrics=metrics)
+    # Each attempt takes a key of its own, so a retry after a 429 goes out with another key.
+    if key_pool is not None:
+        fetch_fn = __blocking_key_pooled_api_call__(fetch_fn, pool=key_pool)
+        aio_fetch_fn = __key_pooled_api_call__(aio_fetch_fn, pool=key_pool)
+    if rate_limit is not None:
+        fetch_fn = __blocking_rate_limited_api_call__(fetch_fn, policy=rate_limit)
+        aio_fetch_fn = __rate_limited_api_call__(aio_fetch_fn, policy=rate_limit)
+    else:
+        fetch_fn = __blocking_unlimited_api_call__(fetch_fn)
+        aio_fetch_fn = __unlimited_api_call__(aio_fetch_fn)
+    # Each attempt and each hedged copy takes its own token of the rate limit.
+    # With a key pool, the Retry-After of a throttled key is kept by the pool and the retry goes out with another key.
+    if retry is not None:
+        fetch_fn = __blocking_resilient_api_call__(
+            fetch_fn, policy=retry, retry_after=key_pool is None, metrics=metrics
+        )
+        aio_fetch_fn = __resilient_api_call__(
+            aio_fetch_fn, policy=retry, retry_after=key_pool is None, metrics=metrics
+        )
+    # Dataset syncs send their own conditional requests and read the response envelopes.
+    aio_envelope_fn: Callable = aio_fetch_fn
+    if persistent_cache is not None:
+        fetch_fn = __blocking_persistent_cached_api_call__(
+            fetch_fn, backend=persistent_cache, base_url=base_url, metrics=metrics
+        )
+        aio_fetch_fn = __persistent_cached_api_call__(
+            aio_fetch_fn, backend=persistent_cache, base_url=base_url, metrics=metrics
+        )
+    fetch_fn = __blocking_data_api_call__(fetch_fn)
+    aio_fetch_fn = __data_api_call__(aio_fetch_fn)
+    if single_flight:
+        aio_fetch_fn = __single_flight_api_call__(aio_fetch_fn, base_url=base_url)
+    # Dataset crawls always go to the network and bypass the response cache.
+    aio_crawl_fn: Callable = aio_fetch_fn
+    if response_cache is not None:
+        fetch_fn = __blocking_cached_api_call__(
+            fetch_fn, cache=response_cache, base_url=base_url, metrics=metrics
+        )
+        aio_fetch_fn = __cached_api_call__(
+            aio_fetch_fn, cache=response_cache, base_url=base_url, metrics=metrics
+        )
+    fetch_fn = __blocking_local_api_call__(fetch_fn, datasets=datasets)
+    aio_fetch_fn = __local_api_call__(aio_fetch_fn, datasets=datasets)
+    client: dict = {
         "fetch": partial(
-            __safe_api_call__(fetch_data),
+            __safe_api_call__(fetch_fn),
             api_key=api_key,
             id=None,
             query=None,
             filter=None,
+            base_url=base_url,
+            headers=get_headers(api_key=api_key),
         ),
-        "aio_fetch": partial(__safe_api_call__(aio_fetch_data), api_key=api_key),
+        "aio_fetch": partial(__aio_safe_api_call__(aio_fetch_fn), api_key=api_key),
         # List of all movies, including the "The Lord of the Rings" and the "The Hobbit" trilogies
         "aio_fetch_all_movies": partial(
-            __safe_api_call__(aio_fetch_data),
+            __aio_safe_api_call__(aio_fetch_fn),
             endpoint="movie",
             api_key=api_key,
             id=None,
@@ -171,18 +2288,18 @@ def create_api_client(api_key: str) -> dict:
         ),
         # Request one specific movie
         "aio_fetch_movie_by_id": partial(
-            __safe_api_call__(aio_fetch_data), endpoint="movie", api_key=api_key
+            __aio_safe_api_call__(aio_fetch_fn), endpoint="movie", api_key=api_key
         ),
         # Request all movie quotes for one specific movie (only working for the LotR trilogy)
         "aio_fetch_movie_quote_by_id": partial(
-            __safe_api_call__(aio_fetch_data),
+            __aio_safe_api_call__(aio_fetch_fn),
             endpoint="movie",
             api_key=api_key,
             query="quote",
         ),
         # List of all movie quotes
         "aio_fetch_all_quotes": partial(
-            __safe_api_call__(aio_fetch_data),
+            __aio_safe_api_call__(aio_fetch_fn),
             endpoint="quote",
             api_key=api_key,
             id=None,
@@ -191,6 +2308,190 @@ def create_api_client(api_key: str) -> dict:
         ),
         # Request one specific movie quote
         "aio_fetch_quote_by_id": partial(
-            __safe_api_call__(aio_fetch_data), endpoint="quote", api_key=api_key
+            __aio_safe_api_call__(aio_fetch_fn), endpoint="quote", api_key=api_key
+        ),
+        # Request all movie quotes of one specific character
+        "aio_fetch_character_quote_by_id": partial(
+            __aio_safe_api_call__(aio_fetch_fn),
+            endpoint="character",
+            api_key=api_key,
+            query="quote",
+        ),
+        # Blocking API call yielding the documents one at a time as the body streams in
+        "stream_docs": partial(
+            __blocking_streamed_api_call__(
+                iter_docs, pool=blocking_pool, rate_limit=rate_limit, key_pool=key_pool
+            ),
+            api_key=api_key,
+            id=None,
+            query=None,
+            filter=None,
+            base_url=base_url,
+            timeout=timeout,
+            decoder=decoder,
+        ),
+        # Non-blocking API call yielding the documents one at a time as the body streams in
+        "aio_stream_docs": partial(
+            __streamed_api_call__(
+                aio_iter_docs, pool=session_pool, rate_limit=rate_limit, key_pool=key_pool
+            ),
+            api_key=api_key,
+            id=None,
+            query=None,
+            filter=None,
+            base_url=base_url,
+            timeout=timeout,
+            decoder=decoder,
         ),
+        # Close the shared session and release the pooled connections
+        "aio_close": partial(aio_close_session_pool, pool=session_pool),
+        # Close the shared blocking session and release its pooled connections
+        "close": partial(close_blocking_pool, pool=blocking_pool),
     }
+    # Page crawls queue behind the interactive lookups when rate limited.
+    crawl_options: dict = (
+        {} if rate_limit is None else {"priority": lotr_ratelimit_fp.PRIORITY_BULK}
+    )
+    # Iterate over all the movies, page by page
+    client["aio_iter_all_movies"] = partial(
+        aio_iter_pages, fetch=client["aio_fetch_all_movies"], **crawl_options
+    )
+    # Iterate over all the movie quotes, page by page
+    client["aio_iter_all_quotes"] = partial(
+        aio_iter_pages, fetch=client["aio_fetch_all_quotes"], **crawl_options
+    )
+    # Iterate over all the movie quotes for one specific movie, page by page
+    client["aio_iter_movie_quotes"] = partial(
+        aio_iter_pages, fetch=client["aio_fetch_movie_quote_by_id"], **crawl_options
+    )
+    # Download whole collections so that the calls on them are answered from memory
+    client["aio_load_datasets"] = partial(
+        aio_load_datasets,
+        fetch=partial(__aio_safe_api_call__(aio_crawl_fn), api_key=api_key),
+        datasets=datasets,
+        **crawl_options,
+    )
+    # Bring the local datasets up to date, downloading only the changed pages, and yield the changes
+    client["aio_sync_datasets"] = partial(
+        lotr_sync_fp.aio_iter_sync,
+        fetch=partial(__aio_safe_api_call__(aio_envelope_fn), api_key=api_key),
+        state=sync_state,
+        datasets=datasets,
+        indexes=DATASET_INDEXES,
+        **crawl_options,
+    )
+    for name, endpoint in (("movies", "movie"), ("quotes", "quote")):
+        # Export a whole collection to a NDJSON or columnar file, in constant memory and resumable
+        client[f"aio_export_{name}"] = partial(
+            lotr_export_fp.aio_export,
+            partial(
+                aio_iter_page_envelopes,
+                fetch=partial(
+                    __aio_safe_api_call__(aio_crawl_fn),
+                    api_key=api_key,
+                    endpoint=endpoint,
+                    id=None,
+                    query=None,
+                ),
+                **crawl_options,
+            ),
+        )
+    # Counters of the dataset sync
+    client["sync_stats"] = partial(lotr_sync_fp.sync_stats, sync_state)
+    # Ranked full-text search in the dialog of the loaded quotes
+    client["search_quotes"] = partial(
+        search_dataset, datasets, endpoint="quote", field="dialog"
+    )
+    for name, endpoint in (("quotes", "quote"), ("movies", "movie")):
+        # Request many documents by id with bounded concurrency, in the order of the ids
+        client[f"aio_fetch_{name}_by_ids"] = partial(
+            aio_fetch_by_ids, fetch=client["aio_fetch"], endpoint=endpoint, concurrency=batch_concurrency
+        )
+        # Same as above, yielding (id, document) as they arrive
+        client[f"aio_iter_{name}_by_ids"] = partial(
+            aio_iter_by_ids, fetch=client["aio_fetch"], endpoint=endpoint, concurrency=batch_concurrency
+        )
+    # Replace the movie and character ids of quotes with the documents, in batches
+    client["aio_hydrate_quotes"] = partial(
+        aio_hydrate_quotes,
+        {
+            endpoint: lotr_loader_fp.create_data_loader(
+                partial(
+                    __aio_load_by_ids__,
+                    fetch=client["aio_fetch"],
+                    endpoint=endpoint,
+                    concurrency=batch_concurrency,
+                )
+            )
+            for endpoint in ("movie", "character")
+        },
+    )
+    if response_cache is not None:
+        # Counters of the response cache
+        client["cache_stats"] = partial(lotr_cache_fp.cache_stats, response_cache)
+        # Remove all the cached responses
+        client["cache_clear"] = partial(lotr_cache_fp.cache_clear, response_cache)
+    if rate_limit is not None:
+        # Counters of the rate limit policy
+        client["rate_limit_stats"] = partial(lotr_ratelimit_fp.rate_limit_stats, rate_limit)
+    if retry is not None:
+        # Counters of the retries and hedged requests
+        client["retry_stats"] = partial(lotr_retry_fp.retry_stats, retry)
+    if key_pool is not None:
+        # Counters and remaining quota of each key
+        client["key_pool_stats"] = partial(lotr_keypool_fp.key_pool_stats, key_pool)
+    if metrics is not None:
+        # Counters and latency histograms of the requests
+        client["metrics_snapshot"] = partial(lotr_metrics_fp.metrics_snapshot, metrics)
+    return client
+
+
+@contextmanager
+def api_client(api_key: str, **options) -> Iterator[dict]:
+    """
+    Context manager version of create_api_client() for blocking usage.
+    The client can be shared by the threads of a ThreadPoolExecutor and
+    the pooled blocking session is closed when leaving the block.
+    ```
+    with lotr_api_fp.api_client(api_key="##YOUR_API_KEY##") as client:
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            outputs: list = list(executor.map(lambda endpoint: client["fetch"](endpoint=endpoint), ["movie", "quote"]))
+    ```
+
+    Args:
+        api_key (str): [API key]
+        **options: [Other keyword arguments of create_api_client()]
+
+    Yields:
+        dict: [API methods]
+    """
+    client: dict = create_api_client(api_key=api_key, **options)
+    try:
+        yield client
+    finally:
+        client["close"]()
+
+
+@asynccontextmanager
+async def aio_api_client(api_key: str, **options) -> AsyncIterator[dict]:
+    """
+    Async context manager version of create_api_client().
+    The pooled sessions are closed when leaving the block.
+    ```
+    async with lotr_api_fp.aio_api_client(api_key="##YOUR_API_KEY##") as client:
+        movies: dict = await client["aio_fetch_all_movies"]()
+    ```
+
+    Args:
+        api_key (str): [API key]
+        **options: [Other keyword arguments of create_api_client()]
+
+    Yields:
+        dict: [API methods]
+    """
+    client: dict = create_api_client(api_key=api_key, **options)
+    try:
+        yield client
+    finally:
+        await client["aio_close"]()
+        client["close"]()
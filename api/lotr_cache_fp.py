@@ -0,0 +1,369 @@
+from collections import OrderedDict
+from functools import partial
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, List, Tuple
+
+import api.lotr_json_fp as lotr_json_fp
+
+# Marker of a cache miss, so that any JSON value (including None) can be cached.
+MISSING: object = object()
+
+
+def create_response_cache(
+    max_entries: int = 1024,
+    max_bytes: int = 16 * 1024 * 1024,
+    ttl: float = 300.0,
+    endpoint_ttls: dict = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> dict:
+    """
+    Create an in-memory response cache with TTL expiry and LRU eviction.
+    Responses are keyed on the composed URL of the API call. The least recently used entries are evicted
+    once either the number of entries or their total JSON size goes over the limits.
+    Cached responses are shared between callers, so they should be treated as read-only.
+
+    Args:
+        max_entries (int): [Max number of cached responses]
+        max_bytes (int): [Max total size in bytes of the cached responses, measured on their JSON encoding]
+        ttl (float): [Default seconds for a response to stay fresh]
+        endpoint_ttls (dict): [Seconds to stay fresh per endpoint. E.g. {"movie": 86400, "quote": 3600}]
+        clock (Callable[[], float]): [Monotonic clock in seconds]
+
+    Returns:
+        dict: [Response cache]
+    """
+    return {
+        "entries": OrderedDict(),
+        "bytes": 0,
+        "max_entries": max_entries,
+        "max_bytes": max_bytes,
+        "ttl": ttl,
+        "endpoint_ttls": dict(endpoint_ttls or {}),
+        "clock": clock,
+        "lock": threading.Lock(),
+        "stats": {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0},
+    }
+
+
+def __drop__(cache: dict, key: str) -> None:
+    """
+    Remove an entry and account for its size. The cache lock must be held.
+    """
+    entry: Tuple[Any, float, int] = cache["entries"].pop(key)
+    cache["bytes"] -= entry[2]
+    return
+
+
+def cache_get(cache: dict, key: str) -> Any:
+    """
+    Look up a fresh response and mark it as recently used.
+
+    Args:
+        cache (dict): [Response cache created by create_response_cache()]
+        key (str): [Composed URL of the API call]
+
+    Returns:
+        Any: [Cached response, or MISSING if there is no fresh one]
+    """
+    with cache["lock"]:
+        entry: Tuple[Any, float, int] = cache["entries"].get(key)
+        if entry is None:
+            cache["stats"]["misses"] += 1
+            return MISSING
+        if entry[1] <= cache["clock"]():
+            __drop__(cache, key)
+            cache["stats"]["expirations"] += 1
+            cache["stats"]["misses"] += 1
+            return MISSING
+        cache["entries"].move_to_end(key)
+        cache["stats"]["hits"] += 1
+        return entry[0]
+
+
+def cache_set(cache: dict, key: str, value: Any, endpoint: str = None) -> None:
+    """
+    Store a response, then evict the least recently used entries beyond the limits.
+    A response larger than max_bytes on its own is not cached.
+
+    Args:
+        cache (dict): [Response cache created by create_response_cache()]
+        key (str): [Composed URL of the API call]
+        value (Any): [JSON response]
+        endpoint (str): [Endpoint of the API call, to pick its TTL]
+    """
+    size: int = len(json.dumps(value, separators=(",", ":")))
+    if size > cache["max_bytes"]:
+        return
+    ttl: float = cache["endpoint_ttls"].get(endpoint, cache["ttl"])
+    with cache["lock"]:
+        if key in cache["entries"]:
+            __drop__(cache, key)
+        cache["entries"][key] = (value, cache["clock"]() + ttl, size)
+        cache["bytes"] += size
+        while (
+            len(cache["entries"]) > cache["max_entries"]
+            or cache["bytes"] > cache["max_bytes"]
+        ):
+            __drop__(cache, next(iter(cache["entries"])))
+            cache["stats"]["evictions"] += 1
+    return
+
+
+def cache_clear(cache: dict) -> None:
+    """
+    Remove all the cached responses. The counters are kept.
+
+    Args:
+        cache (dict): [Response cache created by create_response_cache()]
+    """
+    with cache["lock"]:
+        cache["entries"].clear()
+        cache["bytes"] = 0
+    return
+
+
+def cache_stats(cache: dict) -> dict:
+    """
+    Return the counters of the cache.
+
+    Args:
+        cache (dict): [Response cache created by create_response_cache()]
+
+    Returns:
+        dict: [hits, misses, evictions, expirations, entries & bytes]
+    """
+    with cache["lock"]:
+        return {
+            **cache["stats"],
+            "entries": len(cache["entries"]),
+            "bytes": cache["bytes"],
+        }
+
+
+def create_sqlite_cache(
+    path: str,
+    max_bytes: int = 64 * 1024 * 1024,
+    ttl: float = 86400.0,
+    endpoint_ttls: dict = None,
+    compact_ratio: float = 0.8,
+    clock: Callable[[], float] = time.time,
+) -> dict:
+    """
+    Create a persistent cache backend stored in a single SQLite file, for warm starts across processes.
+    Responses are stored with their timestamp and validators (ETag, Last-Modified) so that stale entries
+    can be revalidated with a conditional request instead of being downloaded again.
+    The file is opened in WAL mode and memory-mapped, so several worker processes on one host can read
+    it at once while one of them writes. Once the stored responses go over max_bytes, the oldest ones are
+    deleted down to compact_ratio * max_bytes and the freed pages are given back to the file system.
+
+    A persistent cache backend is a dictionary of functions, so that any other store can be plugged in:
+    ```
+    "get": (key) -> {"data", "stored_at", "etag", "last_modified", "endpoint"} or None
+    "set": (key, data, endpoint, etag, last_modified) -> None
+    "touch": (key) -> None  # renew stored_at after a 304 Not Modified
+    "close": () -> None
+    "counters": () -> dict  # hits, misses, writes, evictions, compactions, entries & bytes
+    "ttl", "endpoint_ttls", "clock": freshness settings used by is_fresh()
+    ```
+
+    Args:
+        path (str): [Path of the SQLite file]
+        max_bytes (int): [Max total size in bytes of the stored responses]
+        ttl (float): [Default seconds for a response to stay fresh]
+        endpoint_ttls (dict): [Seconds to stay fresh per endpoint. E.g. {"movie": 604800}]
+        compact_ratio (float): [Fraction of max_bytes kept after a compaction]
+        clock (Callable[[], float]): [Wall clock in seconds, shared by all the processes]
+
+    Returns:
+        dict: [Persistent cache backend]
+    """
+    connection: sqlite3.Connection = sqlite3.connect(
+        path, timeout=30.0, isolation_level=None, check_same_thread=False
+    )
+    # auto_vacuum only takes effect when set before the first table is created.
+    connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(f"PRAGMA mmap_size={max(max_bytes * 2, 1024 * 1024)}")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS responses ("
+        " key TEXT PRIMARY KEY,"
+        " endpoint TEXT,"
+        " body TEXT NOT NULL,"
+        " size INTEGER NOT NULL,"
+        " stored_at REAL NOT NULL,"
+        " etag TEXT,"
+        " last_modified TEXT)"
+    )
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS responses_stored_at ON responses (stored_at)"
+    )
+    backend: dict = {
+        "path": path,
+        "connection": connection,
+        "lock": threading.Lock(),
+        "max_bytes": max_bytes,
+        "compact_ratio": compact_ratio,
+        "ttl": ttl,
+        "endpoint_ttls": dict(endpoint_ttls or {}),
+        "clock": clock,
+        "stats": {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "compactions": 0},
+    }
+    backend["get"] = partial(__sqlite_get__, backend)
+    backend["set"] = partial(__sqlite_set__, backend)
+    backend["touch"] = partial(__sqlite_touch__, backend)
+    backend["close"] = partial(__sqlite_close__, backend)
+    backend["counters"] = partial(__sqlite_stats__, backend)
+    return backend
+
+
+def __sqlite_get__(backend: dict, key: str) -> dict:
+    """
+    Read a stored response of the SQLite backend, or None.
+    """
+    with backend["lock"]:
+        row: tuple = (
+            backend["connection"]
+            .execute(
+                "SELECT body, stored_at, etag, last_modified, endpoint FROM responses WHERE key = ?",
+                (key,),
+            )
+            .fetchone()
+        )
+        backend["stats"]["misses" if row is None else "hits"] += 1
+    if row is None:
+        return None
+    return {
+        "data": lotr_json_fp.loads(row[0]),
+        "stored_at": row[1],
+        "etag": row[2],
+        "last_modified": row[3],
+        "endpoint": row[4],
+    }
+
+
+def __sqlite_set__(
+    backend: dict,
+    key: str,
+    data: Any,
+    endpoint: str = None,
+    etag: str = None,
+    last_modified: str = None,
+) -> None:
+    """
+    Store a response in the SQLite backend and compact the file when it goes over max_bytes.
+    """
+    body: str = json.dumps(data, separators=(",", ":"))
+    with backend["lock"]:
+        connection: sqlite3.Connection = backend["connection"]
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, endpoint, body, size, stored_at, etag, last_modified)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, body, len(body), backend["clock"](), etag, last_modified),
+            )
+            evicted: int = __sqlite_evict__(backend)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        backend["stats"]["writes"] += 1
+        if evicted:
+            backend["stats"]["evictions"] += evicted
+            backend["stats"]["compactions"] += 1
+            connection.execute("PRAGMA incremental_vacuum")
+    return
+
+
+def __sqlite_evict__(backend: dict) -> int:
+    """
+    Delete the oldest responses once the total size goes over max_bytes. Runs inside the write transaction.
+
+    Returns:
+        int: [Number of deleted responses]
+    """
+    connection: sqlite3.Connection = backend["connection"]
+    total: int = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= backend["max_bytes"]:
+        return 0
+    target: float = backend["max_bytes"] * backend["compact_ratio"]
+    keys: List[tuple] = []
+    for key, size in connection.execute("SELECT key, size FROM responses ORDER BY stored_at"):
+        if total <= target:
+            break
+        keys.append((key,))
+        total -= size
+    connection.executemany("DELETE FROM responses WHERE key = ?", keys)
+    return len(keys)
+
+
+def __sqlite_touch__(backend: dict, key: str) -> None:
+    """
+    Renew the timestamp of a stored response after a 304 Not Modified.
+    """
+    with backend["lock"]:
+        backend["connection"].execute(
+            "UPDATE responses SET stored_at = ? WHERE key = ?", (backend["clock"](), key)
+        )
+    return
+
+
+def __sqlite_close__(backend: dict) -> None:
+    """
+    Close the SQLite connection of the backend.
+    """
+    with backend["lock"]:
+        backend["connection"].close()
+    return
+
+
+def __sqlite_stats__(backend: dict) -> dict:
+    """
+    Return the counters of the SQLite backend with the number and size of the stored responses.
+    """
+    with backend["lock"]:
+        entries, size = (
+            backend["connection"]
+            .execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses")
+            .fetchone()
+        )
+        return {**backend["stats"], "entries": entries, "bytes": size}
+
+
+def is_fresh(backend: dict, entry: dict, endpoint: str = None) -> bool:
+    """
+    Tell whether a stored entry of a persistent cache backend can be served without revalidation.
+
+    Args:
+        backend (dict): [Persistent cache backend]
+        entry (dict): [Stored entry returned by backend["get"]]
+        endpoint (str): [Endpoint of the API call, to pick its TTL]
+
+    Returns:
+        bool: [True if the entry is younger than its TTL]
+    """
+    ttl: float = backend["endpoint_ttls"].get(endpoint, backend["ttl"])
+    return backend["clock"]() - entry["stored_at"] < ttl
+
+
+def validators_of(entry: dict) -> dict:
+    """
+    Build the conditional request headers revalidating a stored entry.
+
+    Args:
+        entry (dict): [Stored entry returned by backend["get"]]
+
+    Returns:
+        dict: [If-None-Match / If-Modified-Since headers, or None without any validator]
+    """
+    validators: dict = {}
+    if entry.get("etag"):
+        validators["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        validators["If-Modified-Since"] = entry["last_modified"]
+    return validators or None
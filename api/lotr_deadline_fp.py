@@ -0,0 +1,89 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+from typing import Iterator
+
+# Monotonic time by which the calls of the current context must be done, None without a deadline.
+# Tasks copy the context they are created in, so a deadline set around a batch or a crawl
+# is carried to every sub-request of it.
+DEADLINE: ContextVar = ContextVar("lotr_deadline", default=None)
+
+
+def create_timeout(total: float = 30.0, connect: float = 10.0, read: float = 30.0) -> dict:
+    """
+    Create the timeouts of one HTTP request.
+
+    Args:
+        total (float): [Max seconds for the whole request, connection and body included]
+        connect (float): [Max seconds to get a connection, waiting for a free pooled one included]
+        read (float): [Max seconds between two reads of the response]
+
+    Returns:
+        dict: [Timeouts]
+    """
+    return {"total": total, "connect": connect, "read": read}
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """
+    Give a budget of time to all the calls made in the block, shared by the batches and the crawls in it.
+    A deadline inside another one can only shorten it.
+    ```
+    with lotr_deadline_fp.deadline(2.0):
+        quotes = await client["aio_fetch_quotes_by_ids"](ids)
+    ```
+
+    Args:
+        seconds (float): [Budget in seconds from now]
+
+    Yields:
+        float: [Monotonic time of the deadline]
+    """
+    at: float = time.monotonic() + seconds
+    outer: float = DEADLINE.get()
+    if outer is not None:
+        at = min(at, outer)
+    token = DEADLINE.set(at)
+    try:
+        yield at
+    finally:
+        DEADLINE.reset(token)
+
+
+def remaining() -> float:
+    """
+    Return the seconds left before the deadline of the current context.
+
+    Returns:
+        float: [Seconds left, 0 once passed, or None without a deadline]
+    """
+    at: float = DEADLINE.get()
+    if at is None:
+        return None
+    return max(at - time.monotonic(), 0.0)
+
+
+def request_timeout(timeout: dict = None) -> dict:
+    """
+    Cut the timeouts of a request down to the time left before the deadline of the current context.
+
+    Args:
+        timeout (dict): [Timeouts created by create_timeout(). No timeout if None]
+
+    Raises:
+        asyncio.TimeoutError: [The deadline has passed]
+
+    Returns:
+        dict: [Timeouts of the request, None values meaning no limit]
+    """
+    timeout = timeout or {"total": None, "connect": None, "read": None}
+    left: float = remaining()
+    if left is None:
+        return dict(timeout)
+    if left <= 0:
+        raise asyncio.TimeoutError("Deadline exceeded")
+    return {
+        name: left if value is None else min(value, left) for name, value in timeout.items()
+    }
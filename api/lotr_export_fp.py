@@ -0,0 +1,462 @@
+import asyncio
+from array import array
+import bz2
+from functools import partial
+import gzip
+import json
+import lzma
+import os
+import struct
+import sys
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List
+
+import api.lotr_store_fp as lotr_store_fp
+
+FORMAT_NDJSON: str = "ndjson"
+FORMAT_COLUMNAR: str = "columnar"
+
+# Codecs of the optional compression. Each page is compressed on its own,
+# which the readers of gzip / bz2 / xz files take as one stream, so the file is valid at every checkpoint.
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": partial(gzip.compress, compresslevel=6),
+    "bz2": bz2.compress,
+    "xz": lzma.compress,
+}
+DECOMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": gzip.decompress,
+    "bz2": bz2.decompress,
+    "xz": lzma.decompress,
+}
+
+# Columnar file: magic, file header, then one block per page, each prefixed with its length.
+COLUMNAR_MAGIC: bytes = b"LOTRCOL1"
+__LENGTH__: struct.Struct = struct.Struct(">I")
+
+# Marker of a field missing from a document.
+MISSING: object = lotr_store_fp.MISSING
+
+
+def checkpoint_path(path: str) -> str:
+    """
+    Return the path of the checkpoint of an export, kept next to the file until the export is complete.
+
+    Args:
+        path (str): [Path of the exported file]
+
+    Returns:
+        str: [Path of the checkpoint]
+    """
+    return path + ".checkpoint"
+
+
+def __load_checkpoint__(path: str) -> dict:
+    try:
+        with open(checkpoint_path(path), "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def __save_checkpoint__(path: str, checkpoint: dict) -> None:
+    # Written aside then renamed, so that a crash leaves either the old or the new checkpoint.
+    temporary: str = checkpoint_path(path) + ".tmp"
+    with open(temporary, "w") as file:
+        json.dump(checkpoint, file)
+    os.replace(temporary, checkpoint_path(path))
+    return
+
+
+def __little_endian__(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def __from_little_endian__(typecode: str, data: bytes) -> array:
+    values: array = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def __column_kind__(values: List[Any]) -> str:
+    """
+    Pick the encoding of a column from the values present in it.
+    """
+    if not values:
+        return lotr_store_fp.KIND_OBJECT
+    if all(type(value) is str for value in values):
+        if all(lotr_store_fp.OBJECT_ID_PATTERN.match(value) for value in values):
+            return lotr_store_fp.KIND_OID
+        return lotr_store_fp.KIND_TEXT
+    if all(
+        type(value) is int and lotr_store_fp.INT64_MIN <= value <= lotr_store_fp.INT64_MAX
+        for value in values
+    ):
+        return lotr_store_fp.KIND_INT
+    if all(type(value) is float for value in values):
+        return lotr_store_fp.KIND_FLOAT
+    return lotr_store_fp.KIND_OBJECT
+
+
+def __encode_column__(values: List[Any], dictionary: Dict[str, int], new_ids: List[str]) -> tuple:
+    """
+    Encode the values of one field in a block.
+    ObjectIds are dictionary-encoded: the column holds their index in the dictionary of the file,
+    which each block extends with the ids it is the first to hold.
+    """
+    missing: List[int] = [position for position, value in enumerate(values) if value is MISSING]
+    present: List[Any] = [value for value in values if value is not MISSING]
+    kind: str = __column_kind__(present)
+    if kind == lotr_store_fp.KIND_OID:
+        indexes: array = array("i")
+        for value in values:
+            if value is MISSING:
+                indexes.append(-1)
+                continue
+            index: int = dictionary.get(value)
+            if index is None:
+                index = len(dictionary)
+                dictionary[value] = index
+                new_ids.append(value)
+            indexes.append(index)
+        data: bytes = __little_endian__(indexes)
+    elif kind == lotr_store_fp.KIND_TEXT:
+        encoded: List[bytes] = [b"" if value is MISSING else value.encode("utf-8") for value in values]
+        offsets: array = array("I", [0])
+        for text in encoded:
+            offsets.append(offsets[-1] + len(text))
+        data = __little_endian__(offsets) + b"".join(encoded)
+    elif kind == lotr_store_fp.KIND_INT:
+        data = __little_endian__(array("q", (0 if value is MISSING else value for value in values)))
+    elif kind == lotr_store_fp.KIND_FLOAT:
+        data = __little_endian__(array("d", (0.0 if value is MISSING else value for value in values)))
+    else:
+        data = json.dumps([None if value is MISSING else value for value in values]).encode("utf-8")
+    return kind, data, missing
+
+
+def encode_columnar_block(docs: List[dict], dictionary: Dict[str, int]) -> bytes:
+    """
+    Encode a page of documents as one block of a columnar file, uncompressed: one column per field.
+
+    Args:
+        docs (List[dict]): [Documents of the page]
+        dictionary (Dict[str, int]): [ObjectIds of the file by index, extended in place with the new ones]
+
+    Returns:
+        bytes: [Block: header length, JSON header, new ObjectIds of 12 bytes each, then each column]
+    """
+    fields: Dict[str, None] = {}
+    for doc in docs:
+        fields.update(dict.fromkeys(doc))
+    new_ids: List[str] = []
+    columns: List[dict] = []
+    buffers: List[bytes] = []
+    for field in fields:
+        kind, data, missing = __encode_column__(
+            [doc.get(field, MISSING) for doc in docs], dictionary, new_ids
+        )
+        columns.append({"name": field, "kind": kind, "size": len(data), "missing": missing})
+        buffers.append(data)
+    header: bytes = json.dumps(
+        {"count": len(docs), "dictionary": len(new_ids), "columns": columns}
+    ).encode("utf-8")
+    return b"".join(
+        [__LENGTH__.pack(len(header)), header, b"".join(bytes.fromhex(id) for id in new_ids)] + buffers
+    )
+
+
+def __decode_column__(column: dict, data: bytes, count: int, ids: List[str]) -> List[Any]:
+    kind: str = column["kind"]
+    if kind == lotr_store_fp.KIND_OID:
+        values: List[Any] = [None if index < 0 else ids[index] for index in __from_little_endian__("i", data)]
+    elif kind == lotr_store_fp.KIND_TEXT:
+        offsets: array = __from_little_endian__("I", data[: 4 * (count + 1)])
+        text: bytes = data[4 * (count + 1) :]
+        values = [text[offsets[position] : offsets[position + 1]].decode("utf-8") for position in range(count)]
+    elif kind == lotr_store_fp.KIND_INT:
+        values = list(__from_little_endian__("q", data))
+    elif kind == lotr_store_fp.KIND_FLOAT:
+        values = list(__from_little_endian__("d", data))
+    else:
+        values = json.loads(data)
+    for position in column["missing"]:
+        values[position] = MISSING
+    return values
+
+
+def decode_columnar_block(block: bytes, ids: List[str], fields: Iterable[str] = None) -> tuple:
+    """
+    Decode one block of a columnar file, uncompressed.
+
+    Args:
+        block (bytes): [Block encoded by encode_columnar_block()]
+        ids (List[str]): [ObjectIds of the file by index, extended in place with the new ones of the block]
+        fields (Iterable[str]): [Columns to be decoded, the others being skipped. All of them if None]
+
+    Returns:
+        tuple: [(number of documents, {field: values}), MISSING where a document has no such field]
+    """
+    (length,) = __LENGTH__.unpack_from(block)
+    header: dict = json.loads(block[__LENGTH__.size : __LENGTH__.size + length])
+    position: int = __LENGTH__.size + length
+    for _ in range(header["dictionary"]):
+        ids.append(block[position : position + 12].hex())
+        position += 12
+    wanted: set = None if fields is None else set(fields)
+    columns: Dict[str, List[Any]] = {}
+    for column in header["columns"]:
+        if wanted is None or column["name"] in wanted:
+            columns[column["name"]] = __decode_column__(
+                column, block[position : position + column["size"]], header["count"], ids
+            )
+        position += column["size"]
+    return header["count"], columns
+
+
+def __columnar_header__(compression: str) -> bytes:
+    header: bytes = json.dumps({"version": 1, "compression": compression}).encode("utf-8")
+    return COLUMNAR_MAGIC + __LENGTH__.pack(len(header)) + header
+
+
+def __read_columnar__(file) -> Iterator[bytes]:
+    """
+    Read the header of a columnar file, then yield its blocks uncompressed.
+    """
+    if file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError("Not a columnar export file")
+    (length,) = __LENGTH__.unpack(file.read(__LENGTH__.size))
+    compression: str = json.loads(file.read(length))["compression"]
+    while True:
+        prefix: bytes = file.read(__LENGTH__.size)
+        if not prefix:
+            return
+        (length,) = __LENGTH__.unpack(prefix)
+        block: bytes = file.read(length)
+        yield block if compression is None else DECOMPRESSORS[compression](block)
+
+
+def iter_columnar_blocks(path: str, fields: Iterable[str] = None) -> Iterator[Dict[str, List[Any]]]:
+    """
+    Read a columnar export one block (page) at a time, decoding only the columns wanted.
+    ```
+    for columns in lotr_export_fp.iter_columnar_blocks("quotes.lcol", fields=("character",)):
+        counts.update(columns["character"])
+    ```
+
+    Args:
+        path (str): [Path of the columnar file]
+        fields (Iterable[str]): [Columns to be decoded. All of them if None]
+
+    Yields:
+        Dict[str, List[Any]]: [{field: values of the block}, None where a document has no such field]
+    """
+    ids: List[str] = []
+    with open(path, "rb") as file:
+        for block in __read_columnar__(file):
+            _, columns = decode_columnar_block(block, ids, fields)
+            yield {
+                name: [None if value is MISSING else value for value in values]
+                for name, values in columns.items()
+            }
+    return
+
+
+def iter_columnar(path: str) -> Iterator[dict]:
+    """
+    Read the documents of a columnar export back, in order.
+
+    Args:
+        path (str): [Path of the columnar file]
+
+    Yields:
+        dict: [documents]
+    """
+    ids: List[str] = []
+    with open(path, "rb") as file:
+        for block in __read_columnar__(file):
+            count, columns = decode_columnar_block(block, ids)
+            for position in range(count):
+                yield {
+                    name: values[position]
+                    for name, values in columns.items()
+                    if values[position] is not MISSING
+                }
+    return
+
+
+def create_export_writer(
+    path: str, format: str = FORMAT_NDJSON, compression: str = None, offset: int = None
+) -> dict:
+    """
+    Open the file of an export, to append the pages to it.
+
+    Args:
+        path (str): [Path of the exported file]
+        format (str): [FORMAT_NDJSON for one JSON document per line, or FORMAT_COLUMNAR for one column per field]
+        compression (str): [Compression of each page: "gzip", "bz2" or "xz". None for no compression]
+        offset (int): [Size of the file at the last checkpoint, the rest being cut off. A new file is written if None]
+
+    Returns:
+        dict: [Export writer]
+    """
+    if format not in (FORMAT_NDJSON, FORMAT_COLUMNAR):
+        raise ValueError(f"Unknown export format: {format}")
+    if compression is not None and compression not in COMPRESSORS:
+        raise ValueError(f"Unknown compression: {compression}")
+    dictionary: Dict[str, int] = {}
+    if offset is None:
+        file = open(path, "wb")
+        if format == FORMAT_COLUMNAR:
+            file.write(__columnar_header__(compression))
+    else:
+        file = open(path, "r+b")
+        file.truncate(offset)
+        if format == FORMAT_COLUMNAR:
+            # The ObjectIds already in the file are indexed again to go on with the same dictionary.
+            ids: List[str] = []
+            for block in __read_columnar__(file):
+                decode_columnar_block(block, ids, fields=())
+            dictionary = {id: index for index, id in enumerate(ids)}
+        file.seek(0, os.SEEK_END)
+    return {
+        "path": path,
+        "format": format,
+        "compression": compression,
+        "file": file,
+        "dictionary": dictionary,
+    }
+
+
+def export_write(writer: dict, docs: List[dict], fsync: bool = True) -> int:
+    """
+    Append a page of documents to the file, flushed to the disk.
+
+    Args:
+        writer (dict): [Export writer created by create_export_writer()]
+        docs (List[dict]): [Documents of the page]
+        fsync (bool): [Wait for the page to be on the disk, so that a checkpoint taken after it survives a crash]
+
+    Returns:
+        int: [Size of the file]
+    """
+    if writer["format"] == FORMAT_NDJSON:
+        data: bytes = "".join(
+            json.dumps(doc, ensure_ascii=False, separators=(",", ":")) + "\n" for doc in docs
+        ).encode("utf-8")
+    else:
+        data = encode_columnar_block(docs, writer["dictionary"])
+    if writer["compression"] is not None:
+        data = COMPRESSORS[writer["compression"]](data)
+    file = writer["file"]
+    if writer["format"] == FORMAT_COLUMNAR:
+        file.write(__LENGTH__.pack(len(data)))
+    file.write(data)
+    file.flush()
+    if fsync:
+        os.fsync(file.fileno())
+    return file.tell()
+
+
+def close_export_writer(writer: dict) -> None:
+    """
+    Close the file of an export.
+
+    Args:
+        writer (dict): [Export writer created by create_export_writer()]
+    """
+    writer["file"].close()
+    return
+
+
+async def aio_export(
+    iter_pages: Callable,
+    path: str,
+    format: str = FORMAT_NDJSON,
+    compression: str = None,
+    filter: str = None,
+    page_size: int = 1000,
+    window: int = 2,
+    fsync: bool = True,
+    **params,
+) -> dict:
+    """
+    Export all the documents of a paginated API call to a file, in constant memory.
+    The pages are fetched ahead, at most 'window' of them, and each page is encoded,
+    compressed and appended to the file in a worker thread before the next one is taken: a slow disk holds
+    the fetching back instead of pages piling up in memory.
+    A checkpoint next to the file records the last page written and the size of the file then.
+    An export that failed is resumed from there by calling it again with the same arguments,
+    the bytes written after the checkpoint being cut off. The checkpoint is removed once the export is complete.
+    The documents are only consistent with one another if the collection does not change in between.
+    ```
+    stats: dict = await client["aio_export_quotes"]("quotes.ndjson.gz", compression="gzip")
+    ```
+
+    Args:
+        iter_pages (Callable): [Async iterator of (page number, page envelope) from the first_page given.
+                                E.g. partial(lotr_api_fp.aio_iter_page_envelopes, fetch=client["aio_fetch_all_quotes"])]
+        path (str): [Path of the exported file]
+        format (str): [FORMAT_NDJSON for one JSON document per line, or FORMAT_COLUMNAR for one column per field,
+                       ObjectIds being dictionary-encoded. See iter_columnar() to read it]
+        compression (str): [Compression of each page: "gzip", "bz2" or "xz". None for no compression]
+        filter (str): [Filtering of the result, without limit & page]
+        page_size (int): [Number of documents per page. Must stay the same to resume]
+        window (int): [Max number of pages being fetched ahead]
+        fsync (bool): [Wait for each page to be on the disk before its checkpoint]
+        **params: [Other keyword arguments of iter_pages. E.g. priority]
+
+    Raises:
+        ValueError: [The checkpoint found is of an export with other arguments]
+        RuntimeError: [A page could not be fetched. The export can be resumed]
+
+    Returns:
+        dict: [{"first_page": page the export started from, "pages": pages written, "documents": documents written, "bytes": size of the file}]
+    """
+    settings: dict = {
+        "format": format,
+        "compression": compression,
+        "filter": filter,
+        "page_size": page_size,
+    }
+    # The files are read and written in the default executor: a slow disk does not stall the other requests.
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    checkpoint: dict = await loop.run_in_executor(None, __load_checkpoint__, path)
+    if checkpoint is not None and checkpoint["settings"] != settings:
+        raise ValueError(f"The checkpoint of {path} is of another export: {checkpoint['settings']}")
+    first_page: int = 1 if checkpoint is None else checkpoint["next_page"]
+    writer: dict = await loop.run_in_executor(
+        None,
+        partial(
+            create_export_writer,
+            path,
+            format=format,
+            compression=compression,
+            offset=None if checkpoint is None else checkpoint["offset"],
+        ),
+    )
+    stats: dict = {"first_page": first_page, "pages": 0, "documents": 0, "bytes": writer["file"].tell()}
+    pages: AsyncIterator[tuple] = iter_pages(
+        filter=filter, page_size=page_size, window=window, first_page=first_page, **params
+    )
+    try:
+        async for page, envelope in pages:
+            stats["bytes"] = await loop.run_in_executor(
+                None, partial(export_write, writer, envelope["docs"], fsync=fsync)
+            )
+            stats["pages"] += 1
+            stats["documents"] += len(envelope["docs"])
+            await loop.run_in_executor(
+                None,
+                __save_checkpoint__,
+                path,
+                {"settings": settings, "next_page": page + 1, "offset": stats["bytes"]},
+            )
+    finally:
+        await pages.aclose()
+        await loop.run_in_executor(None, close_export_writer, writer)
+    await loop.run_in_executor(None, os.remove, checkpoint_path(path))
+    return stats
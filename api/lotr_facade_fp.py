@@ -0,0 +1,218 @@
+import asyncio
+from contextlib import contextmanager
+from functools import partial
+import inspect
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Sequence
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_deadline_fp as lotr_deadline_fp
+
+# Number of items of an async iterator carried over to the calling thread at once.
+ITER_CHUNK_SIZE: int = 100
+
+
+def create_facade_client(api_key: str, batch_concurrency: int = 8, **options) -> dict:
+    """
+    Return the blocking version of the non-blocking client, for code that can not be rewritten with asyncio.
+    The facade owns an event loop running in a background thread, holding the pooled aiohttp session,
+    and each method runs its aio_* counterpart on that loop, blocking the calling thread only until its result is ready.
+    A batch of calls is therefore sent concurrently over the pooled connections instead of one after the other,
+    and the pages of a crawl are prefetched while the previous ones are being consumed.
+    The facade can be shared by several threads. Call 'close' once done, or use facade_client().
+    ```
+    facade: dict = lotr_facade_fp.create_facade_client(api_key="##YOUR_API_KEY##")
+    movies: List[dict] = facade["fetch_movies_by_ids"](movie_ids)
+    outputs: list = facade["fetch_many"]([{"endpoint": "movie"}, {"endpoint": "quote", "filter": "limit=10"}])
+    for quote in facade["iter_all_quotes"](page_size=1000):
+        ...
+    facade["close"]()
+    ```
+
+    Args:
+        api_key (str): [API key]
+        batch_concurrency (int): [Max number of calls at once of the batches, e.g. 'fetch_many' & 'fetch_quotes_by_ids']
+        **options: [Other keyword arguments of lotr_api_fp.create_api_client()]
+
+    Returns:
+        dict [API methods, named after the aio_* methods of the client without the prefix]
+
+        # Single calls
+        'fetch', 'fetch_all_movies', 'fetch_movie_by_id', 'fetch_movie_quote_by_id',
+        'fetch_all_quotes', 'fetch_quote_by_id', 'fetch_character_quote_by_id'
+
+        # Many calls at once, in the order of the calls
+        'fetch_many'
+
+        # Batches of the client
+        'fetch_quotes_by_ids', 'fetch_movies_by_ids', 'hydrate_quotes', 'load_datasets'
+
+        # Iterators, the pages being prefetched on the event loop
+        'iter_all_movies', 'iter_all_quotes', 'iter_movie_quotes', 'iter_quotes_by_ids', 'iter_movies_by_ids',
+        'stream_docs', 'sync_datasets'
+
+        # The other methods of the client as they are
+        'cache_stats', 'search_quotes', 'sync_stats'...
+
+        # Close the pooled sessions and stop the event loop
+        'close'
+    """
+    client: dict = lotr_api_fp.create_api_client(
+        api_key=api_key, batch_concurrency=batch_concurrency, **options
+    )
+    loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+    thread: threading.Thread = threading.Thread(
+        target=loop.run_forever, name="lotr-event-loop", daemon=True
+    )
+    thread.start()
+    facade: dict = {"loop": loop, "thread": thread, "closed": False}
+    methods: dict = {
+        name: method for name, method in client.items() if not name.startswith("aio_")
+    }
+    for name, method in client.items():
+        if not name.startswith("aio_") or name == "aio_close":
+            continue
+        if inspect.isasyncgenfunction(method):
+            methods[name[len("aio_") :]] = partial(__blocking_iter__, facade, method)
+        elif inspect.iscoroutinefunction(method):
+            methods[name[len("aio_") :]] = partial(__blocking_call__, facade, method)
+    # Single call
+    methods["fetch"] = partial(methods["fetch"], id=None, query=None, filter=None)
+    # Many calls at once, in the order of the calls
+    methods["fetch_many"] = partial(
+        __blocking_call__,
+        facade,
+        partial(aio_fetch_many, fetch=client["aio_fetch"], concurrency=batch_concurrency),
+    )
+    # Close the pooled sessions and stop the event loop
+    methods["close"] = partial(close_facade_client, facade, client)
+    return methods
+
+
+async def aio_fetch_many(
+    calls: Sequence[dict], fetch: Callable, concurrency: int = 8
+) -> List[Any]:
+    """
+    Make many API calls at once, with bounded concurrency.
+
+    Args:
+        calls (Sequence[dict]): [Keyword arguments of each call. E.g. {"endpoint": "movie", "id": movie_id}]
+        fetch (Callable): [non-blocking API call. E.g. client["aio_fetch"]]
+        concurrency (int): [Max number of calls at once]
+
+    Returns:
+        List[Any]: [Output of each call, in the order of the calls]
+    """
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(call: dict) -> Any:
+        async with semaphore:
+            return await fetch(**{"id": None, "query": None, "filter": None, **call})
+
+    return await asyncio.gather(*(fetch_one(call) for call in calls))
+
+
+async def __with_deadline__(awaitable: Awaitable, at: float) -> Any:
+    # The task running on the loop does not share the context of the calling thread: the deadline is carried over.
+    if at is not None:
+        lotr_deadline_fp.DEADLINE.set(at)
+    return await awaitable
+
+
+def __run__(facade: dict, awaitable: Awaitable) -> Any:
+    """
+    Run an awaitable on the event loop of the facade and block until its result is ready.
+    """
+    if facade["closed"]:
+        awaitable.close()
+        raise RuntimeError("The facade client is closed")
+    if threading.current_thread() is facade["thread"]:
+        awaitable.close()
+        raise RuntimeError("The facade client can not be called from its own event loop")
+    future = asyncio.run_coroutine_threadsafe(
+        __with_deadline__(awaitable, lotr_deadline_fp.DEADLINE.get()), facade["loop"]
+    )
+    try:
+        return future.result()
+    except BaseException:
+        # E.g. KeyboardInterrupt in the calling thread: the call is not left running on the loop.
+        future.cancel()
+        raise
+
+
+def __blocking_call__(facade: dict, fn: Callable, *args, **kwargs) -> Any:
+    """
+    Blocking version of a non-blocking method of the client.
+    """
+    return __run__(facade, fn(*args, **kwargs))
+
+
+async def __take__(iterator: AsyncIterator, count: int) -> list:
+    items: list = []
+    async for item in iterator:
+        items.append(item)
+        if len(items) >= count:
+            break
+    return items
+
+
+def __blocking_iter__(facade: dict, fn: Callable, *args, **kwargs) -> Iterator[Any]:
+    """
+    Blocking version of an async iterator method of the client.
+    The items are carried over to the calling thread in chunks, the iterator going on with its prefetching in between.
+    """
+    iterator: AsyncIterator = fn(*args, **kwargs)
+    try:
+        while True:
+            items: list = __run__(facade, __take__(iterator, ITER_CHUNK_SIZE))
+            yield from items
+            if len(items) < ITER_CHUNK_SIZE:
+                return
+    finally:
+        if not facade["closed"]:
+            __run__(facade, iterator.aclose())
+
+
+def close_facade_client(facade: dict, client: dict) -> None:
+    """
+    Close the pooled sessions of the client and stop the event loop of the facade.
+
+    Args:
+        facade (dict): [State of the facade]
+        client (dict): [Non-blocking client run by the facade]
+    """
+    if facade["closed"]:
+        return
+    try:
+        __run__(facade, client["aio_close"]())
+    finally:
+        facade["closed"] = True
+        facade["loop"].call_soon_threadsafe(facade["loop"].stop)
+        facade["thread"].join()
+        facade["loop"].close()
+        client["close"]()
+    return
+
+
+@contextmanager
+def facade_client(api_key: str, **options) -> Iterator[dict]:
+    """
+    Context manager version of create_facade_client().
+    The event loop is stopped and the pooled sessions closed when leaving the block.
+    ```
+    with lotr_facade_fp.facade_client(api_key="##YOUR_API_KEY##") as facade:
+        quotes: List[dict] = facade["fetch_quotes_by_ids"](quote_ids)
+    ```
+
+    Args:
+        api_key (str): [API key]
+        **options: [Other keyword arguments of create_facade_client()]
+
+    Yields:
+        dict: [API methods]
+    """
+    facade: dict = create_facade_client(api_key=api_key, **options)
+    try:
+        yield facade
+    finally:
+        facade["close"]()
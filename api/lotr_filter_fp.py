@@ -0,0 +1,303 @@
+from functools import lru_cache
+import math
+import re
+from typing import Any, Callable, List, Sequence, Set, Tuple
+from urllib.parse import unquote
+
+import api.lotr_store_fp as lotr_store_fp
+
+# Default page size of the-one-api list endpoints.
+DEFAULT_LIMIT: int = 1000
+
+# Match the operator of one filter expression. Longer operators first, so that "<=" is not read as "<".
+FILTER_PATTERN = re.compile(r"^(?P<field>[^!=<>]+)(?P<operator>!=|<=|>=|=|<|>)(?P<value>.*)$")
+REGEX_PATTERN = re.compile(r"^/(?P<pattern>.*)/(?P<flags>[a-z]*)$", re.DOTALL)
+NUMBER_PATTERN = re.compile(r"^-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$")
+OBJECT_ID_PATTERN = re.compile(r"^[0-9a-fA-F]{24}$")
+REGEX_FLAGS: dict = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL}
+
+
+def cast_value(value: str) -> Any:
+    """
+    Cast a filter value the way the API gateway server does: numbers, booleans & null
+    are converted while ObjectIds and any other text stay strings.
+
+    Args:
+        value (str): [Value of a filter expression]
+
+    Returns:
+        Any: [Casted value]
+    """
+    value = unquote(value)
+    if OBJECT_ID_PATTERN.match(value):
+        return value
+    if NUMBER_PATTERN.match(value):
+        number: float = float(value)
+        return int(number) if number.is_integer() and "." not in value else number
+    return {"true": True, "false": False, "null": None}.get(value, value)
+
+
+def __type_rank__(value: Any) -> int:
+    """
+    Rank of the type of a value in sort order. Missing values come first, then numbers, then strings.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 3
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    return 4
+
+
+def __comparable__(left: Any, right: Any) -> bool:
+    """
+    Values of different types are never matched by a comparison.
+    """
+    return left is not None and right is not None and __type_rank__(left) == __type_rank__(right)
+
+
+def __equals__(value: Any, expected: Any) -> bool:
+    if isinstance(value, list):
+        return any(__equals__(item, expected) for item in value)
+    return __comparable__(value, expected) and value == expected or (
+        value is None and expected is None
+    )
+
+
+def __compile_regex__(value: str) -> re.Pattern:
+    match = REGEX_PATTERN.match(value)
+    flags: int = 0
+    for flag in match.group("flags"):
+        flags |= REGEX_FLAGS.get(flag, 0)
+    return re.compile(match.group("pattern"), flags)
+
+
+def __searches__(value: Any, pattern: re.Pattern) -> bool:
+    if isinstance(value, list):
+        return any(__searches__(item, pattern) for item in value)
+    return isinstance(value, str) and pattern.search(value) is not None
+
+
+def __compile_expression__(expression: str) -> Callable[[Any], bool]:
+    """
+    Compile one filter expression into a predicate on a document.
+
+    Args:
+        expression (str): [E.g. name=/el/i, race!=Orc,Goblin, budgetInMillions<100, name, !name]
+
+    Returns:
+        Callable[[Any], bool]: [Predicate]
+    """
+    match = FILTER_PATTERN.match(expression)
+    if match is None:
+        # field or !field: exists or not
+        if expression.startswith("!"):
+            field: str = unquote(expression[1:])
+            return lambda doc: doc.get(field) is None
+        field = unquote(expression)
+        return lambda doc: doc.get(field) is not None
+
+    field = unquote(match.group("field"))
+    operator: str = match.group("operator")
+    value: str = match.group("value")
+
+    if operator in ("=", "!=") and REGEX_PATTERN.match(value):
+        pattern: re.Pattern = __compile_regex__(unquote(value))
+        if operator == "=":
+            return lambda doc: __searches__(doc.get(field), pattern)
+        return lambda doc: not __searches__(doc.get(field), pattern)
+
+    if operator in ("=", "!="):
+        expected: List[Any] = [cast_value(item) for item in value.split(",")]
+        if len(expected) == 1:
+            single: Any = expected[0]
+            if operator == "=":
+                return lambda doc: __equals__(doc.get(field), single)
+            return lambda doc: not __equals__(doc.get(field), single)
+        if operator == "=":
+            return lambda doc: any(__equals__(doc.get(field), item) for item in expected)
+        return lambda doc: not any(__equals__(doc.get(field), item) for item in expected)
+
+    bound: Any = cast_value(value)
+    compare: Callable[[Any, Any], bool] = {
+        "<": lambda left, right: left < right,
+        "<=": lambda left, right: left <= right,
+        ">": lambda left, right: left > right,
+        ">=": lambda left, right: left >= right,
+    }[operator]
+    return lambda doc: __comparable__(doc.get(field), bound) and compare(
+        doc.get(field), bound
+    )
+
+
+def __plan_expression__(expression: str) -> tuple:
+    """
+    Tell how a secondary index can narrow down the documents matched by one filter expression.
+    Only equalities and numeric comparisons can; the predicate still checks every candidate.
+
+    Returns:
+        tuple: [("=", field, values) or (operator, field, bound), or None]
+    """
+    match = FILTER_PATTERN.match(expression)
+    if match is None or match.group("operator") == "!=" or REGEX_PATTERN.match(match.group("value")):
+        return None
+    field: str = unquote(match.group("field"))
+    operator: str = match.group("operator")
+    if operator == "=":
+        return ("=", field, tuple(cast_value(item) for item in match.group("value").split(",")))
+    bound: Any = cast_value(match.group("value"))
+    if __type_rank__(bound) != 1:
+        return None
+    return (operator, field, bound)
+
+
+def __parse_sort__(value: str) -> List[Tuple[str, bool]]:
+    """
+    Parse a sort expression. E.g. name:asc, runtimeInMinutes:desc or -runtimeInMinutes,name
+
+    Returns:
+        List[Tuple[str, bool]]: [(field, descending) in priority order]
+    """
+    keys: List[Tuple[str, bool]] = []
+    for item in unquote(value).split(","):
+        if ":" in item:
+            field, direction = item.split(":", 1)
+            keys.append((field, direction.lower() in ("desc", "-1", "descending")))
+        elif item.startswith("-"):
+            keys.append((item[1:], True))
+        elif item:
+            keys.append((item.lstrip("+"), False))
+    return keys
+
+
+@lru_cache(maxsize=1024)
+def parse_filter(filter: str) -> dict:
+    """
+    Parse a filter string of the API into a predicate, the sort keys and the pagination.
+    Parsed filters are memoized, so a filter used again costs nothing to parse.
+
+    Supported expressions, joined by '&':
+    ```
+    name=Gandalf              equality
+    name!=Frodo               negation
+    race=Hobbit,Human         include
+    race!=Orc,Goblin          exclude
+    name                      exists
+    !name                     does not exist
+    name=/foot/i              regex (and name!=/foot/i)
+    budgetInMillions<100      numeric comparison (<, <=, >, >=)
+    sort=name:asc             sort (asc or desc)
+    limit=10 page=2 offset=3  pagination
+    ```
+
+    Args:
+        filter (str): [Filtering of the result.]
+
+    Returns:
+        dict: [{"predicate", "plan", "sort", "limit", "page", "offset"}]
+    """
+    predicates: List[Callable[[Any], bool]] = []
+    parsed: dict = {"plan": [], "sort": [], "limit": DEFAULT_LIMIT, "page": 1, "offset": None}
+    for expression in (filter or "").split("&"):
+        if expression == "" or expression.isspace():
+            continue
+        name, _, value = expression.partition("=")
+        if name in ("limit", "page", "offset") and value.isdigit():
+            parsed[name] = int(value)
+        elif name == "sort" and value:
+            parsed["sort"] = __parse_sort__(value)
+        else:
+            predicates.append(__compile_expression__(expression))
+            step: tuple = __plan_expression__(expression)
+            if step is not None:
+                parsed["plan"].append(step)
+    parsed["predicate"] = lambda doc: all(predicate(doc) for predicate in predicates)
+    return parsed
+
+
+def __sort_key__(field: str) -> Callable[[Any], tuple]:
+    def key(doc: Any) -> tuple:
+        value: Any = doc.get(field)
+        return (__type_rank__(value), value if __type_rank__(value) in (1, 2, 3) else 0)
+
+    return key
+
+
+def __candidates__(docs: Sequence[Any], plan: List[tuple]) -> Sequence[Any]:
+    """
+    Narrow down the documents to be checked with the secondary indexes of a document store.
+    The candidates of every indexed expression are intersected and kept in store order.
+
+    Returns:
+        Sequence[Any]: [Candidate documents, or the documents themselves if no index applies]
+    """
+    if not plan or not isinstance(docs, lotr_store_fp.RecordList):
+        return docs
+    store: dict = docs.store
+    positions: Set[int] = None
+    for operator, field, operand in plan:
+        if operator == "=":
+            found: Set[int] = lotr_store_fp.index_lookup(store, field, operand)
+        else:
+            found = lotr_store_fp.index_range(store, field, operator, operand)
+        if found is not None:
+            positions = found if positions is None else positions & found
+    if positions is None:
+        return docs
+    return [lotr_store_fp.Record(store, position) for position in sorted(positions)]
+
+
+def apply_filter(docs: Sequence[Any], filter: str = None) -> dict:
+    """
+    Evaluate a filter string of the API on local documents, with the same result semantics as the API gateway server.
+    On a document store (lotr_store_fp.records()), equalities and numeric comparisons on indexed fields
+    are looked up in the secondary indexes instead of scanning every document.
+
+    Args:
+        docs (Sequence[Any]): [Documents. Any dict-compatible record with a get() method]
+        filter (str): [Filtering of the result. E.g. budgetInMillions<100&sort=name:asc&limit=2]
+
+    Returns:
+        dict: [Page envelope {"docs", "total", "limit", "offset", "page", "pages"}]
+    """
+    parsed: dict = parse_filter(filter)
+    predicate: Callable[[Any], bool] = parsed["predicate"]
+    matched: List[Any] = [doc for doc in __candidates__(docs, parsed["plan"]) if predicate(doc)]
+    # Stable sorts from the least to the most significant key
+    for field, descending in reversed(parsed["sort"]):
+        matched.sort(key=__sort_key__(field), reverse=descending)
+    return paginate(matched, limit=parsed["limit"], page=parsed["page"], offset=parsed["offset"])
+
+
+def paginate(docs: Sequence[Any], limit: int = DEFAULT_LIMIT, page: int = 1, offset: int = None) -> dict:
+    """
+    Cut one page out of the matched documents, the way the API gateway server does.
+    An offset takes precedence over the page. Dict-compatible records are returned as plain dictionaries.
+
+    Args:
+        docs (Sequence[Any]): [Matched documents]
+        limit (int): [Page size]
+        page (int): [Page number, starting from 1]
+        offset (int): [Number of documents to skip]
+
+    Returns:
+        dict: [Page envelope {"docs", "total", "limit", "offset", "page", "pages"}]
+    """
+    limit = limit or DEFAULT_LIMIT
+    if offset is not None:
+        page = offset // limit + 1
+    else:
+        offset = (max(page, 1) - 1) * limit
+    return {
+        "docs": [
+            doc if isinstance(doc, dict) else dict(doc) for doc in docs[offset : offset + limit]
+        ],
+        "total": len(docs),
+        "limit": limit,
+        "offset": offset,
+        "page": page,
+        "pages": math.ceil(len(docs) / limit) or 1,
+    }
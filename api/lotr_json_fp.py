@@ -0,0 +1,144 @@
+import json
+import re
+from typing import Any, Callable, List
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+# Decoder of a JSON body, from bytes or str: orjson when installed, several times faster than json.
+DEFAULT_DECODER: Callable[[Any], Any] = json.loads if orjson is None else orjson.loads
+
+# Bytes that change the nesting or the string state of a JSON text.
+__TOKENS__: re.Pattern = re.compile(rb'[\[\]{}"\\]')
+__DOCS_KEY__: re.Pattern = re.compile(rb'"docs"\s*:\s*$')
+
+
+def loads(body: Any, decoder: Callable[[Any], Any] = None) -> Any:
+    """
+    Decode a JSON body with a decoder, DEFAULT_DECODER if None.
+
+    Args:
+        body (Any): [JSON text as bytes or str]
+        decoder (Callable[[Any], Any]): [JSON decoder. E.g. orjson.loads or json.loads]
+
+    Returns:
+        Any: [Decoded value]
+    """
+    return (decoder or DEFAULT_DECODER)(body)
+
+
+def create_docs_parser(decoder: Callable[[Any], Any] = None) -> dict:
+    """
+    Create an incremental parser of a page envelope, {"docs": [...], "total": ..., ...}, fed with the chunks of the body.
+    Each document of the docs array is decoded alone as soon as its last byte arrives, so that it can be used
+    before the rest of the body is read, and only the bytes of the document being read are held.
+    The other fields of the envelope are decoded once the body is complete.
+    Only the objects of the docs array are yielded, which is what the API sends.
+
+    Args:
+        decoder (Callable[[Any], Any]): [JSON decoder of each document. DEFAULT_DECODER if None]
+
+    Returns:
+        dict: [Parser]
+    """
+    return {
+        "decoder": decoder or DEFAULT_DECODER,
+        "data": bytearray(),
+        "position": 0,
+        "skip": 0,
+        "depth": 0,
+        "in_string": False,
+        "in_docs": False,
+        "start": None,
+        "envelope": bytearray(),
+        "docs": 0,
+    }
+
+
+def docs_parser_feed(parser: dict, chunk: bytes) -> List[Any]:
+    """
+    Feed the next chunk of the body.
+
+    Args:
+        parser (dict): [Parser created by create_docs_parser()]
+        chunk (bytes): [Next bytes of the body]
+
+    Returns:
+        List[Any]: [Documents completed by the chunk, in order]
+    """
+    data: bytearray = parser["data"]
+    data += chunk
+    docs: List[Any] = []
+    depth: int = parser["depth"]
+    in_string: bool = parser["in_string"]
+    in_docs: bool = parser["in_docs"]
+    start: int = parser["start"]
+    skip: int = parser["skip"]
+    # Start of the bytes outside the docs array not yet moved to the envelope.
+    mark: int = 0 if not in_docs else None
+    for match in __TOKENS__.finditer(data, parser["position"]):
+        at: int = match.start()
+        if at < skip:
+            continue
+        token: int = data[at]
+        if in_string:
+            if token == 0x5C:  # backslash: the next byte is escaped
+                skip = at + 2
+            elif token == 0x22:
+                in_string = False
+            continue
+        if token == 0x22:
+            in_string = True
+        elif token in (0x7B, 0x5B):  # { [
+            depth += 1
+            if in_docs and depth == 3 and token == 0x7B:
+                start = at
+            elif not in_docs and depth == 2 and token == 0x5B:
+                tail: bytes = bytes(parser["envelope"][-32:]) + bytes(data[max(mark, at - 32) : at])
+                if __DOCS_KEY__.search(tail):
+                    parser["envelope"] += data[mark : at + 1]
+                    in_docs, mark = True, None
+        else:  # } ]
+            depth -= 1
+            if in_docs and depth == 2 and start is not None and token == 0x7D:
+                docs.append(parser["decoder"](bytes(data[start : at + 1])))
+                start = None
+            elif in_docs and depth == 1:
+                in_docs, mark = False, at
+    # Keep only the bytes still needed.
+    if mark is not None:
+        parser["envelope"] += data[mark:]
+        consumed: int = len(data)
+    else:
+        consumed = len(data) if start is None else start
+    del data[:consumed]
+    parser.update(
+        position=len(data),
+        skip=max(skip - consumed, 0),
+        depth=depth,
+        in_string=in_string,
+        in_docs=in_docs,
+        start=None if start is None else start - consumed,
+    )
+    parser["docs"] += len(docs)
+    return docs
+
+
+def docs_parser_close(parser: dict) -> dict:
+    """
+    Decode the fields of the envelope once the body is complete.
+
+    Args:
+        parser (dict): [Parser created by create_docs_parser()]
+
+    Raises:
+        ValueError: [The body is not a complete JSON document]
+
+    Returns:
+        dict: [Envelope with an empty docs array. E.g. {"docs": [], "total": 2384, "limit": 100, ...}]
+    """
+    if parser["depth"] != 0 or parser["in_docs"] or parser["in_string"]:
+        raise ValueError("Incomplete JSON body")
+    return parser["decoder"](bytes(parser["envelope"]))
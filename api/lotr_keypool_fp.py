@@ -0,0 +1,232 @@
+import asyncio
+import threading
+import time
+from typing import Callable, List, Sequence, Tuple
+
+import api.lotr_deadline_fp as lotr_deadline_fp
+import api.lotr_ratelimit_fp as lotr_ratelimit_fp
+import api.lotr_retry_fp as lotr_retry_fp
+
+STRATEGY_ROUND_ROBIN: str = "round_robin"
+STRATEGY_LEAST_THROTTLED: str = "least_throttled"
+
+
+def create_key_pool(
+    api_keys: Sequence[str],
+    strategy: str = STRATEGY_ROUND_ROBIN,
+    cooldown: float = 60.0,
+    rate: float = None,
+    burst: int = 10,
+    clock: Callable[[], float] = time.monotonic,
+) -> dict:
+    """
+    Create a pool of API keys to spread the requests over, so that the sustainable request rate
+    grows with the number of keys instead of being capped by the quota of one.
+    The remaining quota of each key is tracked from the X-RateLimit-* headers of its responses;
+    a key answered with 429 is taken out of rotation until its Retry-After (or the cooldown) has passed,
+    and a key with no quota left until its quota resets.
+
+    Args:
+        api_keys (Sequence[str]): [API keys]
+        strategy (str): [STRATEGY_ROUND_ROBIN to take the keys in turn, or STRATEGY_LEAST_THROTTLED
+                         to take the least used key not throttled within the cooldown, else the one throttled the longest time ago]
+        cooldown (float): [Seconds out of rotation after a 429 without Retry-After]
+        rate (float): [Tokens per second of each key's own token bucket. E.g. lotr_ratelimit_fp.DEFAULT_RATE. No bucket if None]
+        burst (int): [Max number of tokens of each key's bucket]
+        clock (Callable[[], float]): [Monotonic clock in seconds]
+
+    Returns:
+        dict: [Key pool]
+    """
+    if not api_keys:
+        raise ValueError("A key pool needs at least one API key")
+    if strategy not in (STRATEGY_ROUND_ROBIN, STRATEGY_LEAST_THROTTLED):
+        raise ValueError(f"Unknown key selection strategy: {strategy}")
+    return {
+        "keys": [
+            {
+                "api_key": api_key,
+                "rate_limit": None
+                if rate is None
+                else lotr_ratelimit_fp.create_rate_limit_policy(rate=rate, burst=burst, clock=clock),
+                "available_at": float("-inf"),
+                "throttled_at": float("-inf"),
+                "limit": None,
+                "remaining": None,
+                "requests": 0,
+                "throttles": 0,
+            }
+            for api_key in dict.fromkeys(api_keys)
+        ],
+        "strategy": strategy,
+        "cooldown": cooldown,
+        "cursor": 0,
+        "clock": clock,
+        "lock": threading.Lock(),
+    }
+
+
+def __candidates__(pool: dict) -> List[dict]:
+    """
+    Order the keys of the pool by preference of the strategy.
+    """
+    keys: List[dict] = pool["keys"]
+    if pool["strategy"] == STRATEGY_ROUND_ROBIN:
+        cursor: int = pool["cursor"] % len(keys)
+        return keys[cursor:] + keys[:cursor]
+    # The keys throttled within the cooldown come last, the most recently throttled one at the end;
+    # the others are balanced by their number of requests.
+    since: float = pool["clock"]() - pool["cooldown"]
+    return sorted(
+        keys,
+        key=lambda key: (key["throttled_at"] >= since, max(key["throttled_at"], since), key["requests"]),
+    )
+
+
+def try_select_key(pool: dict) -> Tuple[dict, float]:
+    """
+    Take the preferred key in rotation that has a token free.
+
+    Args:
+        pool (dict): [Key pool created by create_key_pool()]
+
+    Returns:
+        Tuple[dict, float]: [(key, 0) if a key was taken, otherwise (None, seconds until one may be free)]
+    """
+    with pool["lock"]:
+        now: float = pool["clock"]()
+        wait: float = float("inf")
+        for key in __candidates__(pool):
+            if key["available_at"] > now:
+                wait = min(wait, key["available_at"] - now)
+                continue
+            if key["rate_limit"] is not None:
+                token_wait: float = lotr_ratelimit_fp.try_acquire(key["rate_limit"])
+                if token_wait > 0:
+                    wait = min(wait, token_wait)
+                    continue
+            key["requests"] += 1
+            pool["cursor"] = pool["keys"].index(key) + 1
+            return key, 0.0
+        return None, wait
+
+
+def __check_wait__(wait: float) -> None:
+    left: float = lotr_deadline_fp.remaining()
+    if left is not None and wait >= left:
+        raise asyncio.TimeoutError("Deadline exceeded")
+    return
+
+
+def select_key(pool: dict) -> dict:
+    """
+    Block the calling thread until a key is taken.
+
+    Args:
+        pool (dict): [Key pool created by create_key_pool()]
+
+    Raises:
+        asyncio.TimeoutError: [No key is free before the deadline of the current context]
+
+    Returns:
+        dict: [Key taken, its API key under "api_key"]
+    """
+    key, wait = try_select_key(pool)
+    while key is None:
+        __check_wait__(wait)
+        time.sleep(wait)
+        key, wait = try_select_key(pool)
+    return key
+
+
+async def aio_select_key(pool: dict) -> dict:
+    """
+    Wait until a key is taken, without blocking the event loop.
+
+    Args:
+        pool (dict): [Key pool created by create_key_pool()]
+
+    Raises:
+        asyncio.TimeoutError: [No key is free before the deadline of the current context]
+
+    Returns:
+        dict: [Key taken, its API key under "api_key"]
+    """
+    key, wait = try_select_key(pool)
+    while key is None:
+        __check_wait__(wait)
+        await asyncio.sleep(wait)
+        key, wait = try_select_key(pool)
+    return key
+
+
+def __header__(headers: dict, name: str) -> float:
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def record_response(pool: dict, key: dict, status: int, headers: dict) -> None:
+    """
+    Update the quota of a key from the headers of its response, and take it out of rotation if throttled.
+
+    Args:
+        pool (dict): [Key pool created by create_key_pool()]
+        key (dict): [Key the request was sent with]
+        status (int): [HTTP status of the response]
+        headers (dict): [Headers of the response. E.g. X-RateLimit-Remaining, X-RateLimit-Reset, Retry-After]
+    """
+    headers = headers or {}
+    limit: float = __header__(headers, "X-RateLimit-Limit")
+    remaining: float = __header__(headers, "X-RateLimit-Remaining")
+    reset: float = __header__(headers, "X-RateLimit-Reset")
+    with pool["lock"]:
+        now: float = pool["clock"]()
+        # The reset comes as a wall clock time in seconds.
+        reset_at: float = None if reset is None else now + max(reset - time.time(), 0.0)
+        if limit is not None:
+            key["limit"] = int(limit)
+        if remaining is not None:
+            key["remaining"] = int(remaining)
+            if remaining <= 0:
+                key["available_at"] = max(
+                    key["available_at"], now + pool["cooldown"] if reset_at is None else reset_at
+                )
+        if status == 429:
+            retry_after: float = lotr_retry_fp.parse_retry_after(headers.get("Retry-After"))
+            if retry_after is not None:
+                until: float = now + retry_after
+            elif reset_at is not None:
+                until = reset_at
+            else:
+                until = now + pool["cooldown"]
+            key["available_at"] = max(key["available_at"], until)
+            key["throttled_at"] = now
+            key["throttles"] += 1
+    return
+
+
+def key_pool_stats(pool: dict) -> List[dict]:
+    """
+    Return the counters of each key of the pool, the keys being masked.
+
+    Args:
+        pool (dict): [Key pool created by create_key_pool()]
+
+    Returns:
+        List[dict]: [key (last 4 characters), requests, throttles, limit & remaining quota, and whether it is in rotation]
+    """
+    with pool["lock"]:
+        now: float = pool["clock"]()
+        return [
+            {
+                "key": "..." + key["api_key"][-4:],
+                "requests": key["requests"],
+                "throttles": key["throttles"],
+                "limit": key["limit"],
+                "remaining": key["remaining"],
+                "in_rotation": key["available_at"] <= now,
+            }
+            for key in pool["keys"]
+        ]
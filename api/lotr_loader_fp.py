@@ -0,0 +1,155 @@
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List
+
+
+def create_data_loader(
+    batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+    max_batch_size: int = 100,
+    cache: bool = False,
+) -> dict:
+    """
+    Create a data loader batching the keys requested within one event loop tick, dataloader style.
+    Every key asked with aio_load() during the same tick is queued; once a tick goes by without new keys
+    (nested gathers queue theirs one tick later), the queued keys are deduplicated and handed to batch_fn
+    in batches of at most max_batch_size.
+    Concurrent callers of a key being loaded share its result. Without cache, a key is forgotten once loaded,
+    so that the next load asks batch_fn again (which may have a cache of its own).
+
+    Args:
+        batch_fn (Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]): [Load a batch of keys into {key: value}. Missing keys load as None]
+        max_batch_size (int): [Max number of keys per call of batch_fn]
+        cache (bool): [Keep the loaded values for the lifetime of the loader]
+
+    Returns:
+        dict: [Data loader]
+    """
+    return {
+        "batch_fn": batch_fn,
+        "max_batch_size": max_batch_size,
+        "cache": cache,
+        "queue": {},
+        "loading": {},
+        "values": {},
+        "scheduled": False,
+        "seen": 0,
+        "loop": None,
+        "tasks": set(),
+        "stats": {"loads": 0, "batches": 0, "keys": 0},
+    }
+
+
+def __dispatch__(loader: dict) -> None:
+    """
+    Hand the queued keys to batch_fn once a tick went by without new keys.
+    """
+    if len(loader["queue"]) != loader["seen"]:
+        loader["seen"] = len(loader["queue"])
+        asyncio.get_running_loop().call_soon(__dispatch__, loader)
+        return
+    loader["scheduled"] = False
+    loader["seen"] = 0
+    queue: Dict[Hashable, asyncio.Future] = loader["queue"]
+    loader["queue"] = {}
+    keys: List[Hashable] = list(queue)
+    size: int = loader["max_batch_size"]
+    for start in range(0, len(keys), size):
+        batch: dict = {key: queue[key] for key in keys[start : start + size]}
+        task: asyncio.Task = asyncio.ensure_future(__run_batch__(loader, batch))
+        # Keep a reference to the running batches until they are done.
+        loader["tasks"].add(task)
+        task.add_done_callback(loader["tasks"].discard)
+        task.add_done_callback(partial(__release_batch__, loader, batch))
+    return
+
+
+async def __run_batch__(loader: dict, batch: Dict[Hashable, asyncio.Future]) -> None:
+    """
+    Load one batch of keys and resolve the futures waiting on them.
+    """
+    loader["stats"]["batches"] += 1
+    loader["stats"]["keys"] += len(batch)
+    try:
+        values: Dict[Hashable, Any] = await loader["batch_fn"](list(batch))
+    except Exception as e:
+        values = None
+        for future in batch.values():
+            if not future.done():
+                future.set_exception(e)
+    for key, future in batch.items():
+        if values is not None and not future.done():
+            future.set_result(values.get(key))
+        if loader["cache"] and values is not None:
+            loader["values"][key] = values.get(key)
+    return
+
+
+def __release_batch__(loader: dict, batch: Dict[Hashable, asyncio.Future], task: asyncio.Task) -> None:
+    """
+    Forget the keys of a finished batch. The loads of a batch cancelled before resolving them
+    (e.g. when its event loop shuts down, possibly before the batch even started) are cancelled too,
+    so that no caller waits forever on them.
+    """
+    for key, future in batch.items():
+        if not future.done():
+            future.cancel()
+        if loader["loading"].get(key) is future:
+            del loader["loading"][key]
+    return
+
+
+async def aio_load(loader: dict, key: Hashable) -> Any:
+    """
+    Load one value through the loader, batched with the other keys requested in the same tick.
+
+    Args:
+        loader (dict): [Data loader created by create_data_loader()]
+        key (Hashable): [Key. E.g. an ObjectId]
+
+    Returns:
+        Any: [Loaded value, or None if batch_fn did not return the key]
+    """
+    loader["stats"]["loads"] += 1
+    if key in loader["values"]:
+        return loader["values"][key]
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    if loader["loop"] is not loop:
+        # Loads left over by another event loop can not be resolved on this one.
+        loader.update({"queue": {}, "loading": {}, "scheduled": False, "seen": 0, "loop": loop})
+    future: asyncio.Future = loader["loading"].get(key)
+    if future is None:
+        future = loop.create_future()
+        loader["loading"][key] = future
+        loader["queue"][key] = future
+        if not loader["scheduled"]:
+            loader["scheduled"] = True
+            loop.call_soon(__dispatch__, loader)
+    # One caller giving up does not cancel the load for the others.
+    return await asyncio.shield(future)
+
+
+async def aio_load_many(loader: dict, keys: Iterable[Hashable]) -> List[Any]:
+    """
+    Load several values through the loader, in one batch when they fit.
+
+    Args:
+        loader (dict): [Data loader created by create_data_loader()]
+        keys (Iterable[Hashable]): [Keys]
+
+    Returns:
+        List[Any]: [Loaded values in the order of the keys]
+    """
+    return list(await asyncio.gather(*[aio_load(loader, key) for key in keys]))
+
+
+def loader_stats(loader: dict) -> dict:
+    """
+    Return the counters of the loader.
+
+    Args:
+        loader (dict): [Data loader created by create_data_loader()]
+
+    Returns:
+        dict: [loads requested, batches & keys handed to batch_fn]
+    """
+    return dict(loader["stats"])
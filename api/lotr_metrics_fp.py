@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+import logging
+import threading
+import time
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Callable, Dict, Sequence
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the buckets of the latency histograms, the last bucket being unbounded.
+DEFAULT_BUCKETS: tuple = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Phases of a request, one after the other.
+PHASES: tuple = ("dns", "connect", "tls", "ttfb", "body")
+
+COUNTERS: tuple = (
+    "requests",
+    "errors",
+    "cancelled",
+    "throttled",
+    "not_modified",
+    "bytes_received",
+    "retries",
+    "cache_hits",
+    "cache_misses",
+    "persistent_cache_hits",
+)
+
+
+def create_metrics(
+    exporter: Callable[[dict], None] = None, buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> dict:
+    """
+    Create the metrics of a client: counters, and a latency histogram per route, e.g. "movie/{id}/quote".
+    Every request sent and every counter change is also handed to the exporter as an event,
+    to be forwarded to a metrics system (statsd, OpenTelemetry...) as it happens.
+    A pull-based system (e.g. Prometheus) reads metrics_snapshot() instead.
+    The exporter runs on the path of the request and should only queue or aggregate the event.
+    ```
+    metrics: dict = lotr_metrics_fp.create_metrics(exporter=lambda event: print(event))
+    client: dict = lotr_api_fp.create_api_client(api_key=api_key, metrics=metrics)
+    ```
+
+    Args:
+        exporter (Callable[[dict], None]): [Called with each event:
+                                            {"event": "request", "route", "endpoint", "status", "error", "duration", "phases", "bytes", "reused"}
+                                            or {"event": "counter", "name", "value"}. No export if None]
+        buckets (Sequence[float]): [Upper bounds in seconds of the buckets of the latency histograms]
+
+    Returns:
+        dict: [Metrics]
+    """
+    return {
+        "exporter": exporter,
+        "buckets": tuple(sorted(buckets)),
+        "counters": dict.fromkeys(COUNTERS, 0),
+        "histograms": {},
+        "lock": threading.Lock(),
+    }
+
+
+def route(endpoint: str, id: str = None, query: str = None) -> str:
+    """
+    Name the route of an API call, without its ids so that the number of routes stays small.
+
+    Args:
+        endpoint (str): [path to the API function call]
+        id (str): [Search for a specific ID]
+        query (str): [Additional sub-path for the API]
+
+    Returns:
+        str: [Route. E.g. "movie", "movie/{id}" or "movie/{id}/quote"]
+    """
+    name: str = endpoint or ""
+    if id:
+        name += "/{id}"
+    if query:
+        name += f"/{query}"
+    return name
+
+
+def __export__(metrics: dict, event: dict) -> None:
+    exporter: Callable[[dict], None] = metrics["exporter"]
+    if exporter is None:
+        return
+    # A failing exporter never fails the request.
+    try:
+        exporter(event)
+    except Exception:
+        logger.exception("Metrics exporter failed")
+    return
+
+
+def count(metrics: dict, name: str, value: int = 1) -> None:
+    """
+    Add to a counter.
+
+    Args:
+        metrics (dict): [Metrics created by create_metrics()]
+        name (str): [Name of the counter. E.g. "cache_hits"]
+        value (int): [Amount added]
+    """
+    with metrics["lock"]:
+        metrics["counters"][name] = metrics["counters"].get(name, 0) + value
+    __export__(metrics, {"event": "counter", "name": name, "value": value})
+    return
+
+
+def __phases__(trace: dict, started: float, ended: float) -> Dict[str, float]:
+    """
+    Split the time of a request into its phases from the timestamps of the trace.
+    The phases not observed are None: a reused connection has no DNS or connect phase,
+    and TLS is part of the connect phase as neither aiohttp nor requests report it apart.
+    """
+    phases: Dict[str, float] = dict.fromkeys(PHASES)
+    phases["dns"] = trace.get("dns")
+    phases["connect"] = trace.get("connect")
+    phases["tls"] = trace.get("tls")
+    if "headers_at" in trace:
+        # Timestamps of the aiohttp trace hooks.
+        phases["ttfb"] = trace["headers_at"] - trace.get("sent_at", trace.get("start_at", started))
+        phases["body"] = ended - trace["headers_at"]
+    elif "ttfb" in trace:
+        # Elapsed time of requests, from sending until the headers are read.
+        phases["ttfb"] = trace["ttfb"]
+        phases["body"] = max(ended - started - trace["ttfb"], 0.0)
+    return phases
+
+
+def record_request(
+    metrics: dict,
+    kwargs: dict,
+    trace: dict,
+    started: float,
+    status: int = None,
+    error: BaseException = None,
+) -> None:
+    """
+    Record one request sent to the server: counters, latency histogram of its route, then the event.
+
+    Args:
+        metrics (dict): [Metrics created by create_metrics()]
+        kwargs (dict): [Keyword arguments of the API call: endpoint, id, query]
+        trace (dict): [Timestamps and byte count filled by the transport, see create_trace_config()]
+        started (float): [time.perf_counter() when the request was started]
+        status (int): [HTTP status of the response. None if failed]
+        error (BaseException): [Error raised by the request. None if answered]
+    """
+    ended: float = time.perf_counter()
+    duration: float = ended - started
+    phases: Dict[str, float] = __phases__(trace, started, ended)
+    name: str = route(kwargs.get("endpoint"), kwargs.get("id"), kwargs.get("query"))
+    size: int = trace.get("bytes", 0)
+    with metrics["lock"]:
+        counters: dict = metrics["counters"]
+        counters["requests"] += 1
+        counters["bytes_received"] += size
+        if error is not None:
+            counters["errors"] += 1
+        elif status == 429:
+            counters["throttled"] += 1
+        elif status == 304:
+            counters["not_modified"] += 1
+        histogram: dict = metrics["histograms"].get(name)
+        if histogram is None:
+            histogram = {
+                "buckets": metrics["buckets"],
+                "counts": [0] * (len(metrics["buckets"]) + 1),
+                "count": 0,
+                "sum": 0.0,
+                "phases": dict.fromkeys(PHASES, 0.0),
+            }
+            metrics["histograms"][name] = histogram
+        histogram["counts"][bisect_left(histogram["buckets"], duration)] += 1
+        histogram["count"] += 1
+        histogram["sum"] += duration
+        for phase, value in phases.items():
+            if value is not None:
+                histogram["phases"][phase] += value
+    __export__(
+        metrics,
+        {
+            "event": "request",
+            "route": name,
+            "endpoint": kwargs.get("endpoint"),
+            "status": status,
+            "error": None if error is None else type(error).__name__,
+            "duration": duration,
+            "phases": phases,
+            "bytes": size,
+            "reused": trace.get("reused"),
+        },
+    )
+    return
+
+
+def metrics_snapshot(metrics: dict) -> dict:
+    """
+    Return a copy of the counters and of the latency histograms.
+
+    Args:
+        metrics (dict): [Metrics created by create_metrics()]
+
+    Returns:
+        dict: [{"counters": {...}, "histograms": {route: {"buckets", "counts", "count", "sum", "phases": sum of each phase}}}]
+    """
+    with metrics["lock"]:
+        return {
+            "counters": dict(metrics["counters"]),
+            "histograms": {
+                name: {
+                    "buckets": histogram["buckets"],
+                    "counts": list(histogram["counts"]),
+                    "count": histogram["count"],
+                    "sum": histogram["sum"],
+                    "phases": dict(histogram["phases"]),
+                }
+                for name, histogram in metrics["histograms"].items()
+            },
+        }
+
+
+def histogram_quantile(histogram: dict, quantile: float) -> float:
+    """
+    Estimate a quantile of a latency histogram: the upper bound of the bucket holding it.
+
+    Args:
+        histogram (dict): [Histogram of metrics_snapshot()]
+        quantile (float): [Quantile between 0 and 1. E.g. 0.99]
+
+    Returns:
+        float: [Latency in seconds, inf if past the last bound, None if the histogram is empty]
+    """
+    if histogram["count"] == 0:
+        return None
+    rank: float = quantile * histogram["count"]
+    seen: int = 0
+    for bound, bucket_count in zip(histogram["buckets"] + (float("inf"),), histogram["counts"]):
+        seen += bucket_count
+        if seen >= rank:
+            return bound
+    return float("inf")
+
+
+def __trace__(context: SimpleNamespace) -> dict:
+    # Requests sent without a trace, e.g. by the streamed calls, are not recorded.
+    trace: dict = context.trace_request_ctx
+    return trace if isinstance(trace, dict) else None
+
+
+async def __on_request_start__(session, context, params) -> None:
+    trace: dict = __trace__(context)
+    if trace is not None:
+        trace["start_at"] = time.perf_counter()
+    return
+
+
+async def __on_dns_resolvehost_start__(session, context, params) -> None:
+    trace: dict = __trace__(context)
+    if trace is not None:
+        trace["dns_at"] = time.perf_counter()
+    return
+
+
+async def __on_dns_resolvehost_end__(session, context, params) -> None:
+    trace: dict = __trace__(context)
+    if trace is not None and "dns_at" in trace:
+        trace["dns"] = time.perf_counter() - trace["dns_at"]
+    return
+
+
+async def __on_dns_cache_hit__(session, context, params) -> None:
+    trace: dict = __trace__(context)
+    if trace is not None:
+        trace["dns"] = 0.0
+    return
+
+
+async def __on_connection_create_start__(session, context, params) -> None:
+    trace: dict = __trace__(context)
+    if trace is not None:
+        trace["connect_at"] = time.perf_counter()
+        trace["reused"] = False
+    return
+
+
+async def __on_connection_create_end__(session, context, params) -> None:
+    trace: dict = __trace__(context)
+    if trace is not None and "connect_at" in trace:
+        # The connection is created once the host is resolved: the DNS phase is not part of the connect one.
+        trace["connect"] = max(time.perf_counter() - trace["connect_at"] - trace.get("dns", 0.0), 0.0)
+    return
+
+
+async def __on_connection_reuseconn__(session, context, params) -> None:
+    trace: dict = __trace__(context)
+    if trace is not None:
+        trace["reused"] = True
+    return
+
+
+async def __on_request_headers_sent__(session, context, params) -> None:
+    trace: dict = __trace__(context)
+    if trace is not None:
+        trace["sent_at"] = time.perf_counter()
+    return
+
+
+async def __on_request_end__(session, context, params) -> None:
+    trace: dict = __trace__(context)
+    if trace is not None:
+        trace["headers_at"] = time.perf_counter()
+    return
+
+
+async def __on_response_chunk_received__(session, context, params) -> None:
+    trace: dict = __trace__(context)
+    if trace is not None:
+        trace["bytes"] = trace.get("bytes", 0) + len(params.chunk)
+    return
+
+
+def create_trace_config() -> aiohttp.TraceConfig:
+    """
+    Create the aiohttp trace hooks timing the phases of the requests sent with a trace,
+    the dict passed as trace_request_ctx being filled with timestamps, phase durations and the bytes received.
+
+    Returns:
+        aiohttp.TraceConfig: [Trace hooks, given to the aiohttp session. E.g. create_session_pool(trace_configs=[...])]
+    """
+    import aiohttp
+
+    config: aiohttp.TraceConfig = aiohttp.TraceConfig()
+    config.on_request_start.append(__on_request_start__)
+    config.on_dns_resolvehost_start.append(__on_dns_resolvehost_start__)
+    config.on_dns_resolvehost_end.append(__on_dns_resolvehost_end__)
+    config.on_dns_cache_hit.append(__on_dns_cache_hit__)
+    config.on_connection_create_start.append(__on_connection_create_start__)
+    config.on_connection_create_end.append(__on_connection_create_end__)
+    config.on_connection_reuseconn.append(__on_connection_reuseconn__)
+    config.on_request_headers_sent.append(__on_request_headers_sent__)
+    config.on_request_end.append(__on_request_end__)
+    config.on_response_chunk_received.append(__on_response_chunk_received__)
+    return config
@@ -0,0 +1,155 @@
+import asyncio
+from heapq import heappop, heappush
+import itertools
+import threading
+import time
+from typing import Callable, List
+import weakref
+
+# the-one-api allows 100 requests every 10 minutes per API key.
+DEFAULT_RATE: float = 100 / 600
+
+# Lower value is served first.
+PRIORITY_INTERACTIVE: int = 0
+PRIORITY_BULK: int = 10
+
+
+def create_rate_limit_policy(
+    rate: float = DEFAULT_RATE,
+    burst: int = 10,
+    clock: Callable[[], float] = time.monotonic,
+) -> dict:
+    """
+    Create a token bucket rate limit policy to stay within the request quota of an API key.
+    The bucket holds up to 'burst' tokens and is refilled at 'rate' tokens per second; every request takes one.
+    Non-blocking calls queue for a token by priority, so that interactive lookups go ahead of bulk page crawls.
+    Blocking calls sleep until a token is free. One policy can be shared by several clients of the same key.
+
+    Args:
+        rate (float): [Tokens added per second]
+        burst (int): [Max number of tokens in the bucket]
+        clock (Callable[[], float]): [Monotonic clock in seconds]
+
+    Returns:
+        dict: [Rate limit policy]
+    """
+    return {
+        "rate": rate,
+        "burst": burst,
+        "tokens": float(burst),
+        "updated": clock(),
+        "clock": clock,
+        "lock": threading.Lock(),
+        "sequence": itertools.count(),
+        "schedulers": weakref.WeakKeyDictionary(),
+        "stats": {"granted": 0, "waited": 0},
+    }
+
+
+def __take__(policy: dict, waiting: bool = False) -> float:
+    """
+    Take a token if one is free, counting the caller as waiting otherwise.
+    The counters are updated under the lock of the policy, shared by the threads of a blocking client.
+    """
+    with policy["lock"]:
+        now: float = policy["clock"]()
+        policy["tokens"] = min(
+            policy["burst"], policy["tokens"] + (now - policy["updated"]) * policy["rate"]
+        )
+        policy["updated"] = now
+        if policy["tokens"] >= 1:
+            policy["tokens"] -= 1
+            policy["stats"]["granted"] += 1
+            return 0.0
+        if waiting:
+            policy["stats"]["waited"] += 1
+        return (1 - policy["tokens"]) / policy["rate"]
+
+
+def try_acquire(policy: dict) -> float:
+    """
+    Take a token if one is free.
+
+    Args:
+        policy (dict): [Rate limit policy created by create_rate_limit_policy()]
+
+    Returns:
+        float: [0 if a token was taken, otherwise the seconds until the next token is free]
+    """
+    return __take__(policy)
+
+
+def acquire(policy: dict) -> None:
+    """
+    Block the calling thread until a token is taken.
+
+    Args:
+        policy (dict): [Rate limit policy created by create_rate_limit_policy()]
+    """
+    wait: float = __take__(policy, waiting=True)
+    while wait > 0:
+        time.sleep(wait)
+        wait = try_acquire(policy)
+    return
+
+
+async def __dispatch__(policy: dict, waiters: List[tuple]) -> None:
+    """
+    Hand out the tokens to the queued waiters of one event loop, by priority then arrival order.
+    Runs until the queue is empty.
+    """
+    while True:
+        while waiters and waiters[0][2].done():
+            heappop(waiters)
+        if not waiters:
+            return
+        wait: float = try_acquire(policy)
+        if wait > 0:
+            await asyncio.sleep(wait)
+            continue
+        heappop(waiters)[2].set_result(None)
+        # Let the granted waiter run before handing out the next token.
+        await asyncio.sleep(0)
+
+
+async def aio_acquire(policy: dict, priority: int = PRIORITY_INTERACTIVE) -> None:
+    """
+    Wait until a token is taken, without blocking the event loop.
+    A caller is served immediately when a token is free and nobody is queued;
+    otherwise it is queued by priority (lower value first) then arrival order.
+
+    Args:
+        policy (dict): [Rate limit policy created by create_rate_limit_policy()]
+        priority (int): [Priority of the call. E.g. PRIORITY_INTERACTIVE or PRIORITY_BULK]
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    scheduler: dict = policy["schedulers"].get(loop)
+    if scheduler is None:
+        scheduler = {"waiters": [], "task": None}
+        policy["schedulers"][loop] = scheduler
+    if not scheduler["waiters"]:
+        if __take__(policy, waiting=True) == 0:
+            return
+    else:
+        with policy["lock"]:
+            policy["stats"]["waited"] += 1
+    future: asyncio.Future = loop.create_future()
+    heappush(scheduler["waiters"], (priority, next(policy["sequence"]), future))
+    if scheduler["task"] is None or scheduler["task"].done():
+        scheduler["task"] = loop.create_task(__dispatch__(policy, scheduler["waiters"]))
+    await future
+    return
+
+
+def rate_limit_stats(policy: dict) -> dict:
+    """
+    Return the counters of the policy.
+
+    Args:
+        policy (dict): [Rate limit policy created by create_rate_limit_policy()]
+
+    Returns:
+        dict: [granted tokens, calls that had to wait & tokens currently free]
+    """
+    with policy["lock"]:
+        return {**policy["stats"], "tokens": policy["tokens"]}
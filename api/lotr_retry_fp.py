@@ -0,0 +1,222 @@
+from collections import deque
+from email.utils import parsedate_to_datetime
+import math
+import random
+import threading
+import time
+from typing import Callable, Tuple
+
+import api.lotr_deadline_fp as lotr_deadline_fp
+
+# Methods that can be sent twice without changing the outcome. Every call of the API is a GET.
+IDEMPOTENT_METHODS: Tuple[str, ...] = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+# Transient statuses worth another attempt.
+RETRY_STATUSES: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+
+def create_retry_policy(
+    max_attempts: int = 3,
+    base_delay: float = 0.1,
+    max_delay: float = 5.0,
+    retry_statuses: Tuple[int, ...] = RETRY_STATUSES,
+    max_retry_after: float = 60.0,
+    hedge_percentile: float = None,
+    hedge_min_samples: int = 20,
+    hedge_window: int = 200,
+    random: Callable[[], float] = random.random,
+) -> dict:
+    """
+    Create a retry policy for transient failures: errors of the connection and retryable statuses (5xx, 429).
+    Attempts are spaced with exponential backoff and full jitter, so that many clients failing together
+    do not retry together; a 429 / 503 with Retry-After waits as long as the server asks.
+    Idempotent requests are retried on any transient failure; the others only when they could not connect,
+    since the server may have processed them already.
+
+    With hedge_percentile (e.g. 0.95), a second copy of a request is sent once the first one is slower than
+    that percentile of the recent latencies, and whichever answers first is used.
+    Only idempotent requests are hedged.
+
+    Args:
+        max_attempts (int): [Max number of attempts of a request, the first one included]
+        base_delay (float): [Backoff of the first retry in seconds, doubled on each retry]
+        max_delay (float): [Max backoff in seconds]
+        retry_statuses (Tuple[int, ...]): [HTTP statuses to be retried]
+        max_retry_after (float): [Max seconds to wait for a Retry-After. A longer one is not retried]
+        hedge_percentile (float): [Percentile of the recent latencies after which a request is hedged. No hedging if None]
+        hedge_min_samples (int): [Number of latencies to be known before hedging]
+        hedge_window (int): [Number of recent latencies kept]
+        random (Callable[[], float]): [Random number in [0, 1) for the jitter]
+
+    Returns:
+        dict: [Retry policy]
+    """
+    return {
+        "max_attempts": max_attempts,
+        "base_delay": base_delay,
+        "max_delay": max_delay,
+        "retry_statuses": frozenset(retry_statuses),
+        "max_retry_after": max_retry_after,
+        "hedge_percentile": hedge_percentile,
+        "hedge_min_samples": hedge_min_samples,
+        "latencies": deque(maxlen=hedge_window),
+        "random": random,
+        "lock": threading.Lock(),
+        "stats": {"attempts": 0, "retries": 0, "gave_up": 0, "hedges": 0, "hedge_wins": 0},
+    }
+
+
+def parse_retry_after(value: str, now: Callable[[], float] = time.time) -> float:
+    """
+    Read a Retry-After header, in seconds or as an HTTP date.
+
+    Args:
+        value (str): [Header value. E.g. 120 or Wed, 21 Oct 2015 07:28:00 GMT]
+        now (Callable[[], float]): [Wall clock in seconds]
+
+    Returns:
+        float: [Seconds to wait, or None if the value can not be read]
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - now(), 0.0)
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def backoff_delay(policy: dict, attempt: int) -> float:
+    """
+    Exponential backoff with full jitter before the retry following an attempt.
+
+    Args:
+        policy (dict): [Retry policy created by create_retry_policy()]
+        attempt (int): [Number of the failed attempt, starting from 0]
+
+    Returns:
+        float: [Seconds to wait]
+    """
+    ceiling: float = min(policy["max_delay"], policy["base_delay"] * 2**attempt)
+    return policy["random"]() * ceiling
+
+
+def retry_delay(
+    policy: dict,
+    attempt: int,
+    status: int = None,
+    headers: dict = None,
+    error: BaseException = None,
+    method: str = "GET",
+    connect_error: bool = False,
+) -> float:
+    """
+    Decide whether a failed attempt is retried, and when.
+
+    Args:
+        policy (dict): [Retry policy created by create_retry_policy()]
+        attempt (int): [Number of the attempt, starting from 0]
+        status (int): [HTTP status of the response, None if it failed with an error]
+        headers (dict): [Headers of the response]
+        error (BaseException): [Error of the attempt, None if a response came back]
+        method (str): [HTTP method of the request]
+        connect_error (bool): [The error happened before the request was sent]
+
+    Returns:
+        float: [Seconds to wait before the next attempt, or None if it is not retried]
+    """
+    with policy["lock"]:
+        policy["stats"]["attempts"] += 1
+    if error is None and status not in policy["retry_statuses"]:
+        return None
+    if error is not None and method.upper() not in IDEMPOTENT_METHODS and not connect_error:
+        return None
+    if error is None and status >= 500 and method.upper() not in IDEMPOTENT_METHODS:
+        return None
+    delay: float = None
+    if error is None and status in (429, 503) and headers is not None:
+        delay = parse_retry_after(headers.get("Retry-After"))
+        if delay is not None and delay > policy["max_retry_after"]:
+            return __give_up__(policy)
+    if attempt + 1 >= policy["max_attempts"]:
+        return __give_up__(policy)
+    if delay is None:
+        delay = backoff_delay(policy, attempt)
+    # A retry that can not finish before the deadline is not worth it.
+    left: float = lotr_deadline_fp.remaining()
+    if left is not None and delay >= left:
+        return __give_up__(policy)
+    with policy["lock"]:
+        policy["stats"]["retries"] += 1
+    return delay
+
+
+def __give_up__(policy: dict) -> None:
+    with policy["lock"]:
+        policy["stats"]["gave_up"] += 1
+    return None
+
+
+def record_latency(policy: dict, seconds: float) -> None:
+    """
+    Record the latency of a request, to tell when to hedge.
+
+    Args:
+        policy (dict): [Retry policy created by create_retry_policy()]
+        seconds (float): [Latency of the request]
+    """
+    with policy["lock"]:
+        policy["latencies"].append(seconds)
+    return
+
+
+def record_hedge(policy: dict, won: bool = False) -> None:
+    """
+    Count a hedged request, or a hedged request answering first.
+
+    Args:
+        policy (dict): [Retry policy created by create_retry_policy()]
+        won (bool): [The second copy answered first]
+    """
+    with policy["lock"]:
+        policy["stats"]["hedge_wins" if won else "hedges"] += 1
+    return
+
+
+def hedge_threshold(policy: dict, method: str = "GET") -> float:
+    """
+    Return the latency after which a request is hedged.
+
+    Args:
+        policy (dict): [Retry policy created by create_retry_policy()]
+        method (str): [HTTP method of the request]
+
+    Returns:
+        float: [Seconds, or None if the request is not hedged]
+    """
+    if policy["hedge_percentile"] is None or method.upper() not in IDEMPOTENT_METHODS:
+        return None
+    with policy["lock"]:
+        if len(policy["latencies"]) < policy["hedge_min_samples"]:
+            return None
+        latencies: list = sorted(policy["latencies"])
+    at: int = min(math.ceil(policy["hedge_percentile"] * len(latencies)) - 1, len(latencies) - 1)
+    return latencies[max(at, 0)]
+
+
+def retry_stats(policy: dict) -> dict:
+    """
+    Return the counters of the policy.
+
+    Args:
+        policy (dict): [Retry policy created by create_retry_policy()]
+
+    Returns:
+        dict: [attempts, retries, gave_up, hedges & hedge_wins]
+    """
+    with policy["lock"]:
+        return dict(policy["stats"])
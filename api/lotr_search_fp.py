@@ -0,0 +1,273 @@
+from array import array
+from bisect import bisect_left
+import math
+import re
+import unicodedata
+from typing import Callable, Dict, List, Tuple
+
+# Words, with inner apostrophes kept (don't, o'er).
+TOKEN_PATTERN = re.compile(r"\w+(?:'\w+)*")
+# Query clauses: "a phrase" or a word, optionally ending with * for a prefix.
+QUERY_PATTERN = re.compile(r'"(?P<phrase>[^"]*)"|(?P<word>\S+)')
+
+
+def normalize(text: str) -> str:
+    """
+    Fold a text for matching: accents are removed and the case is folded. E.g. Éowyn -> eowyn
+
+    Args:
+        text (str): [Text]
+
+    Returns:
+        str: [Normalized text]
+    """
+    decomposed: str = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into normalized tokens, in order.
+
+    Args:
+        text (str): [Text. E.g. "Don't you leave him, Samwise Gamgee."]
+
+    Returns:
+        List[str]: [Tokens. E.g. ["don't", "you", "leave", "him", "samwise", "gamgee"]]
+    """
+    return TOKEN_PATTERN.findall(normalize(text))
+
+
+def create_search_index(k1: float = 1.2, b: float = 0.75) -> dict:
+    """
+    Create an inverted index of texts for ranked full-text search, e.g. over the dialog of the quotes.
+    Every term maps to the sorted positions of the texts holding it with its frequency in each of them,
+    packed in arrays. Texts are added and removed one by one, so that the index can follow a dataset refresh.
+
+    Args:
+        k1 (float): [BM25 term frequency saturation]
+        b (float): [BM25 length normalization]
+
+    Returns:
+        dict: [Search index]
+    """
+    return {
+        "k1": k1,
+        "b": b,
+        "postings": {},
+        "lengths": array("I"),
+        "indexed": bytearray(),
+        "count": 0,
+        "total_length": 0,
+        "vocabulary": [],
+        "sorted": True,
+    }
+
+
+def index_text(index: dict, position: int, text: str) -> None:
+    """
+    Add the text of a document to the index.
+
+    Args:
+        index (dict): [Search index created by create_search_index()]
+        position (int): [Position of the document]
+        text (str): [Text of the document]
+    """
+    tokens: List[str] = tokenize(text)
+    frequencies: Dict[str, int] = {}
+    for token in tokens:
+        frequencies[token] = frequencies.get(token, 0) + 1
+    postings: dict = index["postings"]
+    for term, frequency in frequencies.items():
+        posting: tuple = postings.get(term)
+        if posting is None:
+            postings[term] = (array("I", [position]), array("I", [frequency]))
+            index["sorted"] = False
+            continue
+        positions, counts = posting
+        if not positions or positions[-1] < position:
+            positions.append(position)
+            counts.append(frequency)
+        else:
+            at: int = bisect_left(positions, position)
+            positions.insert(at, position)
+            counts.insert(at, frequency)
+    lengths: array = index["lengths"]
+    if len(lengths) <= position:
+        lengths.extend([0] * (position + 1 - len(lengths)))
+        index["indexed"].extend(bytes(position + 1 - len(index["indexed"])))
+    lengths[position] = len(tokens)
+    index["indexed"][position] = 1
+    index["count"] += 1
+    index["total_length"] += len(tokens)
+    return
+
+
+def unindex_text(index: dict, position: int, text: str) -> None:
+    """
+    Remove the text of a document from the index. The text must be the one that was indexed.
+
+    Args:
+        index (dict): [Search index created by create_search_index()]
+        position (int): [Position of the document]
+        text (str): [Indexed text of the document]
+    """
+    if position >= len(index["indexed"]) or not index["indexed"][position]:
+        return
+    postings: dict = index["postings"]
+    for term in set(tokenize(text)):
+        posting: tuple = postings.get(term)
+        if posting is None:
+            continue
+        positions, counts = posting
+        at: int = bisect_left(positions, position)
+        if at < len(positions) and positions[at] == position:
+            del positions[at]
+            del counts[at]
+        if not positions:
+            del postings[term]
+            index["sorted"] = False
+    index["count"] -= 1
+    index["total_length"] -= index["lengths"][position]
+    index["lengths"][position] = 0
+    index["indexed"][position] = 0
+    return
+
+
+def __expand_prefix__(index: dict, prefix: str) -> List[str]:
+    """
+    Return the indexed terms starting with a prefix, with a binary search in the sorted vocabulary.
+    """
+    if not index["sorted"]:
+        index["vocabulary"] = sorted(index["postings"])
+        index["sorted"] = True
+    vocabulary: List[str] = index["vocabulary"]
+    terms: List[str] = []
+    for at in range(bisect_left(vocabulary, prefix), len(vocabulary)):
+        if not vocabulary[at].startswith(prefix):
+            break
+        terms.append(vocabulary[at])
+    return terms
+
+
+def parse_query(query: str) -> List[tuple]:
+    """
+    Parse a search query into clauses.
+    ```
+    ring                 term
+    prec*                prefix: precious, precise...
+    "you shall not pass" phrase: consecutive terms
+    ```
+
+    Args:
+        query (str): [Search query]
+
+    Returns:
+        List[tuple]: [("term", term), ("prefix", prefix) or ("phrase", terms)]
+    """
+    clauses: List[tuple] = []
+    for match in QUERY_PATTERN.finditer(query or ""):
+        if match.group("phrase") is not None:
+            terms: List[str] = tokenize(match.group("phrase"))
+        else:
+            word: str = match.group("word")
+            terms = tokenize(word)
+            if word.endswith("*") and len(terms) == 1:
+                clauses.append(("prefix", terms[0]))
+                continue
+        if len(terms) == 1:
+            clauses.append(("term", terms[0]))
+        elif terms:
+            clauses.append(("phrase", tuple(terms)))
+    return clauses
+
+
+def __bm25__(index: dict, frequency: int, length: int, matched: int) -> float:
+    """
+    BM25 score of one clause in one document.
+    """
+    count: int = max(index["count"], 1)
+    average: float = index["total_length"] / count or 1.0
+    idf: float = math.log(1 + (count - matched + 0.5) / (matched + 0.5))
+    norm: float = index["k1"] * (1 - index["b"] + index["b"] * length / average)
+    return idf * frequency * (index["k1"] + 1) / (frequency + norm)
+
+
+def __term_scores__(index: dict, term: str) -> Dict[int, float]:
+    posting: tuple = index["postings"].get(term)
+    if posting is None:
+        return {}
+    positions, counts = posting
+    lengths: array = index["lengths"]
+    return {
+        position: __bm25__(index, frequency, lengths[position], len(positions))
+        for position, frequency in zip(positions, counts)
+    }
+
+
+def __phrase_scores__(index: dict, terms: tuple, text_of: Callable[[int], str]) -> Dict[int, float]:
+    """
+    Score the documents holding a phrase. The documents holding all of its terms are found in the postings,
+    then their text is tokenized again to count the runs of consecutive terms.
+    """
+    candidates: set = None
+    for term in set(terms):
+        posting: tuple = index["postings"].get(term)
+        if posting is None:
+            return {}
+        candidates = set(posting[0]) if candidates is None else candidates & set(posting[0])
+    frequencies: Dict[int, int] = {}
+    width: int = len(terms)
+    for position in candidates:
+        tokens: List[str] = tokenize(text_of(position))
+        frequency: int = sum(
+            1 for at in range(len(tokens) - width + 1) if tuple(tokens[at : at + width]) == terms
+        )
+        if frequency:
+            frequencies[position] = frequency
+    lengths: array = index["lengths"]
+    return {
+        position: __bm25__(index, frequency, lengths[position], len(frequencies))
+        for position, frequency in frequencies.items()
+    }
+
+
+def search(
+    index: dict, query: str, text_of: Callable[[int], str], match: str = "all"
+) -> List[Tuple[int, float]]:
+    """
+    Run a full-text query on the index and rank the matched documents with BM25.
+    A prefix scores as the sum of the terms it expands to; a phrase scores on its number of occurrences.
+
+    Args:
+        index (dict): [Search index created by create_search_index()]
+        query (str): [Search query. E.g. 'prec* "my precious" ring']
+        text_of (Callable[[int], str]): [Text of the document at a position, to check phrases]
+        match (str): ["all" for documents matching every clause, "any" for documents matching at least one]
+
+    Returns:
+        List[Tuple[int, float]]: [(position, score) from the best score, ties in position order]
+    """
+    totals: Dict[int, float] = None
+    for kind, value in parse_query(query):
+        if kind == "term":
+            scores: Dict[int, float] = __term_scores__(index, value)
+        elif kind == "prefix":
+            scores = {}
+            for term in __expand_prefix__(index, value):
+                for position, score in __term_scores__(index, term).items():
+                    scores[position] = scores.get(position, 0.0) + score
+        else:
+            scores = __phrase_scores__(index, value, text_of)
+        if totals is None:
+            totals = scores
+        elif match == "all":
+            totals = {
+                position: score + scores[position]
+                for position, score in totals.items()
+                if position in scores
+            }
+        else:
+            for position, score in scores.items():
+                totals[position] = totals.get(position, 0.0) + score
+    return sorted((totals or {}).items(), key=lambda item: (-item[1], item[0]))
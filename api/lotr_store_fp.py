@@ -0,0 +1,716 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Mapping, Sequence
+import re
+from typing import Any, Iterable, Iterator, List, Set
+
+import api.lotr_search_fp as lotr_search_fp
+
+# Kinds of column. ObjectIds are interned as 12 bytes, texts share one UTF-8 buffer,
+# numbers are packed in arrays and anything else is kept as a list of Python objects.
+KIND_OID: str = "oid"
+KIND_TEXT: str = "text"
+KIND_INT: str = "int"
+KIND_FLOAT: str = "float"
+KIND_OBJECT: str = "object"
+KIND_ALIAS: str = "alias"
+
+OBJECT_ID_PATTERN = re.compile(r"^[0-9a-f]{24}$")
+INT64_MIN: int = -(2**63)
+INT64_MAX: int = 2**63 - 1
+
+# Marker of a field missing from a document.
+MISSING: object = object()
+
+
+def create_document_store(
+    docs: Iterable[dict] = (),
+    hash_fields: Iterable[str] = (),
+    sorted_fields: Iterable[str] = (),
+    text_fields: Iterable[str] = (),
+) -> dict:
+    """
+    Create a compact columnar store of documents, e.g. the quotes or the movies of the API.
+    Every field is kept in one column:
+    ObjectIds (_id, movie, character) are interned in one table of 12-byte values and referred to by index,
+    texts (dialog, name) are concatenated in one UTF-8 buffer with an array of offsets,
+    numbers are packed in typed arrays, and a field always equal to another one (id and _id) is stored once.
+    Documents can be appended one by one, so a paginated crawl can be stored while it streams in.
+    Use records() to read the documents back as dict-compatible records.
+
+    Secondary indexes are kept up to date by every append, update and delete:
+    a hash index maps each value of a field to the positions holding it (index_lookup() is O(1)),
+    a sorted index keeps the numeric values of a field in order (index_range() is O(log n)),
+    a text index is an inverted index of the words of a field for ranked full-text search (search_text()).
+
+    Args:
+        docs (Iterable[dict]): [Documents to be stored]
+        hash_fields (Iterable[str]): [Fields with a hash index. E.g. ("_id", "movie", "character")]
+        sorted_fields (Iterable[str]): [Numeric fields with a sorted index. E.g. ("budgetInMillions",)]
+        text_fields (Iterable[str]): [Text fields with a full-text index. E.g. ("dialog",)]
+
+    Returns:
+        dict: [Document store]
+    """
+    store: dict = {
+        "size": 0,
+        "columns": {},
+        "oids": bytearray(),
+        "oid_positions": {},
+        "deleted": set(),
+        "live": None,
+        "indexes": {
+            "hash": {
+                field: {"oids": {}, "values": {}, "unindexed": set()} for field in hash_fields
+            },
+            "sorted": {field: {"entries": [], "sorted": True} for field in sorted_fields},
+            "text": {field: lotr_search_fp.create_search_index() for field in text_fields},
+        },
+    }
+    for doc in docs:
+        store_append(store, doc)
+    return store
+
+
+def intern_object_id(store: dict, value: str) -> int:
+    """
+    Return the index of an ObjectId in the interned table of the store, adding it when new.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        value (str): [24-char hex ObjectId]
+
+    Returns:
+        int: [Index in the interned table]
+    """
+    key: bytes = bytes.fromhex(value)
+    index: int = store["oid_positions"].get(key)
+    if index is None:
+        index = len(store["oid_positions"])
+        store["oids"] += key
+        store["oid_positions"][key] = index
+    return index
+
+
+def object_id_at(store: dict, index: int) -> str:
+    """
+    Return the ObjectId at an index of the interned table.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        index (int): [Index in the interned table]
+
+    Returns:
+        str: [24-char hex ObjectId]
+    """
+    return store["oids"][index * 12 : index * 12 + 12].hex()
+
+
+def __kind_of__(value: Any) -> str:
+    """
+    Pick the most compact kind of column able to hold a value.
+    """
+    if isinstance(value, str):
+        return KIND_OID if OBJECT_ID_PATTERN.match(value) else KIND_TEXT
+    if isinstance(value, bool):
+        return KIND_OBJECT
+    if isinstance(value, int):
+        return KIND_INT if INT64_MIN <= value <= INT64_MAX else KIND_OBJECT
+    if isinstance(value, float):
+        return KIND_FLOAT
+    return KIND_OBJECT
+
+
+def __fits__(kind: str, value: Any) -> bool:
+    """
+    Tell whether a column of a kind can hold a value.
+    """
+    value_kind: str = __kind_of__(value)
+    return (
+        kind == KIND_OBJECT
+        or value_kind == kind
+        or (kind == KIND_FLOAT and value_kind == KIND_INT)
+        or (kind == KIND_TEXT and value_kind == KIND_OID)
+    )
+
+
+def __new_column__(kind: str) -> dict:
+    if kind == KIND_OID:
+        return {"kind": kind, "values": array("I"), "missing": set()}
+    if kind == KIND_TEXT:
+        # Texts rewritten by store_update() are appended to the buffer and located in 'moved'.
+        return {
+            "kind": kind,
+            "buffer": bytearray(),
+            "offsets": array("Q", [0]),
+            "moved": {},
+            "garbage": 0,
+            "missing": set(),
+        }
+    if kind == KIND_INT:
+        return {"kind": kind, "values": array("q"), "missing": set()}
+    if kind == KIND_FLOAT:
+        return {"kind": kind, "values": array("d"), "missing": set()}
+    return {"kind": KIND_OBJECT, "values": [], "missing": set()}
+
+
+def __push__(store: dict, column: dict, value: Any) -> None:
+    """
+    Append a value (or MISSING) at the end of a column.
+    """
+    kind: str = column["kind"]
+    if value is MISSING:
+        column["missing"].add(__column_size__(column))
+        value = {KIND_OID: None, KIND_TEXT: "", KIND_INT: 0, KIND_FLOAT: 0.0}.get(kind)
+        if kind == KIND_OID:
+            column["values"].append(0)
+            return
+    if kind == KIND_OID:
+        column["values"].append(intern_object_id(store, value))
+    elif kind == KIND_TEXT:
+        start: int = len(column["buffer"])
+        column["buffer"] += value.encode("utf-8")
+        if start != column["offsets"][-1]:
+            # Texts rewritten by store_update() lie between the previous value and this one.
+            column["moved"][__column_size__(column)] = (start, len(column["buffer"]))
+        column["offsets"].append(len(column["buffer"]))
+    else:
+        column["values"].append(value)
+    return
+
+
+def __column_size__(column: dict) -> int:
+    if column["kind"] == KIND_TEXT:
+        return len(column["offsets"]) - 1
+    return len(column["values"])
+
+
+def column_value(store: dict, field: str, position: int) -> Any:
+    """
+    Read one value of a column.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        field (str): [Field name]
+        position (int): [Position of the document in the store]
+
+    Returns:
+        Any: [Value, or MISSING if the document has no such field]
+    """
+    column: dict = store["columns"].get(field)
+    if column is None:
+        return MISSING
+    kind: str = column["kind"]
+    if kind == KIND_ALIAS:
+        return column_value(store, column["target"], position)
+    if position in column["missing"]:
+        return MISSING
+    if kind == KIND_OID:
+        return object_id_at(store, column["values"][position])
+    if kind == KIND_TEXT:
+        return __text_at__(column, position).decode("utf-8")
+    if kind == KIND_FLOAT:
+        # JSON numbers do not tell integers from floats, so whole numbers come back as int like json.loads() does.
+        number: float = column["values"][position]
+        return int(number) if number.is_integer() else number
+    return column["values"][position]
+
+
+def __text_at__(column: dict, position: int) -> bytearray:
+    """
+    Read the UTF-8 bytes of one value of a text column.
+    """
+    moved: tuple = column["moved"].get(position)
+    if moved is not None:
+        return column["buffer"][moved[0] : moved[1]]
+    offsets: array = column["offsets"]
+    return column["buffer"][offsets[position] : offsets[position + 1]]
+
+
+def __rebuild_column__(store: dict, field: str, kind: str) -> None:
+    """
+    Convert a column to another kind, e.g. when a value does not fit its current kind.
+    """
+    values: List[Any] = [column_value(store, field, i) for i in range(store["size"])]
+    column: dict = __new_column__(kind)
+    for value in values:
+        __push__(store, column, value)
+    store["columns"][field] = column
+    return
+
+
+def __fit_column__(store: dict, field: str, doc: dict) -> dict:
+    """
+    Convert the column of a field when the value of a document does not fit it.
+
+    Returns:
+        dict: [Column to hold the value, or None for an alias equal to its target]
+    """
+    columns: dict = store["columns"]
+    column: dict = columns[field]
+    value: Any = doc.get(field, MISSING)
+    if column["kind"] == KIND_ALIAS:
+        if value == doc.get(column["target"], MISSING):
+            return None
+        __rebuild_column__(store, field, KIND_OBJECT)
+    elif value is not MISSING and not __fits__(column["kind"], value):
+        kind: str = KIND_FLOAT if __kind_of__(value) == KIND_FLOAT and column["kind"] == KIND_INT else KIND_OBJECT
+        __rebuild_column__(store, field, kind)
+    return columns[field]
+
+
+def store_append(store: dict, doc: dict) -> int:
+    """
+    Append one document at the end of the store.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        doc (dict): [Document]
+
+    Returns:
+        int: [Position of the document in the store]
+    """
+    position: int = store["size"]
+    columns: dict = store["columns"]
+    for field, value in doc.items():
+        if field in columns:
+            continue
+        # A field equal to an ObjectId field of the first document is stored once.
+        target: str = next(
+            (
+                other
+                for other, column in columns.items()
+                if position == 0 and column["kind"] == KIND_OID and doc.get(other) == value
+            ),
+            None,
+        )
+        if target is not None:
+            columns[field] = {"kind": KIND_ALIAS, "target": target}
+            continue
+        column: dict = __new_column__(__kind_of__(value))
+        for _ in range(position):
+            __push__(store, column, MISSING)
+        columns[field] = column
+
+    for field in list(columns):
+        column = __fit_column__(store, field, doc)
+        if column is not None:
+            __push__(store, column, doc.get(field, MISSING))
+    store["size"] = position + 1
+    if store["deleted"]:
+        store["live"] = None
+    __index_add__(store, position)
+    return position
+
+
+def __assign__(store: dict, column: dict, position: int, value: Any) -> None:
+    """
+    Overwrite a value (or MISSING) of a column in place.
+    """
+    kind: str = column["kind"]
+    if kind == KIND_TEXT and position not in column["missing"]:
+        column["garbage"] += len(__text_at__(column, position))
+    if value is MISSING:
+        column["missing"].add(position)
+        return
+    column["missing"].discard(position)
+    if kind == KIND_OID:
+        column["values"][position] = intern_object_id(store, value)
+    elif kind == KIND_TEXT:
+        start: int = len(column["buffer"])
+        column["buffer"] += value.encode("utf-8")
+        column["moved"][position] = (start, len(column["buffer"]))
+    else:
+        column["values"][position] = value
+    return
+
+
+def store_update(store: dict, position: int, doc: dict) -> None:
+    """
+    Replace the document at a position in place, keeping its position and the order of the store.
+    Rewritten texts are appended to the text buffer, which is compacted once it holds more garbage than text.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        position (int): [Position of the document in the store]
+        doc (dict): [New version of the document]
+    """
+    __index_remove__(store, position)
+    columns: dict = store["columns"]
+    for field in doc:
+        if field not in columns:
+            column: dict = __new_column__(__kind_of__(doc[field]))
+            for _ in range(store["size"]):
+                __push__(store, column, MISSING)
+            columns[field] = column
+    # Aliases are checked once the fields they point to hold their new value.
+    fields: List[str] = sorted(columns, key=lambda field: columns[field]["kind"] == KIND_ALIAS)
+    for field in fields:
+        column = __fit_column__(store, field, doc)
+        if column is None:
+            continue
+        __assign__(store, column, position, doc.get(field, MISSING))
+        if column["kind"] == KIND_TEXT and column["garbage"] * 2 > len(column["buffer"]):
+            __rebuild_column__(store, field, KIND_TEXT)
+    __index_add__(store, position)
+    return
+
+
+def store_delete(store: dict, position: int) -> None:
+    """
+    Delete the document at a position. The position is left as a tombstone, so the others keep theirs.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        position (int): [Position of the document in the store]
+    """
+    if position in store["deleted"]:
+        return
+    __index_remove__(store, position)
+    store["deleted"].add(position)
+    store["live"] = None
+    return
+
+
+def find_position(store: dict, id: str) -> int:
+    """
+    Return the position of the document with an _id, using the hash index of _id when there is one.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        id (str): [_id of the document]
+
+    Returns:
+        int: [Position of the document, or None if not stored]
+    """
+    positions: Set[int] = index_lookup(store, "_id", [id])
+    if positions is None:
+        positions = {
+            position
+            for position in live_positions(store)
+            if column_value(store, "_id", position) == id
+        }
+    return min(positions) if positions else None
+
+
+def store_upsert(store: dict, doc: dict) -> int:
+    """
+    Update the stored document with the same _id, or append it when new.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        doc (dict): [Document]
+
+    Returns:
+        int: [Position of the document in the store]
+    """
+    position: int = find_position(store, doc.get("_id"))
+    if position is None:
+        return store_append(store, doc)
+    store_update(store, position, doc)
+    return position
+
+
+def store_remove(store: dict, id: str) -> bool:
+    """
+    Delete the document with an _id.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        id (str): [_id of the document]
+
+    Returns:
+        bool: [True if a document was deleted]
+    """
+    position: int = find_position(store, id)
+    if position is None:
+        return False
+    store_delete(store, position)
+    return True
+
+
+def live_positions(store: dict) -> Sequence:
+    """
+    Return the positions of the documents that are not deleted, in store order.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+
+    Returns:
+        Sequence: [Positions]
+    """
+    if not store["deleted"]:
+        return range(store["size"])
+    if store["live"] is None:
+        deleted: Set[int] = store["deleted"]
+        store["live"] = array("I", (i for i in range(store["size"]) if i not in deleted))
+    return store["live"]
+
+
+def __indexed_field__(store: dict, field: str) -> str:
+    """
+    Follow an alias to the field actually holding the values. E.g. id -> _id
+    """
+    column: dict = store["columns"].get(field)
+    if column is not None and column["kind"] == KIND_ALIAS:
+        return column["target"]
+    return field
+
+
+def __hash_keys__(store: dict, value: Any, intern: bool) -> Iterator[tuple]:
+    """
+    Yield the keys of a value in a hash index: ("oids", interned index) for ObjectIds, ("values", value) otherwise.
+    A list yields the keys of its items, like an equality filter matches any item of a list.
+    A missing value is keyed as None, like an equality filter on null matches it.
+    """
+    if value is MISSING:
+        value = None
+    if isinstance(value, list):
+        for item in value:
+            yield from __hash_keys__(store, item, intern)
+        return
+    if isinstance(value, str) and OBJECT_ID_PATTERN.match(value):
+        index: int = (
+            intern_object_id(store, value)
+            if intern
+            else store["oid_positions"].get(bytes.fromhex(value))
+        )
+        if index is not None:
+            yield ("oids", index)
+        return
+    yield ("values", value)
+
+
+def __index_add__(store: dict, position: int) -> None:
+    """
+    Add the document at a position to every secondary index of the store.
+    Single positions are kept as int and promoted to a sorted array('I') when a key is shared.
+    """
+    for field, index in store["indexes"]["hash"].items():
+        value: Any = column_value(store, field, position)
+        try:
+            for table, key in set(__hash_keys__(store, value, intern=True)):
+                found: Any = index[table].get(key)
+                if found is None:
+                    index[table][key] = position
+                elif isinstance(found, int):
+                    index[table][key] = array("I", sorted((found, position)))
+                else:
+                    insort(found, position)
+        except TypeError:
+            # Unhashable values (e.g. nested objects) are always checked by the filter itself.
+            index["unindexed"].add(position)
+    for field, index in store["indexes"]["sorted"].items():
+        value = column_value(store, field, position)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if index["sorted"] and index["entries"] and index["entries"][-1] > (value, position):
+                index["sorted"] = False
+            index["entries"].append((value, position))
+    for field, index in store["indexes"]["text"].items():
+        value = column_value(store, field, position)
+        if isinstance(value, str):
+            lotr_search_fp.index_text(index, position, value)
+    return
+
+
+def __index_remove__(store: dict, position: int) -> None:
+    """
+    Remove the document at a position from every secondary index of the store.
+    """
+    for field, index in store["indexes"]["hash"].items():
+        index["unindexed"].discard(position)
+        try:
+            keys: set = set(__hash_keys__(store, column_value(store, field, position), intern=False))
+        except TypeError:
+            continue
+        for table, key in keys:
+            found: Any = index[table].get(key)
+            if found is None:
+                continue
+            if isinstance(found, int):
+                if found == position:
+                    del index[table][key]
+                continue
+            at: int = bisect_left(found, position)
+            if at < len(found) and found[at] == position:
+                del found[at]
+            if len(found) == 1:
+                index[table][key] = found[0]
+    for field, index in store["indexes"]["sorted"].items():
+        value: Any = column_value(store, field, position)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            continue
+        entries: List[tuple] = index["entries"]
+        if not index["sorted"]:
+            entries.sort()
+            index["sorted"] = True
+        at = bisect_left(entries, (value, position))
+        if at < len(entries) and entries[at] == (value, position):
+            del entries[at]
+    for field, index in store["indexes"]["text"].items():
+        value = column_value(store, field, position)
+        if isinstance(value, str):
+            lotr_search_fp.unindex_text(index, position, value)
+    return
+
+
+def index_lookup(store: dict, field: str, values: Iterable[Any]) -> Set[int]:
+    """
+    Return the positions of the documents whose field equals any of the values, in O(1) per value.
+    Positions whose value could not be indexed are always included, so the result is a superset
+    of the matches that the filter predicate then checks.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        field (str): [Field name]
+        values (Iterable[Any]): [Values looked up]
+
+    Returns:
+        Set[int]: [Positions, or None if the field has no hash index]
+    """
+    index: dict = store["indexes"]["hash"].get(__indexed_field__(store, field))
+    if index is None:
+        return None
+    positions: Set[int] = set(index["unindexed"])
+    for value in values:
+        for table, key in __hash_keys__(store, value, intern=False):
+            found: Any = index[table].get(key)
+            if isinstance(found, int):
+                positions.add(found)
+            elif found is not None:
+                positions.update(found)
+    return positions
+
+
+def index_range(store: dict, field: str, operator: str, bound: Any) -> Set[int]:
+    """
+    Return the positions of the documents whose numeric field compares to a bound, in O(log n + matches).
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        field (str): [Field name]
+        operator (str): [<, <=, > or >=]
+        bound (Any): [Number compared to]
+
+    Returns:
+        Set[int]: [Positions, or None if the field has no sorted index]
+    """
+    index: dict = store["indexes"]["sorted"].get(__indexed_field__(store, field))
+    if index is None:
+        return None
+    entries: List[tuple] = index["entries"]
+    if not index["sorted"]:
+        entries.sort()
+        index["sorted"] = True
+    # Positions are never negative nor infinite, so these keys fall before / after every entry with the bound.
+    low: tuple = (bound, -1)
+    high: tuple = (bound, float("inf"))
+    if operator == "<":
+        selected: List[tuple] = entries[: bisect_left(entries, low)]
+    elif operator == "<=":
+        selected = entries[: bisect_right(entries, high)]
+    elif operator == ">":
+        selected = entries[bisect_right(entries, high) :]
+    else:
+        selected = entries[bisect_left(entries, low) :]
+    return {position for _, position in selected}
+
+
+def store_extend(store: dict, docs: Iterable[dict]) -> None:
+    """
+    Append documents at the end of the store.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        docs (Iterable[dict]): [Documents]
+    """
+    for doc in docs:
+        store_append(store, doc)
+    return
+
+
+def search_text(store: dict, field: str, query: str, match: str = "all") -> List[tuple]:
+    """
+    Run a ranked full-text query on the text index of a field.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+        field (str): [Text field with a full-text index. E.g. dialog]
+        query (str): [Search query, see lotr_search_fp.parse_query(). E.g. 'prec* "my precious"']
+        match (str): ["all" for documents matching every clause, "any" for documents matching at least one]
+
+    Returns:
+        List[tuple]: [(position, score) from the best score, or None if the field has no text index]
+    """
+    index: dict = store["indexes"]["text"].get(field)
+    if index is None:
+        return None
+    return lotr_search_fp.search(
+        index, query, text_of=lambda position: column_value(store, field, position), match=match
+    )
+
+
+class Record(Mapping):
+    """
+    Read-only, dict-compatible view of one document of a store.
+    """
+
+    __slots__ = ("store", "position")
+
+    def __init__(self, store: dict, position: int):
+        self.store = store
+        self.position = position
+
+    def __getitem__(self, field: str) -> Any:
+        value: Any = column_value(self.store, field, self.position)
+        if value is MISSING:
+            raise KeyError(field)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        for field in self.store["columns"]:
+            if column_value(self.store, field, self.position) is not MISSING:
+                yield field
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class RecordList(Sequence):
+    """
+    Read-only, list-compatible view of all the documents of a store. Deleted documents are skipped.
+    """
+
+    __slots__ = ("store",)
+
+    def __init__(self, store: dict):
+        self.store = store
+
+    def __getitem__(self, position):
+        positions: Sequence = live_positions(self.store)
+        if isinstance(position, slice):
+            return [Record(self.store, i) for i in positions[position]]
+        return Record(self.store, positions[position])
+
+    def __len__(self) -> int:
+        return self.store["size"] - len(self.store["deleted"])
+
+    def __repr__(self) -> str:
+        return f"RecordList(size={len(self)})"
+
+
+def records(store: dict) -> RecordList:
+    """
+    Return the documents of a store as a list-compatible sequence of dict-compatible records.
+    Records are decoded lazily, field by field, when they are read.
+
+    Args:
+        store (dict): [Document store created by create_document_store()]
+
+    Returns:
+        RecordList: [Documents]
+    """
+    return RecordList(store)
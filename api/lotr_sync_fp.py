@@ -0,0 +1,237 @@
+import asyncio
+from collections import deque
+import hashlib
+import json
+from typing import AsyncIterator, Callable, Deque, Dict, List
+
+import api.lotr_store_fp as lotr_store_fp
+
+ADDED: str = "added"
+MODIFIED: str = "modified"
+REMOVED: str = "removed"
+
+
+def create_sync_state(page_size: int = 1000) -> dict:
+    """
+    Create the state of the incremental sync of the local datasets.
+    For each collection it keeps a snapshot of the last sync: the total, and for each page its ETag,
+    the hash of its documents and their ids, plus a hash of every document.
+    The next sync then sends conditional requests, and only the pages that changed are downloaded and compared.
+
+    Args:
+        page_size (int): [Number of documents per page. Must stay the same between syncs for the pages to be compared]
+
+    Returns:
+        dict: [Sync state]
+    """
+    return {
+        "page_size": page_size,
+        "endpoints": {},
+        "stats": {
+            "syncs": 0,
+            "pages_fetched": 0,
+            "pages_not_modified": 0,
+            "pages_unchanged": 0,
+            ADDED: 0,
+            MODIFIED: 0,
+            REMOVED: 0,
+        },
+    }
+
+
+def document_hash(doc: dict) -> bytes:
+    """
+    Hash the content of a document, whatever the order of its fields.
+
+    Args:
+        doc (dict): [Document]
+
+    Returns:
+        bytes: [Hash of 8 bytes]
+    """
+    encoded: bytes = json.dumps(doc, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=8).digest()
+
+
+def __page_hash__(hashes: List[bytes]) -> bytes:
+    return hashlib.blake2b(b"".join(hashes), digest_size=8).digest()
+
+
+def __change__(endpoint: str, op: str, id: str, doc: dict) -> dict:
+    return {"endpoint": endpoint, "op": op, "id": id, "doc": doc}
+
+
+async def aio_iter_sync(
+    fetch: Callable,
+    state: dict,
+    datasets: dict,
+    endpoints: tuple = ("movie", "quote"),
+    window: int = 4,
+    indexes: dict = None,
+    **params,
+) -> AsyncIterator[dict]:
+    """
+    Bring the local datasets up to date with the server and yield what changed, as a diff stream.
+    Every page is requested with the ETag of the last sync: a page not modified costs a 304 without a body,
+    and a page whose documents hash the same as before is not compared again. Only the documents
+    of the changed pages are compared, by hash, to the last sync; the ids no page holds any more were removed.
+    The changes are applied to the columnar store of the dataset as they are yielded, keeping its indexes up to date.
+    The first sync of a collection downloads it whole, reports every document as added,
+    and puts the dataset in place once complete.
+    ```
+    async for change in client["aio_sync_datasets"]():
+        print(change["op"], change["endpoint"], change["id"])
+    ```
+
+    Args:
+        fetch (Callable): [non-blocking API call returning the response envelope, accepting validators]
+        state (dict): [Sync state created by create_sync_state(), updated in place]
+        datasets (dict): [Documents held in memory by endpoint, updated in place]
+        endpoints (tuple): [Collections to be synced]
+        window (int): [Max number of pages being fetched ahead]
+        indexes (dict): [Secondary indexes of the columnar store by endpoint, for the first sync. None for no index]
+        **params: [Other keyword arguments of fetch. E.g. priority]
+
+    Raises:
+        RuntimeError: [A page could not be fetched. The pages synced so far are kept and the removals are not applied]
+
+    Yields:
+        dict: [{"endpoint": collection, "op": "added" | "modified" | "removed", "id": _id, "doc": new document, None if removed}]
+    """
+    state["stats"]["syncs"] += 1
+    for endpoint in endpoints:
+        async for change in __aio_sync_endpoint__(
+            fetch, state, datasets, endpoint, window, (indexes or {}).get(endpoint, {}), params
+        ):
+            yield change
+
+
+async def __aio_fetch_page__(
+    fetch: Callable, endpoint: str, page_size: int, page: int, etag: str, params: dict
+) -> dict:
+    response: dict = await fetch(
+        endpoint=endpoint,
+        id=None,
+        query=None,
+        filter=f"limit={page_size}&page={page}",
+        validators=None if etag is None else {"If-None-Match": etag},
+        **params,
+    )
+    if "error" in response or response["status"] not in (200, 304):
+        raise RuntimeError(f"Failed to sync {endpoint} page={page}: {response}")
+    return response
+
+
+async def __aio_sync_endpoint__(
+    fetch: Callable,
+    state: dict,
+    datasets: dict,
+    endpoint: str,
+    window: int,
+    indexes: dict,
+    params: dict,
+) -> AsyncIterator[dict]:
+    stats: dict = state["stats"]
+    snapshot: dict = state["endpoints"].get(endpoint)
+    if snapshot is None:
+        snapshot = {
+            "total": None,
+            "pages": [],
+            "hashes": {},
+            "store": lotr_store_fp.create_document_store(**indexes),
+            "published": False,
+        }
+        state["endpoints"][endpoint] = snapshot
+    pages: List[dict] = snapshot["pages"]
+    hashes: Dict[str, bytes] = snapshot["hashes"]
+    store: dict = snapshot["store"]
+
+    def fetch_page(page: int) -> asyncio.Future:
+        etag: str = pages[page - 1]["etag"] if page <= len(pages) else None
+        return asyncio.ensure_future(
+            __aio_fetch_page__(fetch, endpoint, state["page_size"], page, etag, params)
+        )
+
+    def apply(page: int, response: dict) -> List[dict]:
+        # Update the snapshot of one page and return the changes of its documents.
+        if response["status"] == 304:
+            stats["pages_not_modified"] += 1
+            return []
+        stats["pages_fetched"] += 1
+        docs: List[dict] = response["data"]["docs"]
+        doc_hashes: List[bytes] = [document_hash(doc) for doc in docs]
+        entry: dict = {
+            "etag": response["headers"].get("ETag"),
+            "hash": __page_hash__(doc_hashes),
+            "ids": [doc["_id"] for doc in docs],
+        }
+        unchanged: bool = page <= len(pages) and pages[page - 1]["hash"] == entry["hash"]
+        if page <= len(pages):
+            pages[page - 1] = entry
+        else:
+            pages.append(entry)
+        if unchanged:
+            stats["pages_unchanged"] += 1
+            return []
+        changes: List[dict] = []
+        for doc, doc_hash in zip(docs, doc_hashes):
+            previous: bytes = hashes.get(doc["_id"])
+            if previous == doc_hash:
+                continue
+            hashes[doc["_id"]] = doc_hash
+            op: str = ADDED if previous is None else MODIFIED
+            if previous is None:
+                lotr_store_fp.store_append(store, doc)
+            else:
+                lotr_store_fp.store_upsert(store, doc)
+            stats[op] += 1
+            changes.append(__change__(endpoint, op, doc["_id"], doc))
+        return changes
+
+    first: dict = await fetch_page(1)
+    page_count: int = len(pages) if first["status"] == 304 else first["data"]["pages"]
+    if first["status"] != 304:
+        snapshot["total"] = first["data"]["total"]
+    for change in apply(1, first):
+        yield change
+
+    next_page: int = 2
+    pending: Deque[asyncio.Future] = deque()
+    try:
+        while next_page <= page_count or pending:
+            while next_page <= page_count and len(pending) < max(window, 1):
+                pending.append(fetch_page(next_page))
+                next_page += 1
+            page: int = next_page - len(pending)
+            response: dict = await pending.popleft()
+            for change in apply(page, response):
+                yield change
+    finally:
+        for task in pending:
+            task.cancel()
+
+    # The pages past the last one are gone, with the documents no page holds any more.
+    del pages[page_count:]
+    live: set = {id for entry in pages for id in entry["ids"]}
+    for id in [id for id in hashes if id not in live]:
+        del hashes[id]
+        lotr_store_fp.store_remove(store, id)
+        stats[REMOVED] += 1
+        yield __change__(endpoint, REMOVED, id, None)
+    if not snapshot["published"]:
+        datasets[endpoint] = lotr_store_fp.records(store)
+        snapshot["published"] = True
+    return
+
+
+def sync_stats(state: dict) -> dict:
+    """
+    Return the counters of the sync.
+
+    Args:
+        state (dict): [Sync state created by create_sync_state()]
+
+    Returns:
+        dict: [syncs, pages fetched / not modified (304) / unchanged (same documents), documents added, modified & removed]
+    """
+    return dict(state["stats"])
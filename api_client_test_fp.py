@@ -72,6 +72,9 @@ async def async_run():
         # Collect all the results
         results: list = await asyncio.gather(*tasks)
 
+        # Release the pooled connections of the client
+        await client["aio_close"]()
+
         # Print out the results
         list(map(lambda result: logger.info(f"result={result}"), results))
         return
@@ -107,6 +110,9 @@ async def async_run():
     # Collect all the results
     results: list = await asyncio.gather(*tasks)
 
+    # Release the pooled connections of the client
+    await client["aio_close"]()
+
     # Print out the results
     list(map(lambda result: logger.info(f"result={result}\r\n"), results))
     return
@@ -0,0 +1,331 @@
+"""
+Benchmarks of the SDK against the local stub of the-one-api, to measure its own overhead
+and catch performance regressions. Run from the root of the repository:
+```
+python -m benchmarks.bench_client --requests 500 --concurrency 16 --json results.json
+python -m benchmarks.bench_client --baseline results.json --tolerance 0.2
+```
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_cache_fp as lotr_cache_fp
+from tests.stub_api_server import threaded_stub_api_server
+
+API_KEY: str = "benchmark-key"
+
+# Number of calls used to measure the memory, traced allocations being slow.
+MEMORY_CALLS: int = 100
+
+
+def __compose_calls__(state: dict, count: int) -> List[dict]:
+    """
+    Build the keyword arguments of 'count' API calls, going round the movie, movie/{id}, movie/{id}/quote,
+    quote and quote/{id} endpoints, each id lookup on a different document.
+    """
+    movies: List[dict] = state["movies"]
+    quotes: List[dict] = state["quotes"]
+    calls: List[dict] = []
+    for i in range(count):
+        shape: int = i % 5
+        if shape == 0:
+            calls.append({"endpoint": "movie", "id": None, "query": None, "filter": None})
+        elif shape == 1:
+            calls.append({"endpoint": "movie", "id": movies[i % len(movies)]["_id"], "query": None, "filter": None})
+        elif shape == 2:
+            movie: str = quotes[i % len(quotes)]["movie"]
+            calls.append({"endpoint": "movie", "id": movie, "query": "quote", "filter": "limit=100"})
+        elif shape == 3:
+            calls.append({"endpoint": "quote", "id": None, "query": None, "filter": "limit=100"})
+        else:
+            calls.append({"endpoint": "quote", "id": quotes[i % len(quotes)]["_id"], "query": None, "filter": None})
+    return calls
+
+
+def __failed__(output: dict) -> bool:
+    return not isinstance(output, dict) or "error" in output or output.get("success") is False
+
+
+def __run_blocking__(call: Callable[[dict], dict], calls: List[dict], concurrency: int) -> Tuple[list, int, float]:
+    """
+    Send the calls from 'concurrency' threads.
+
+    Returns:
+        Tuple[list, int, float]: [latencies in seconds, number of failed calls, elapsed seconds]
+    """
+
+    def timed(kwargs: dict) -> Tuple[float, bool]:
+        start: float = time.perf_counter()
+        output: dict = call(kwargs)
+        return time.perf_counter() - start, __failed__(output)
+
+    start: float = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results: list = list(executor.map(timed, calls))
+    elapsed: float = time.perf_counter() - start
+    return [latency for latency, _ in results], sum(failed for _, failed in results), elapsed
+
+
+async def __run_async__(call: Callable, calls: List[dict], concurrency: int) -> Tuple[list, int, float]:
+    """
+    Send the calls as tasks, 'concurrency' at once.
+
+    Returns:
+        Tuple[list, int, float]: [latencies in seconds, number of failed calls, elapsed seconds]
+    """
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(kwargs: dict) -> Tuple[float, bool]:
+        async with semaphore:
+            start: float = time.perf_counter()
+            output: dict = await call(kwargs)
+            return time.perf_counter() - start, __failed__(output)
+
+    start: float = time.perf_counter()
+    results: list = await asyncio.gather(*[timed(kwargs) for kwargs in calls])
+    elapsed: float = time.perf_counter() - start
+    return [latency for latency, _ in results], sum(failed for _, failed in results), elapsed
+
+
+def __fetch_unpooled__(base_url: str, calls: List[dict], concurrency: int) -> Tuple[list, int, float]:
+    def call(kwargs: dict) -> dict:
+        try:
+            return lotr_api_fp.fetch_data(api_key=API_KEY, base_url=base_url, **kwargs)
+        except Exception as e:
+            return {"error": str(e)}
+
+    return __run_blocking__(call, calls, concurrency)
+
+
+def __fetch_pooled__(
+    base_url: str, calls: List[dict], concurrency: int, cached: bool = False
+) -> Tuple[list, int, float]:
+    options: dict = {"response_cache": lotr_cache_fp.create_response_cache()} if cached else {}
+    with lotr_api_fp.api_client(api_key=API_KEY, base_url=base_url, **options) as client:
+        if cached:
+            for kwargs in calls:
+                client["fetch"](**kwargs)
+        return __run_blocking__(lambda kwargs: client["fetch"](**kwargs), calls, concurrency)
+
+
+async def __aio_fetch_unpooled__(base_url: str, calls: List[dict], concurrency: int) -> Tuple[list, int, float]:
+    async def call(kwargs: dict) -> dict:
+        try:
+            return await lotr_api_fp.aio_fetch_data(api_key=API_KEY, base_url=base_url, **kwargs)
+        except Exception as e:
+            return {"error": str(e)}
+
+    return await __run_async__(call, calls, concurrency)
+
+
+async def __aio_fetch_pooled__(
+    base_url: str, calls: List[dict], concurrency: int, cached: bool = False
+) -> Tuple[list, int, float]:
+    options: dict = {"response_cache": lotr_cache_fp.create_response_cache()} if cached else {}
+    # No request coalescing without the cache, so that every call goes to the server.
+    async with lotr_api_fp.aio_api_client(
+        api_key=API_KEY, base_url=base_url, single_flight=cached, **options
+    ) as client:
+        if cached:
+            for kwargs in calls:
+                await client["aio_fetch"](**kwargs)
+        return await __run_async__(lambda kwargs: client["aio_fetch"](**kwargs), calls, concurrency)
+
+
+async def __aio_paginate__(base_url: str, calls: List[dict], concurrency: int) -> Tuple[list, int, float]:
+    # One crawl of all the quotes, 100 per page and 4 pages ahead, for every 20 calls.
+    async with lotr_api_fp.aio_api_client(api_key=API_KEY, base_url=base_url) as client:
+
+        async def crawl(kwargs: dict) -> dict:
+            try:
+                count: int = 0
+                async for _ in client["aio_iter_all_quotes"](page_size=100, window=4):
+                    count += 1
+                return {"count": count}
+            except RuntimeError as e:
+                return {"error": str(e)}
+
+        return await __run_async__(crawl, calls[: max(len(calls) // 20, 1)], concurrency)
+
+
+# Name: (runner, is non-blocking)
+SCENARIOS: Dict[str, Tuple[Callable, bool]] = {
+    "fetch_data (unpooled)": (__fetch_unpooled__, False),
+    "fetch (pooled)": (__fetch_pooled__, False),
+    "fetch (pooled, cached)": (lambda *args: __fetch_pooled__(*args, cached=True), False),
+    "aio_fetch_data (unpooled)": (__aio_fetch_unpooled__, True),
+    "aio_fetch (pooled)": (__aio_fetch_pooled__, True),
+    "aio_fetch (pooled, cached)": (lambda *args: __aio_fetch_pooled__(*args, cached=True), True),
+    "aio_iter_all_quotes (pagination)": (__aio_paginate__, True),
+}
+
+
+def __percentile__(ordered: List[float], q: float) -> float:
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def __run_scenario__(name: str, base_url: str, calls: List[dict], concurrency: int) -> dict:
+    runner, is_async = SCENARIOS[name]
+
+    def run(selected: List[dict]) -> Tuple[list, int, float]:
+        if is_async:
+            return asyncio.run(runner(base_url, selected, concurrency))
+        return runner(base_url, selected, concurrency)
+
+    latencies, errors, elapsed = run(calls)
+    # Traced allocations slow every call down, so the memory is measured in a separate, shorter pass.
+    tracemalloc.start()
+    try:
+        run(calls[:MEMORY_CALLS])
+        peak: int = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    ordered: List[float] = sorted(latencies)
+    return {
+        "scenario": name,
+        "calls": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": __percentile__(ordered, 0.50) * 1000,
+        "p90_ms": __percentile__(ordered, 0.90) * 1000,
+        "p99_ms": __percentile__(ordered, 0.99) * 1000,
+        "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run_benchmarks(
+    requests: int = 500,
+    concurrency: int = 16,
+    latency: float = 0.0,
+    quote_count: int = 1000,
+    padding: int = 0,
+    error_rate: float = 0.0,
+    scenarios: Sequence[str] = None,
+) -> List[dict]:
+    """
+    Run the benchmark scenarios against a local stub of the-one-api served from a background thread.
+
+    Args:
+        requests (int): [Number of calls per scenario. The pagination scenario crawls once per 20 calls]
+        concurrency (int): [Number of calls at once]
+        latency (float): [Seconds the stub waits before each answer]
+        quote_count (int): [Number of quotes served by the stub]
+        padding (int): [Number of characters added to each quote, to make the payloads bigger]
+        error_rate (float): [Fraction of the requests the stub answers with 503]
+        scenarios (Sequence[str]): [Names of SCENARIOS to run. All if None]
+
+    Returns:
+        List[dict]: [Result by scenario: calls, errors, throughput (calls/s), p50/p90/p99/max latency (ms) & peak traced memory (KiB)]
+    """
+    results: List[dict] = []
+    with threaded_stub_api_server(
+        quote_count=quote_count, latency=latency, padding=padding, error_rate=error_rate
+    ) as stub:
+        calls: List[dict] = __compose_calls__(stub["state"], requests)
+        for name in SCENARIOS if scenarios is None else scenarios:
+            results.append(__run_scenario__(name, stub["base_url"], calls, concurrency))
+    return results
+
+
+def compare_results(results: List[dict], baseline: List[dict], tolerance: float = 0.2) -> List[str]:
+    """
+    Compare benchmark results to a baseline run.
+
+    Args:
+        results (List[dict]): [Results of run_benchmarks()]
+        baseline (List[dict]): [Results of a previous run]
+        tolerance (float): [Allowed fraction of throughput lost or p99 latency gained]
+
+    Returns:
+        List[str]: [One message per regression. Empty if none]
+    """
+    previous: Dict[str, dict] = {result["scenario"]: result for result in baseline}
+    regressions: List[str] = []
+    for result in results:
+        base: dict = previous.get(result["scenario"])
+        if base is None:
+            continue
+        if result["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{result['scenario']}: throughput {result['throughput']:.1f}/s < baseline {base['throughput']:.1f}/s"
+            )
+        if result["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{result['scenario']}: p99 {result['p99_ms']:.2f}ms > baseline {base['p99_ms']:.2f}ms"
+            )
+    return regressions
+
+
+def format_results(results: List[dict]) -> str:
+    """
+    Format benchmark results as a text table.
+
+    Args:
+        results (List[dict]): [Results of run_benchmarks()]
+
+    Returns:
+        str: [Table]
+    """
+    header: str = (
+        f"{'scenario':<34} {'calls':>6} {'errors':>6} {'calls/s':>9} "
+        f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'peak KiB':>9}"
+    )
+    lines: List[str] = [header, "-" * len(header)]
+    for result in results:
+        lines.append(
+            f"{result['scenario']:<34} {result['calls']:>6} {result['errors']:>6} {result['throughput']:>9.1f} "
+            f"{result['p50_ms']:>8.2f} {result['p90_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+            f"{result['max_ms']:>8.2f} {result['peak_kib']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Benchmark the SDK against a local stub of the-one-api."
+    )
+    parser.add_argument("--requests", type=int, default=500, help="calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="calls at once")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the stub waits before each answer")
+    parser.add_argument("--quotes", type=int, default=1000, help="number of quotes served")
+    parser.add_argument("--padding", type=int, default=0, help="characters added to each quote")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="scenario to run, all by default")
+    parser.add_argument("--json", help="file to write the results to")
+    parser.add_argument("--baseline", help="results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression against the baseline")
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    results: List[dict] = run_benchmarks(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        latency=args.latency,
+        quote_count=args.quotes,
+        padding=args.padding,
+        error_rate=args.error_rate,
+        scenarios=args.scenario,
+    )
+    print(format_results(results))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions: List[str] = compare_results(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Benchmark of the start-up of the SDK: the time and memory taken to import it, and to create a client,
+in a fresh interpreter. The transports (aiohttp & requests) are imported by the first call using them,
+so a process only using the blocking or the non-blocking functions never loads the other one.
+Run from the root of the repository:
+```
+python -m benchmarks.bench_import --runs 20 --json results.json
+python -m benchmarks.bench_import --baseline results.json --tolerance 0.2
+```
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Sequence
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TRANSPORTS: tuple = ("aiohttp", "requests")
+
+# Statement timed in each scenario. "eager" imports both transports as the SDK did before loading them lazily.
+SCENARIOS: Dict[str, str] = {
+    "import": "import api.lotr_api_fp",
+    "import+client": "import api.lotr_api_fp as lotr_api_fp\nlotr_api_fp.create_api_client(api_key='key')",
+    "import+requests": "import api.lotr_api_fp\nimport requests",
+    "import+aiohttp": "import api.lotr_api_fp\nimport aiohttp",
+    "eager": "import api.lotr_api_fp\nimport aiohttp\nimport requests",
+}
+
+# Run in a fresh interpreter: prints the seconds taken by the statement, its peak traced memory
+# and the transports loaded once it has run.
+__PROBE__: str = """
+import json, sys, time, tracemalloc
+statement = sys.argv[1]
+traced = sys.argv[2] == "1"
+if traced:
+    tracemalloc.start()
+start = time.perf_counter()
+exec(compile(statement, "<benchmark>", "exec"), {})
+elapsed = time.perf_counter() - start
+peak = tracemalloc.get_traced_memory()[1] if traced else 0
+print(json.dumps({"seconds": elapsed, "peak": peak, "loaded": [name for name in %r if name in sys.modules]}))
+""" % (TRANSPORTS,)
+
+
+def __probe__(statement: str, traced: bool = False) -> dict:
+    completed: subprocess.CompletedProcess = subprocess.run(
+        [sys.executable, "-c", __PROBE__, statement, "1" if traced else "0"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def __run_scenario__(name: str, runs: int) -> dict:
+    statement: str = SCENARIOS[name]
+    # The first run compiles the byte-code of the modules not cached yet and is left out.
+    __probe__(statement)
+    timings: List[float] = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        probe: dict = __probe__(statement)
+        timings.append(probe["seconds"])
+        loaded = probe["loaded"]
+    # Traced allocations slow the imports down, so the memory is measured in a separate run.
+    peak: int = __probe__(statement, traced=True)["peak"]
+    return {
+        "scenario": name,
+        "runs": runs,
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "max_ms": max(timings) * 1000,
+        "peak_kib": peak / 1024,
+        "loaded": loaded,
+    }
+
+
+def run_benchmarks(runs: int = 20, scenarios: Sequence[str] = None) -> List[dict]:
+    """
+    Run the start-up scenarios, each in 'runs' fresh interpreters.
+
+    Args:
+        runs (int): [Number of interpreters started per scenario]
+        scenarios (Sequence[str]): [Names of SCENARIOS to run. All if None]
+
+    Returns:
+        List[dict]: [Result by scenario: median/min/max time (ms), peak traced memory (KiB) & transports loaded]
+    """
+    return [__run_scenario__(name, runs) for name in (SCENARIOS if scenarios is None else scenarios)]
+
+
+def compare_results(results: List[dict], baseline: List[dict], tolerance: float = 0.2) -> List[str]:
+    """
+    Compare start-up results to a baseline run.
+
+    Args:
+        results (List[dict]): [Results of run_benchmarks()]
+        baseline (List[dict]): [Results of a previous run]
+        tolerance (float): [Allowed fraction of median time gained]
+
+    Returns:
+        List[str]: [One message per regression. Empty if none]
+    """
+    previous: Dict[str, dict] = {result["scenario"]: result for result in baseline}
+    regressions: List[str] = []
+    for result in results:
+        base: dict = previous.get(result["scenario"])
+        if base is None:
+            continue
+        if result["median_ms"] > base["median_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{result['scenario']}: median {result['median_ms']:.1f}ms > baseline {base['median_ms']:.1f}ms"
+            )
+        if set(result["loaded"]) - set(base["loaded"]):
+            regressions.append(f"{result['scenario']}: loads {', '.join(result['loaded'])}")
+    return regressions
+
+
+def format_results(results: List[dict]) -> str:
+    """
+    Format start-up results as a text table.
+
+    Args:
+        results (List[dict]): [Results of run_benchmarks()]
+
+    Returns:
+        str: [Table]
+    """
+    header: str = (
+        f"{'scenario':<18} {'runs':>5} {'median ms':>10} {'min ms':>8} {'max ms':>8} {'peak KiB':>9}  transports"
+    )
+    lines: List[str] = [header, "-" * len(header)]
+    for result in results:
+        lines.append(
+            f"{result['scenario']:<18} {result['runs']:>5} {result['median_ms']:>10.1f} {result['min_ms']:>8.1f} "
+            f"{result['max_ms']:>8.1f} {result['peak_kib']:>9.1f}  {', '.join(result['loaded']) or '-'}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Benchmark the time and memory taken to import the SDK in a fresh interpreter."
+    )
+    parser.add_argument("--runs", type=int, default=20, help="interpreters started per scenario")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="scenario to run, all by default")
+    parser.add_argument("--json", help="file to write the results to")
+    parser.add_argument("--baseline", help="results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression against the baseline")
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    results: List[dict] = run_benchmarks(runs=args.runs, scenarios=args.scenario)
+    print(format_results(results))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions: List[str] = compare_results(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,59 @@
 import unittest
 
+from tests.test_case_benchmarks import TestBenchmarks
+from tests.test_case_blocking_pool import TestBlockingPool
+from tests.test_case_bulk_fetch import TestBulkFetch
+from tests.test_case_dataset_sync import TestDatasetSync
+from tests.test_case_document_store import TestDocumentStore
+from tests.test_case_export import TestExport
+from tests.test_case_facade import TestFacade
+from tests.test_case_full_text_search import TestFullTextSearch
+from tests.test_case_import_time import TestImportTime
+from tests.test_case_json_decoding import TestJsonDecoding
+from tests.test_case_key_pool import TestKeyPool
+from tests.test_case_local_filter import TestLocalFilter
+from tests.test_case_metrics import TestMetrics
 from tests.test_case_movie_api import TestMovieAPI
+from tests.test_case_pagination import TestPagination
+from tests.test_case_persistent_cache import TestPersistentCache
 from tests.test_case_quote_api import TestQuoteAPI
+from tests.test_case_quote_hydration import TestQuoteHydration
+from tests.test_case_single_flight import TestSingleFlight
+from tests.test_case_rate_limit import TestRateLimit
+from tests.test_case_retry import TestRetry
+from tests.test_case_secondary_index import TestSecondaryIndex
+from tests.test_case_response_cache import TestResponseCache
+from tests.test_case_session_pool import TestSessionPool
+from tests.test_case_timeouts import TestTimeouts
 
 
 def suite():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(TestMovieAPI))
     suite.addTest(unittest.makeSuite(TestQuoteAPI))
+    suite.addTest(unittest.makeSuite(TestSessionPool))
+    suite.addTest(unittest.makeSuite(TestBlockingPool))
+    suite.addTest(unittest.makeSuite(TestPagination))
+    suite.addTest(unittest.makeSuite(TestResponseCache))
+    suite.addTest(unittest.makeSuite(TestPersistentCache))
+    suite.addTest(unittest.makeSuite(TestSingleFlight))
+    suite.addTest(unittest.makeSuite(TestRateLimit))
+    suite.addTest(unittest.makeSuite(TestLocalFilter))
+    suite.addTest(unittest.makeSuite(TestDocumentStore))
+    suite.addTest(unittest.makeSuite(TestSecondaryIndex))
+    suite.addTest(unittest.makeSuite(TestFullTextSearch))
+    suite.addTest(unittest.makeSuite(TestQuoteHydration))
+    suite.addTest(unittest.makeSuite(TestBulkFetch))
+    suite.addTest(unittest.makeSuite(TestTimeouts))
+    suite.addTest(unittest.makeSuite(TestRetry))
+    suite.addTest(unittest.makeSuite(TestKeyPool))
+    suite.addTest(unittest.makeSuite(TestDatasetSync))
+    suite.addTest(unittest.makeSuite(TestJsonDecoding))
+    suite.addTest(unittest.makeSuite(TestBenchmarks))
+    suite.addTest(unittest.makeSuite(TestMetrics))
+    suite.addTest(unittest.makeSuite(TestFacade))
+    suite.addTest(unittest.makeSuite(TestExport))
+    suite.addTest(unittest.makeSuite(TestImportTime))
     return suite
 
 
@@ -0,0 +1,380 @@
+# Local pseudo gateway server serving the-one-api endpoints, so that test cases can run offline.
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, List
+
+from aiohttp import web
+
+MOVIES: List[dict] = [
+    {
+        "_id": "5cd95395de30eff6ebccde56",
+        "name": "The Lord of the Rings Series",
+        "runtimeInMinutes": 558,
+        "budgetInMillions": 281,
+        "boxOfficeRevenueInMillions": 2917,
+        "academyAwardNominations": 30,
+        "academyAwardWins": 17,
+        "rottenTomatoesScore": 94,
+    },
+    {
+        "_id": "5cd95395de30eff6ebccde57",
+        "name": "The Hobbit Series",
+        "runtimeInMinutes": 462,
+        "budgetInMillions": 675,
+        "boxOfficeRevenueInMillions": 2932,
+        "academyAwardNominations": 7,
+        "academyAwardWins": 1,
+        "rottenTomatoesScore": 66.33333333,
+    },
+    {
+        "_id": "5cd95395de30eff6ebccde58",
+        "name": "The Unexpected Journey",
+        "runtimeInMinutes": 169,
+        "budgetInMillions": 200,
+        "boxOfficeRevenueInMillions": 1021,
+        "academyAwardNominations": 3,
+        "academyAwardWins": 1,
+        "rottenTomatoesScore": 64,
+    },
+    {
+        "_id": "5cd95395de30eff6ebccde59",
+        "name": "The Desolation of Smaug",
+        "runtimeInMinutes": 161,
+        "budgetInMillions": 217,
+        "boxOfficeRevenueInMillions": 958.4,
+        "academyAwardNominations": 3,
+        "academyAwardWins": 0,
+        "rottenTomatoesScore": 75,
+    },
+    {
+        "_id": "5cd95395de30eff6ebccde5a",
+        "name": "The Battle of the Five Armies",
+        "runtimeInMinutes": 144,
+        "budgetInMillions": 250,
+        "boxOfficeRevenueInMillions": 956,
+        "academyAwardNominations": 1,
+        "academyAwardWins": 0,
+        "rottenTomatoesScore": 60,
+    },
+    {
+        "_id": "5cd95395de30eff6ebccde5b",
+        "name": "The Two Towers",
+        "runtimeInMinutes": 179,
+        "budgetInMillions": 94,
+        "boxOfficeRevenueInMillions": 926,
+        "academyAwardNominations": 6,
+        "academyAwardWins": 2,
+        "rottenTomatoesScore": 96,
+    },
+    {
+        "_id": "5cd95395de30eff6ebccde5c",
+        "name": "The Fellowship of the Ring",
+        "runtimeInMinutes": 178,
+        "budgetInMillions": 93,
+        "boxOfficeRevenueInMillions": 871.5,
+        "academyAwardNominations": 13,
+        "academyAwardWins": 4,
+        "rottenTomatoesScore": 91,
+    },
+    {
+        "_id": "5cd95395de30eff6ebccde5d",
+        "name": "The Return of the King",
+        "runtimeInMinutes": 201,
+        "budgetInMillions": 94,
+        "boxOfficeRevenueInMillions": 1120,
+        "academyAwardNominations": 11,
+        "academyAwardWins": 11,
+        "rottenTomatoesScore": 95,
+    },
+]
+
+# Movies having quotes in the-one-api (only the LotR trilogy)
+QUOTE_MOVIE_IDS: List[str] = [
+    "5cd95395de30eff6ebccde5b",
+    "5cd95395de30eff6ebccde5c",
+    "5cd95395de30eff6ebccde5d",
+]
+CHARACTER_IDS: List[str] = [
+    "5cd99d4bde30eff6ebccfe9e",
+    "5cd99d4bde30eff6ebccfca7",
+    "5cd99d4bde30eff6ebccfea0",
+    "5cd99d4bde30eff6ebccfd23",
+]
+CHARACTERS: List[dict] = [
+    {"_id": CHARACTER_IDS[0], "name": "Frodo Baggins", "race": "Hobbit", "realm": "", "wikiUrl": ""},
+    {"_id": CHARACTER_IDS[1], "name": "Gandalf", "race": "Maiar", "realm": "", "wikiUrl": ""},
+    {"_id": CHARACTER_IDS[2], "name": "Gollum", "race": "Hobbit", "realm": "", "wikiUrl": ""},
+    {"_id": CHARACTER_IDS[3], "name": "Aragorn II Elessar", "race": "Human", "realm": "Gondor", "wikiUrl": ""},
+]
+WORDS: List[str] = [
+    "ring", "shire", "precious", "hobbit", "wizard", "mordor", "fellowship",
+    "sword", "elf", "dwarf", "king", "return", "tower", "eye", "fire", "road",
+]
+
+
+def make_quotes(count: int = 250, padding: int = 0) -> List[dict]:
+    """
+    Build a deterministic list of quote documents.
+
+    Args:
+        count (int): [Number of quotes]
+        padding (int): [Number of characters of an extra "padding" field, to make the payloads bigger. No field if 0]
+
+    Returns:
+        List[dict]: [Quote documents in the-one-api format]
+    """
+    first: int = int("5cd96e05de30eff6ebcce7e9", 16)
+    quotes: List[dict] = []
+    for i in range(count):
+        id: str = format(first + i, "x")
+        words: List[str] = [WORDS[(i * 7 + j * 3) % len(WORDS)] for j in range(1 + i % 6)]
+        quotes.append(
+            {
+                "_id": id,
+                "dialog": " ".join(words).capitalize() + "!",
+                "movie": QUOTE_MOVIE_IDS[(i // 10) % len(QUOTE_MOVIE_IDS)],
+                "character": CHARACTER_IDS[i % len(CHARACTER_IDS)],
+                "id": id,
+            }
+        )
+        if padding:
+            quotes[-1]["padding"] = (id * (padding // len(id) + 1))[:padding]
+    return quotes
+
+
+def __select__(docs: List[dict], request: web.Request) -> List[dict]:
+    """
+    Apply the _id=a,b,c filter of a list call.
+    """
+    if "_id" not in request.query:
+        return docs
+    ids: set = set(request.query["_id"].split(","))
+    return [doc for doc in docs if doc["_id"] in ids]
+
+
+def __paginate__(docs: List[dict], request: web.Request) -> dict:
+    docs = __select__(docs, request)
+    limit: int = int(request.query.get("limit", 1000))
+    page: int = int(request.query.get("page", 1))
+    if "offset" in request.query:
+        offset: int = int(request.query["offset"])
+        page = offset // limit + 1
+    else:
+        offset = (page - 1) * limit
+    return {
+        "docs": docs[offset : offset + limit],
+        "total": len(docs),
+        "limit": limit,
+        "offset": offset,
+        "page": page,
+        "pages": math.ceil(len(docs) / limit) or 1,
+    }
+
+
+# Application key of the stub state (served documents and request bookkeeping)
+STATE: web.AppKey = web.AppKey("state", dict)
+
+
+def create_stub_app(
+    quote_count: int = 250,
+    latency: float = 0.0,
+    padding: int = 0,
+    error_rate: float = 0.0,
+    seed: int = 0,
+) -> web.Application:
+    """
+    Create the stub application of the-one-api endpoints under /v2.
+    The state of the application keeps a count of served requests ("requests"), the requested paths ("paths"),
+    the count of 304 answers ("not_modified"), the set of client sockets seen ("peers") to check connection reuse
+    and the max number of requests served at once ("max_in_flight").
+    Responses carry an ETag and conditional requests are answered with 304 Not Modified.
+    The requests are counted by API key ("keys"); with a quota per key ("quota"), responses carry
+    X-RateLimit-* headers and a key past its quota is answered with 429.
+    Failures are injected by queueing (status, headers) answers in the state ("faults"),
+    and slow answers by queueing extra seconds of latency ("delays"), each one used by the next request.
+    With an error rate, that fraction of the requests is answered with 503, at random but reproducibly.
+
+    Args:
+        quote_count (int): [Number of quotes to be served]
+        latency (float): [Seconds to wait before answering each request. Can be changed in the state ("latency")]
+        padding (int): [Number of characters added to each quote, to make the payloads bigger]
+        error_rate (float): [Fraction of the requests answered with 503. Can be changed in the state ("error_rate")]
+        seed (int): [Seed of the random errors]
+
+    Returns:
+        web.Application: [Stub application]
+    """
+    app: web.Application = web.Application()
+    state: dict = {
+        "movies": list(MOVIES),
+        "characters": list(CHARACTERS),
+        "quotes": make_quotes(count=quote_count, padding=padding),
+        "requests": 0,
+        "paths": [],
+        "not_modified": 0,
+        "peers": set(),
+        "in_flight": 0,
+        "max_in_flight": 0,
+        "latency": latency,
+        "faults": [],
+        "delays": [],
+        "keys": {},
+        "quota": None,
+        "error_rate": error_rate,
+        "random": random.Random(seed),
+    }
+    app[STATE] = state
+
+    @web.middleware
+    async def bookkeeping(request: web.Request, handler) -> web.StreamResponse:
+        state["requests"] += 1
+        state["paths"].append(request.path_qs)
+        state["peers"].add(request.transport.get_extra_info("peername"))
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return web.json_response(
+                {"success": False, "message": "Unauthorized."}, status=401
+            )
+        key: str = request.headers["Authorization"][len("Bearer "):]
+        state["keys"][key] = state["keys"].get(key, 0) + 1
+        quota_headers: dict = {}
+        if state["quota"] is not None:
+            left: int = state["quota"] - state["keys"][key]
+            quota_headers = {
+                "X-RateLimit-Limit": str(state["quota"]),
+                "X-RateLimit-Remaining": str(max(left, 0)),
+                "X-RateLimit-Reset": str(int(time.time()) + 600),
+            }
+            if left < 0:
+                return web.json_response(
+                    {"success": False, "message": "Too many requests."},
+                    status=429,
+                    headers={**quota_headers, "Retry-After": "600"},
+                )
+        if state["faults"]:
+            status, headers = state["faults"].pop(0)
+            return web.json_response(
+                {"success": False, "message": "Injected failure."}, status=status, headers=headers
+            )
+        if state["error_rate"] and state["random"].random() < state["error_rate"]:
+            return web.json_response(
+                {"success": False, "message": "Service unavailable."}, status=503
+            )
+        delay: float = state["delays"].pop(0) if state["delays"] else 0
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            if state["latency"] or delay:
+                await asyncio.sleep(state["latency"] + delay)
+            response: web.StreamResponse = await handler(request)
+        finally:
+            state["in_flight"] -= 1
+        if response.status != 200 or not isinstance(response, web.Response):
+            return response
+        etag: str = '"' + hashlib.sha1(response.body).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            state["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        response.headers.update(quota_headers)
+        return response
+
+    def by_id(docs: List[dict], id: str) -> web.Response:
+        found: List[dict] = [doc for doc in docs if doc["_id"] == id]
+        if not found:
+            return web.json_response(
+                {"success": False, "message": "Something went wrong."}, status=404
+            )
+        return web.json_response(
+            {"docs": found, "total": 1, "limit": 1000, "offset": 0, "page": 1, "pages": 1}
+        )
+
+    async def movies(request: web.Request) -> web.Response:
+        return web.json_response(__paginate__(state["movies"], request))
+
+    async def movie(request: web.Request) -> web.Response:
+        return by_id(state["movies"], request.match_info["id"])
+
+    async def movie_quotes(request: web.Request) -> web.Response:
+        id: str = request.match_info["id"]
+        docs: List[dict] = [doc for doc in state["quotes"] if doc["movie"] == id]
+        return web.json_response(__paginate__(docs, request))
+
+    async def characters(request: web.Request) -> web.Response:
+        return web.json_response(__paginate__(state["characters"], request))
+
+    async def character(request: web.Request) -> web.Response:
+        return by_id(state["characters"], request.match_info["id"])
+
+    async def character_quotes(request: web.Request) -> web.Response:
+        id: str = request.match_info["id"]
+        docs: List[dict] = [doc for doc in state["quotes"] if doc["character"] == id]
+        return web.json_response(__paginate__(docs, request))
+
+    async def quotes(request: web.Request) -> web.Response:
+        return web.json_response(__paginate__(state["quotes"], request))
+
+    async def quote(request: web.Request) -> web.Response:
+        return by_id(state["quotes"], request.match_info["id"])
+
+    app.middlewares.append(bookkeeping)
+    app.router.add_get("/v2/movie", movies)
+    app.router.add_get("/v2/movie/{id}", movie)
+    app.router.add_get("/v2/movie/{id}/quote", movie_quotes)
+    app.router.add_get("/v2/quote", quotes)
+    app.router.add_get("/v2/quote/{id}", quote)
+    app.router.add_get("/v2/character", characters)
+    app.router.add_get("/v2/character/{id}", character)
+    app.router.add_get("/v2/character/{id}/quote", character_quotes)
+    return app
+
+
+@asynccontextmanager
+async def stub_api_server(**options) -> AsyncIterator[dict]:
+    """
+    Serve the stub application on a random local port for the duration of the block.
+
+    Args:
+        **options: [Keyword arguments of create_stub_app()]
+
+    Yields:
+        dict: [{"app": stub application, "state": stub state, "base_url": base URL to pass to create_api_client()}]
+    """
+    app: web.Application = create_stub_app(**options)
+    runner: web.AppRunner = web.AppRunner(app)
+    await runner.setup()
+    site: web.TCPSite = web.TCPSite(runner, host="127.0.0.1", port=0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    try:
+        yield {"app": app, "state": app[STATE], "base_url": f"http://{host}:{port}/v2"}
+    finally:
+        await runner.cleanup()
+
+
+@contextmanager
+def threaded_stub_api_server(**options) -> Iterator[dict]:
+    """
+    Serve the stub application from a background event loop thread, for blocking test cases.
+
+    Args:
+        **options: [Keyword arguments of create_stub_app()]
+
+    Yields:
+        dict: [Same as stub_api_server()]
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+    thread: threading.Thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = stub_api_server(**options)
+    try:
+        yield asyncio.run_coroutine_threadsafe(server.__aenter__(), loop).result()
+    finally:
+        asyncio.run_coroutine_threadsafe(server.__aexit__(None, None, None), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
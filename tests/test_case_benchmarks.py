@@ -0,0 +1,41 @@
+import unittest
+
+from benchmarks.bench_client import SCENARIOS, compare_results, format_results, run_benchmarks
+
+
+class TestBenchmarks(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_run_benchmarks(self):
+        results: list = run_benchmarks(requests=40, concurrency=4, quote_count=200, padding=64)
+        self.assertEqual([result["scenario"] for result in results], list(SCENARIOS))
+        for result in results:
+            self.assertEqual(result["errors"], 0)
+            self.assertGreater(result["throughput"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+            self.assertGreater(result["peak_kib"], 0)
+        self.assertIn("aio_fetch (pooled)", format_results(results))
+
+        # Injected 503s are counted as errors.
+        results = run_benchmarks(
+            requests=40, concurrency=4, error_rate=0.5, scenarios=["aio_fetch (pooled)"]
+        )
+        self.assertGreater(results[0]["errors"], 0)
+        return
+
+    def test_compare_results(self):
+        baseline: list = [{"scenario": "fetch (pooled)", "throughput": 100.0, "p99_ms": 10.0}]
+        self.assertEqual(
+            compare_results([{"scenario": "fetch (pooled)", "throughput": 90.0, "p99_ms": 11.0}], baseline), []
+        )
+        regressions: list = compare_results(
+            [{"scenario": "fetch (pooled)", "throughput": 70.0, "p99_ms": 13.0}], baseline
+        )
+        self.assertEqual(len(regressions), 2)
+        self.assertEqual(
+            compare_results([{"scenario": "new", "throughput": 1.0, "p99_ms": 1.0}], baseline), []
+        )
+        return
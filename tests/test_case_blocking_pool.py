@@ -0,0 +1,47 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import api.lotr_api_fp as lotr_api_fp
+from tests.stub_api_server import threaded_stub_api_server
+
+
+class TestBlockingPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.quoteId: str = "5cd96e05de30eff6ebcce7e9"
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_connections_reused(self):
+        with threaded_stub_api_server() as stub:
+            with lotr_api_fp.api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+                for _ in range(5):
+                    output: dict = client["fetch"](endpoint="quote", id=self.quoteId)
+                    self.assertEqual(output["docs"][0]["_id"], self.quoteId)
+            self.assertEqual(stub["state"]["requests"], 5)
+            self.assertEqual(len(stub["state"]["peers"]), 1)
+        return
+
+    def test_shared_across_threads(self):
+        pool: dict = lotr_api_fp.create_blocking_pool(pool_maxsize=3)
+        with threaded_stub_api_server() as stub:
+            with lotr_api_fp.api_client(
+                api_key="test-key", base_url=stub["base_url"], blocking_pool=pool
+            ) as client:
+                with ThreadPoolExecutor(max_workers=3) as executor:
+                    outputs: list = list(
+                        executor.map(
+                            lambda page: client["fetch"](
+                                endpoint="quote", filter=f"limit=10&page={page}"
+                            ),
+                            range(1, 25),
+                        )
+                    )
+                session = pool["session"]
+            self.assertEqual([output["page"] for output in outputs], list(range(1, 25)))
+            self.assertIsNone(pool["session"])
+            self.assertIsNotNone(session)
+            self.assertLessEqual(len(stub["state"]["peers"]), 3)
+        return
@@ -0,0 +1,135 @@
+import asyncio
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_deadline_fp as lotr_deadline_fp
+from tests.stub_api_server import MOVIES, stub_api_server
+
+
+class TestBulkFetch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.unknownId: str = "0" * 24
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_ordered_with_bounded_concurrency(self):
+        asyncio.run(main=self.case_ordered_with_bounded_concurrency())
+        return
+
+    def test_stream_as_completed(self):
+        asyncio.run(main=self.case_stream_as_completed())
+        return
+
+    def test_list_call_fallback(self):
+        asyncio.run(main=self.case_list_call_fallback())
+        return
+
+    def test_failed_calls(self):
+        asyncio.run(main=self.case_failed_calls())
+        return
+
+    async def case_ordered_with_bounded_concurrency(self):
+        async with stub_api_server(quote_count=40, latency=0.02) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], batch_concurrency=3
+            ) as client:
+                quotes: list = stub["state"]["quotes"]
+                ids: list = [quote["_id"] for quote in reversed(quotes[:12])]
+                ids.insert(3, self.unknownId)
+                ids.append(ids[0])
+                requests: int = stub["state"]["requests"]
+                docs: list = await client["aio_fetch_quotes_by_ids"](ids)
+                self.assertEqual(len(docs), len(ids))
+                self.assertIsNone(docs[3])
+                self.assertEqual(
+                    [doc["_id"] for doc in docs if doc is not None],
+                    [id for id in ids if id != self.unknownId],
+                )
+                # Duplicates are fetched once and never more than 3 calls are in flight.
+                self.assertEqual(stub["state"]["requests"] - requests, 13)
+                self.assertEqual(stub["state"]["max_in_flight"], 3)
+
+                movies: list = await client["aio_fetch_movies_by_ids"](
+                    [movie["_id"] for movie in MOVIES[:4]], concurrency=1
+                )
+                self.assertEqual(movies, MOVIES[:4])
+                self.assertEqual(await client["aio_fetch_movies_by_ids"]([]), [])
+        return
+
+    async def case_stream_as_completed(self):
+        async with stub_api_server(quote_count=40, latency=0.01) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+                ids: list = [quote["_id"] for quote in stub["state"]["quotes"][:20]]
+                streamed: dict = {}
+                async for id, doc in client["aio_iter_quotes_by_ids"](ids + ids[:5]):
+                    self.assertNotIn(id, streamed)
+                    streamed[id] = doc
+                self.assertEqual(set(streamed), set(ids))
+                self.assertTrue(all(doc["_id"] == id for id, doc in streamed.items()))
+
+                # Leaving the stream early cancels the calls still pending.
+                stream = client["aio_iter_quotes_by_ids"](ids, concurrency=2)
+                async for _ in stream:
+                    break
+                await stream.aclose()
+                await asyncio.sleep(0.05)
+                self.assertLessEqual(stub["state"]["requests"], 20 + 4)
+        return
+
+    async def case_list_call_fallback(self):
+        async with stub_api_server(quote_count=250) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+                quotes: list = stub["state"]["quotes"]
+                ids: list = [quote["_id"] for quote in quotes[::-1]] + [self.unknownId]
+                docs: list = await client["aio_fetch_quotes_by_ids"](ids, list_call=True)
+                self.assertEqual(docs, quotes[::-1] + [None])
+                # 251 ids in chunks of 100: three list calls.
+                self.assertEqual(stub["state"]["requests"], 3)
+                self.assertTrue(all(path.startswith("/v2/quote?_id=") for path in stub["state"]["paths"]))
+
+                # Loaded datasets answer the list calls from their _id index.
+                await client["aio_load_datasets"](endpoints=("quote",))
+                requests: int = stub["state"]["requests"]
+                docs = await client["aio_fetch_quotes_by_ids"](ids, list_call=True, chunk_size=50)
+                self.assertEqual(docs, quotes[::-1] + [None])
+                self.assertEqual(stub["state"]["requests"], requests)
+        return
+
+    async def case_failed_calls(self):
+        async with stub_api_server(quote_count=40) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+                quotes: list = stub["state"]["quotes"]
+                ids: list = [quote["_id"] for quote in quotes[:20]] + [self.unknownId]
+                # The first chunk fails, the ids of the second one are found or unknown.
+                stub["state"]["faults"].append((500, {}))
+                docs: list = await client["aio_fetch_quotes_by_ids"](
+                    ids, list_call=True, chunk_size=11, concurrency=1
+                )
+                self.assertTrue(all("error" in doc for doc in docs[:11]))
+                self.assertEqual(docs[11:], quotes[11:20] + [None])
+
+                # The failed call of one id is told apart from an unknown id.
+                async def fetch(endpoint: str, id: str, query: str, filter: str) -> dict:
+                    if id == ids[0]:
+                        return {"error": "Timeout"}
+                    return await client["aio_fetch"](endpoint=endpoint, id=id, query=query, filter=filter)
+
+                docs = await lotr_api_fp.aio_fetch_by_ids(
+                    ids[:2] + [self.unknownId], fetch=fetch, endpoint="quote"
+                )
+                self.assertEqual(docs, [{"error": "Timeout"}, quotes[1], None])
+
+                # Hydration fails rather than leaving the references of a failed call as ids.
+                stub["state"]["delays"].append(1.0)
+                with self.assertRaises(RuntimeError), lotr_deadline_fp.deadline(0.2):
+                    await client["aio_hydrate_quotes"](quotes[:1], fields=("character",))
+                hydrated: list = await client["aio_hydrate_quotes"](quotes[:1], fields=("character",))
+                self.assertIsInstance(hydrated[0]["character"], dict)
+        return
@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_sync_fp as lotr_sync_fp
+from tests.stub_api_server import make_quotes, stub_api_server
+
+
+class TestDatasetSync(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_incremental_sync(self):
+        asyncio.run(main=self.case_incremental_sync())
+        return
+
+    def test_shrinking_collection(self):
+        asyncio.run(main=self.case_shrinking_collection())
+        return
+
+    async def sync(self, client: dict, **options) -> list:
+        return [
+            (change["op"], change["id"])
+            async for change in client["aio_sync_datasets"](endpoints=("quote",), **options)
+        ]
+
+    async def case_incremental_sync(self):
+        async with stub_api_server(quote_count=250) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key",
+                base_url=stub["base_url"],
+                sync_state=lotr_sync_fp.create_sync_state(page_size=100),
+            ) as client:
+                quotes: list = stub["state"]["quotes"]
+                changes: list = await self.sync(client)
+                self.assertEqual(changes, [("added", quote["_id"]) for quote in quotes])
+                self.assertEqual(stub["state"]["requests"], 3)
+                # The synced dataset answers the calls, through its indexes.
+                output: dict = await client["aio_fetch_quote_by_id"](id=quotes[42]["_id"], query=None, filter=None)
+                self.assertEqual(output["docs"], [quotes[42]])
+                self.assertEqual(stub["state"]["requests"], 3)
+
+                # Nothing changed: three 304 without a body.
+                self.assertEqual(await self.sync(client), [])
+                self.assertEqual(stub["state"]["not_modified"], 3)
+
+                # One quote edited on the last page: only that page is downloaded.
+                quotes[230] = {**quotes[230], "dialog": "My precious!"}
+                self.assertEqual(await self.sync(client), [("modified", quotes[230]["_id"])])
+                self.assertEqual(stub["state"]["not_modified"], 5)
+                output = await client["aio_fetch_quote_by_id"](id=quotes[230]["_id"], query=None, filter=None)
+                self.assertEqual(output["docs"][0]["dialog"], "My precious!")
+
+                # A removal shifts every page, yet only the real changes are reported.
+                removed: dict = quotes.pop(10)
+                quotes[120] = {**quotes[120], "character": quotes[121]["character"]}
+                added: dict = {**make_quotes(count=251)[250]}
+                quotes.append(added)
+                changes = await self.sync(client)
+                self.assertEqual(
+                    sorted(changes),
+                    sorted(
+                        [("removed", removed["_id"]), ("modified", quotes[120]["_id"]), ("added", added["_id"])]
+                    ),
+                )
+                output = await client["aio_fetch_all_quotes"]()
+                self.assertEqual(output["total"], 250)
+                self.assertEqual(sorted(doc["_id"] for doc in output["docs"]), sorted(q["_id"] for q in quotes))
+                character: str = quotes[120]["character"]
+                output = await client["aio_fetch_character_quote_by_id"](id=character, filter=None)
+                self.assertEqual(
+                    [doc["_id"] for doc in output["docs"]],
+                    [doc["_id"] for doc in quotes if doc["character"] == character],
+                )
+                stats: dict = client["sync_stats"]()
+                self.assertEqual(
+                    {key: stats[key] for key in ("syncs", "added", "modified", "removed")},
+                    {"syncs": 4, "added": 251, "modified": 2, "removed": 1},
+                )
+        return
+
+    async def case_shrinking_collection(self):
+        async with stub_api_server(quote_count=250) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key",
+                base_url=stub["base_url"],
+                sync_state=lotr_sync_fp.create_sync_state(page_size=100),
+            ) as client:
+                await self.sync(client)
+                quotes: list = stub["state"]["quotes"]
+                gone: list = quotes[180:]
+                del quotes[180:]
+                changes: list = await self.sync(client)
+                self.assertEqual(changes, [("removed", quote["_id"]) for quote in gone])
+                # The new total changes every page: page 1 comes back with the same documents
+                # and is not compared again, page 3 no longer exists.
+                self.assertEqual(stub["state"]["requests"], 3 + 2)
+                self.assertEqual(client["sync_stats"]()["pages_unchanged"], 1)
+                output: dict = await client["aio_fetch_all_quotes"]()
+                self.assertEqual(output["total"], 180)
+
+                # A failed page stops the sync without removing anything.
+                stub["state"]["faults"].append((500, None))
+                with self.assertRaises(RuntimeError):
+                    await self.sync(client)
+                self.assertEqual(len((await client["aio_fetch_all_quotes"]())["docs"]), 180)
+        return
@@ -0,0 +1,63 @@
+import json
+import tracemalloc
+import unittest
+
+import api.lotr_filter_fp as lotr_filter_fp
+import api.lotr_store_fp as lotr_store_fp
+from tests.stub_api_server import MOVIES, make_quotes
+
+
+class TestDocumentStore(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.quotes: list = make_quotes(count=2400)
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_round_trip(self):
+        quotes: lotr_store_fp.RecordList = lotr_store_fp.records(
+            lotr_store_fp.create_document_store(self.quotes)
+        )
+        movies: lotr_store_fp.RecordList = lotr_store_fp.records(
+            lotr_store_fp.create_document_store(MOVIES)
+        )
+        self.assertEqual(len(quotes), 2400)
+        self.assertEqual([dict(quote) for quote in quotes], self.quotes)
+        self.assertEqual(json.dumps([dict(movie) for movie in movies]), json.dumps(MOVIES))
+        self.assertEqual(quotes[-1], self.quotes[-1])
+        self.assertEqual(quotes[3]["dialog"], self.quotes[3]["dialog"])
+        self.assertEqual(quotes[3].get("race", "none"), "none")
+        self.assertEqual(quotes.store["columns"]["id"]["kind"], lotr_store_fp.KIND_ALIAS)
+        self.assertEqual(
+            lotr_filter_fp.apply_filter(quotes, "movie=5cd95395de30eff6ebccde5c&limit=3")["docs"],
+            [quote for quote in self.quotes if quote["movie"] == "5cd95395de30eff6ebccde5c"][:3],
+        )
+        return
+
+    def test_irregular_documents(self):
+        docs: list = [
+            {"_id": "5cd99d4bde30eff6ebccfe9e", "id": "5cd99d4bde30eff6ebccfe9e", "height": 1},
+            {"_id": "5cd99d4bde30eff6ebccfca7", "id": "other", "height": 1.5, "race": "Hobbit"},
+            {"_id": "5cd99d4bde30eff6ebccfea0", "height": "tall", "wikiUrl": None, "spouse": ["x"]},
+            {"_id": "5CD99D4BDE30EFF6EBCCFD23", "name": "Gollum – Sméagol"},
+        ]
+        store: dict = lotr_store_fp.create_document_store(docs)
+        self.assertEqual([dict(record) for record in lotr_store_fp.records(store)], docs)
+        self.assertEqual(len(lotr_store_fp.records(store)[3]), 2)
+        return
+
+    def test_footprint(self):
+        text: str = json.dumps(self.quotes)
+        tracemalloc.start()
+        try:
+            start: int = tracemalloc.get_traced_memory()[0]
+            decoded: list = json.loads(text)
+            decoded_size: int = tracemalloc.get_traced_memory()[0] - start
+            start = tracemalloc.get_traced_memory()[0]
+            store: dict = lotr_store_fp.create_document_store(decoded)
+            store_size: int = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(store["size"], 2400)
+        self.assertLess(store_size * 3, decoded_size)
+        return
@@ -0,0 +1,133 @@
+import asyncio
+from functools import partial
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_export_fp as lotr_export_fp
+from tests.stub_api_server import make_quotes, stub_api_server
+
+
+class TestExport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.quotes: list = make_quotes(count=250)
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def setUp(self):
+        self.directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        return super().setUp()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        return super().tearDown()
+
+    def test_columnar_block(self):
+        docs: list = [
+            {"_id": "5cd95395de30eff6ebccde5b", "name": "Gandalf", "runtime": 178, "rate": 0.5, "tags": ["a"]},
+            {"_id": "5cd95395de30eff6ebccde5c", "name": "Frodo", "runtime": None, "wins": 11},
+        ]
+        dictionary: dict = {}
+        block: bytes = lotr_export_fp.encode_columnar_block(docs, dictionary)
+        self.assertEqual(len(dictionary), 2)
+        ids: list = []
+        count, columns = lotr_export_fp.decode_columnar_block(block, ids)
+        self.assertEqual(count, 2)
+        self.assertEqual(ids, [doc["_id"] for doc in docs])
+        self.assertEqual(columns["runtime"], [178, None])
+        self.assertIs(columns["wins"][0], lotr_export_fp.MISSING)
+        self.assertIs(columns["rate"][1], lotr_export_fp.MISSING)
+        _, columns = lotr_export_fp.decode_columnar_block(block, [], fields=("name",))
+        self.assertEqual(columns, {"name": ["Gandalf", "Frodo"]})
+        return
+
+    def test_ndjson_export(self):
+        asyncio.run(main=self.case_ndjson_export())
+        return
+
+    def test_columnar_export(self):
+        asyncio.run(main=self.case_columnar_export())
+        return
+
+    def test_resumed_export(self):
+        asyncio.run(main=self.case_resumed_export())
+        return
+
+    async def case_ndjson_export(self):
+        path: str = os.path.join(self.directory.name, "quotes.ndjson.gz")
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(api_key="test-key", base_url=stub["base_url"]) as client:
+                stats: dict = await client["aio_export_quotes"](path, compression="gzip", page_size=60)
+        self.assertEqual(stats["pages"], 5)
+        self.assertEqual(stats["documents"], 250)
+        self.assertEqual(stats["bytes"], os.path.getsize(path))
+        self.assertFalse(os.path.exists(lotr_export_fp.checkpoint_path(path)))
+        with gzip.open(path, "rt") as file:
+            self.assertEqual([json.loads(line) for line in file], self.quotes)
+        return
+
+    async def case_columnar_export(self):
+        columnar: str = os.path.join(self.directory.name, "quotes.lcol")
+        ndjson: str = os.path.join(self.directory.name, "quotes.ndjson")
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(api_key="test-key", base_url=stub["base_url"]) as client:
+                await client["aio_export_quotes"](columnar, format=lotr_export_fp.FORMAT_COLUMNAR, page_size=100)
+                await client["aio_export_quotes"](ndjson, page_size=100)
+        self.assertEqual(list(lotr_export_fp.iter_columnar(columnar)), self.quotes)
+        self.assertLess(os.path.getsize(columnar), os.path.getsize(ndjson) * 0.7)
+        characters: list = [
+            character
+            for columns in lotr_export_fp.iter_columnar_blocks(columnar, fields=("character",))
+            for character in columns["character"]
+        ]
+        self.assertEqual(characters, [quote["character"] for quote in self.quotes])
+        return
+
+    async def case_resumed_export(self):
+        path: str = os.path.join(self.directory.name, "quotes.lcol.xz")
+        failures: list = ["page=3"]
+
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(api_key="test-key", base_url=stub["base_url"]) as client:
+
+                async def fetch(filter: str, **kwargs) -> dict:
+                    if failures and failures[0] in filter:
+                        failures.pop()
+                        return {"error": "connection reset"}
+                    return await client["aio_fetch_all_quotes"](filter=filter, **kwargs)
+
+                export = partial(
+                    lotr_export_fp.aio_export,
+                    partial(lotr_api_fp.aio_iter_page_envelopes, fetch=fetch),
+                    path,
+                    format=lotr_export_fp.FORMAT_COLUMNAR,
+                    compression="xz",
+                    page_size=40,
+                )
+                with self.assertRaises(RuntimeError):
+                    await export()
+                with open(lotr_export_fp.checkpoint_path(path)) as file:
+                    checkpoint: dict = json.load(file)
+                self.assertEqual(checkpoint["next_page"], 3)
+                # A page half written when the export failed is cut off.
+                with open(path, "ab") as file:
+                    file.write(b"partial page")
+
+                with self.assertRaises(ValueError):
+                    await export(page_size=50)
+                requests: int = stub["state"]["requests"]
+                stats: dict = await export()
+                self.assertEqual(stub["state"]["requests"] - requests, 5)
+
+        self.assertEqual((stats["first_page"], stats["pages"]), (3, 5))
+        self.assertFalse(os.path.exists(lotr_export_fp.checkpoint_path(path)))
+        self.assertEqual(list(lotr_export_fp.iter_columnar(path)), self.quotes)
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
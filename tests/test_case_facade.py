@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+import unittest
+
+import api.lotr_deadline_fp as lotr_deadline_fp
+import api.lotr_facade_fp as lotr_facade_fp
+from tests.stub_api_server import threaded_stub_api_server
+
+
+class TestFacade(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movieId: str = "5cd95395de30eff6ebccde5d"
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_single_and_batched_calls(self):
+        with threaded_stub_api_server(latency=0.1) as stub:
+            with lotr_facade_fp.facade_client(
+                api_key="test-key", base_url=stub["base_url"], batch_concurrency=20
+            ) as facade:
+                output: dict = facade["fetch_movie_by_id"](id=self.movieId, query=None, filter=None)
+                self.assertEqual(output["docs"][0]["_id"], self.movieId)
+                self.assertEqual(facade["fetch"](endpoint="movie")["total"], 8)
+
+                # 20 calls at once take about one round-trip, not 20.
+                start: float = time.monotonic()
+                outputs: list = facade["fetch_many"](
+                    [{"endpoint": "quote", "filter": f"limit=1&page={page}"} for page in range(1, 21)]
+                )
+                self.assertLess(time.monotonic() - start, 1.0)
+                self.assertEqual([output["page"] for output in outputs], list(range(1, 21)))
+                self.assertGreaterEqual(stub["state"]["max_in_flight"], 10)
+
+                quotes: list = facade["fetch_quotes_by_ids"](
+                    [quote["_id"] for quote in stub["state"]["quotes"][:5]]
+                )
+                self.assertEqual([quote["_id"] for quote in quotes], [quote["_id"] for quote in stub["state"]["quotes"][:5]])
+
+                # The facade can be shared by threads.
+                with ThreadPoolExecutor(max_workers=4) as executor:
+                    totals: list = list(executor.map(lambda _: facade["fetch_all_movies"]()["total"], range(4)))
+                self.assertEqual(totals, [8] * 4)
+
+            with self.assertRaises(RuntimeError):
+                facade["fetch_all_movies"]()
+        return
+
+    def test_pagination(self):
+        with threaded_stub_api_server(quote_count=250) as stub:
+            with lotr_facade_fp.facade_client(api_key="test-key", base_url=stub["base_url"]) as facade:
+                quotes: list = list(facade["iter_all_quotes"](page_size=20))
+                self.assertEqual([quote["_id"] for quote in quotes], [quote["_id"] for quote in stub["state"]["quotes"]])
+
+        with threaded_stub_api_server(quote_count=1000) as stub:
+            with lotr_facade_fp.facade_client(api_key="test-key", base_url=stub["base_url"]) as facade:
+                # Leaving the loop early stops the crawl: 10 pages are not all requested.
+                for count, quote in enumerate(facade["iter_all_quotes"](page_size=100, window=2)):
+                    if count == 5:
+                        break
+                time.sleep(0.1)
+                self.assertLessEqual(stub["state"]["requests"], 4)
+
+                # The deadline of the calling thread holds on the event loop.
+                stub["state"]["delays"].append(1.0)
+                start: float = time.monotonic()
+                with lotr_deadline_fp.deadline(0.2):
+                    output: dict = facade["fetch_all_movies"]()
+                self.assertLess(time.monotonic() - start, 0.8)
+                self.assertIn("error", output)
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
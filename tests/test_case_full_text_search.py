@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_search_fp as lotr_search_fp
+import api.lotr_store_fp as lotr_store_fp
+from tests.stub_api_server import stub_api_server
+
+
+class TestFullTextSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dialogs: list = [
+            "You shall not pass!",
+            "My precious. My precious!",
+            "The Ring must be destroyed in the fires of Mount Doom.",
+            "Precisely, Master Frodo. The precious Ring.",
+            "Don't you leave him, Samwise Gamgee.",
+            "I am no man. I am Éowyn of Rohan.",
+            "One Ring to rule them all, one Ring to find them.",
+        ]
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def setUp(self):
+        self.store: dict = lotr_store_fp.create_document_store(
+            [
+                {"_id": format(0x5CD96E05DE30EFF6EBCCE7E9 + i, "x"), "dialog": dialog}
+                for i, dialog in enumerate(self.dialogs)
+            ],
+            hash_fields=("_id",),
+            text_fields=("dialog",),
+        )
+        return super().setUp()
+
+    def positions(self, query: str, match: str = "all") -> list:
+        return [position for position, _ in lotr_store_fp.search_text(self.store, "dialog", query, match=match)]
+
+    def test_tokenize(self):
+        self.assertEqual(
+            lotr_search_fp.tokenize("Don't you leave him, Samwise Gamgee."),
+            ["don't", "you", "leave", "him", "samwise", "gamgee"],
+        )
+        self.assertEqual(lotr_search_fp.tokenize("ÉOWYN of Rohan"), ["eowyn", "of", "rohan"])
+        self.assertEqual(
+            lotr_search_fp.parse_query('prec* "shall not  pass" Ring mount-doom'),
+            [("prefix", "prec"), ("phrase", ("shall", "not", "pass")), ("term", "ring"), ("phrase", ("mount", "doom"))],
+        )
+        return
+
+    def test_queries(self):
+        self.assertEqual(self.positions("eowyn"), [5])
+        # The most frequent and the shortest texts rank first.
+        self.assertEqual(self.positions("ring"), [6, 3, 2])
+        self.assertEqual(self.positions("precious"), [1, 3])
+        self.assertEqual(sorted(self.positions("prec*")), [1, 3])
+        self.assertEqual(self.positions('"shall not pass"'), [0])
+        self.assertEqual(self.positions('"pass not shall"'), [])
+        self.assertEqual(self.positions('"my precious" ring'), [])
+        self.assertEqual(sorted(self.positions('"my precious" ring', match="any")), [1, 2, 3, 6])
+        self.assertEqual(self.positions("ring doom"), [2])
+        self.assertEqual(self.positions("balrog"), [])
+        self.assertIsNone(lotr_store_fp.search_text(self.store, "name", "ring"))
+        return
+
+    def test_incremental_refresh(self):
+        doc: dict = dict(lotr_store_fp.records(self.store)[0])
+        lotr_store_fp.store_upsert(self.store, {**doc, "dialog": "Fly, you fools!"})
+        self.assertEqual(self.positions("pass"), [])
+        self.assertEqual(self.positions("fools"), [0])
+        lotr_store_fp.store_remove(self.store, dict(lotr_store_fp.records(self.store)[6])["_id"])
+        self.assertEqual(self.positions("ring"), [3, 2])
+        lotr_store_fp.store_append(self.store, {"_id": "6cd96e05de30eff6ebcce7e9", "dialog": "Ring ring ring."})
+        self.assertEqual(self.positions("ring")[0], 7)
+        index: dict = self.store["indexes"]["text"]["dialog"]
+        self.assertEqual(index["count"], 7)
+        self.assertNotIn("shall", index["postings"])
+        return
+
+    def test_client_search(self):
+        asyncio.run(main=self.case_client_search())
+        return
+
+    async def case_client_search(self):
+        async with stub_api_server(quote_count=245) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+                self.assertIn("error", client["search_quotes"]("ring"))
+                await client["aio_load_datasets"](endpoints=("quote",))
+                requests: int = stub["state"]["requests"]
+                output: dict = client["search_quotes"]("ring", limit=1000)
+                expected: set = {
+                    quote["_id"]
+                    for quote in stub["state"]["quotes"]
+                    if "ring" in lotr_search_fp.tokenize(quote["dialog"])
+                }
+                self.assertEqual({doc["_id"] for doc in output["docs"]}, expected)
+                self.assertEqual(output["total"], len(expected))
+                self.assertEqual(output["scores"], sorted(output["scores"], reverse=True))
+                page: dict = client["search_quotes"]('"precious hobbit" ring*', limit=5, page=2)
+                self.assertEqual(len(page["docs"]), len(page["scores"]))
+                self.assertEqual(stub["state"]["requests"], requests)
+
+                # Plain dictionaries are indexed for the query, with the same results.
+                datasets: dict = {"quote": stub["state"]["quotes"]}
+                self.assertEqual(
+                    lotr_api_fp.search_dataset(datasets, '"precious hobbit" ring*', limit=5, page=2),
+                    page,
+                )
+        return
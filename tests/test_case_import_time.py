@@ -0,0 +1,74 @@
+import json
+import subprocess
+import sys
+import unittest
+
+from benchmarks.bench_import import ROOT, compare_results, format_results, run_benchmarks
+from tests.stub_api_server import threaded_stub_api_server
+
+# Run in a fresh interpreter: prints the transports loaded after each step.
+__PROBE__: str = """
+import asyncio, json, sys
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_metrics_fp as lotr_metrics_fp
+
+def loaded():
+    return [name for name in ("aiohttp", "requests") if name in sys.modules]
+
+steps = {"import": loaded()}
+client = lotr_api_fp.create_api_client(api_key="key", base_url=sys.argv[1], metrics=lotr_metrics_fp.create_metrics())
+steps["client"] = loaded()
+if sys.argv[2] == "blocking":
+    steps["ok"] = "docs" in client["fetch"](endpoint="movie")
+else:
+    async def main():
+        try:
+            return "docs" in await client["aio_fetch_all_movies"]()
+        finally:
+            await client["aio_close"]()
+    steps["ok"] = asyncio.run(main())
+steps["call"] = loaded()
+print(json.dumps(steps))
+"""
+
+
+class TestImportTime(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def __probe__(self, base_url: str, mode: str) -> dict:
+        completed: subprocess.CompletedProcess = subprocess.run(
+            [sys.executable, "-c", __PROBE__, base_url, mode], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        return json.loads(completed.stdout)
+
+    def test_lazy_transports(self):
+        with threaded_stub_api_server() as stub:
+            blocking: dict = self.__probe__(stub["base_url"], "blocking")
+            non_blocking: dict = self.__probe__(stub["base_url"], "non-blocking")
+        # Neither the import nor the creation of a client loads a transport, the first call loads its own.
+        self.assertEqual(blocking, {"import": [], "client": [], "ok": True, "call": ["requests"]})
+        self.assertEqual(non_blocking, {"import": [], "client": [], "ok": True, "call": ["aiohttp"]})
+        return
+
+    def test_run_benchmarks(self):
+        results: list = run_benchmarks(runs=2, scenarios=["import", "eager"])
+        self.assertEqual([result["loaded"] for result in results], [[], ["aiohttp", "requests"]])
+        for result in results:
+            self.assertLessEqual(result["min_ms"], result["median_ms"])
+            self.assertGreater(result["peak_kib"], 0)
+        self.assertIn("eager", format_results(results))
+
+        baseline: list = [{"scenario": "import", "median_ms": 50.0, "loaded": []}]
+        self.assertEqual(compare_results([{"scenario": "import", "median_ms": 55.0, "loaded": []}], baseline), [])
+        regressions: list = compare_results(
+            [{"scenario": "import", "median_ms": 80.0, "loaded": ["aiohttp"]}], baseline
+        )
+        self.assertEqual(len(regressions), 2)
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
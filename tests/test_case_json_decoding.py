@@ -0,0 +1,131 @@
+import asyncio
+import json
+import unittest
+
+import aiohttp
+import requests
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_json_fp as lotr_json_fp
+import api.lotr_keypool_fp as lotr_keypool_fp
+from tests.stub_api_server import make_quotes, stub_api_server, threaded_stub_api_server
+
+
+class TestJsonDecoding(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_docs_parser(self):
+        quotes: list = make_quotes(count=30)
+        quotes[3]["dialog"] = 'He said "no \\\\ [way]" {twice}, é'
+        page: dict = {"docs": quotes, "total": 30, "limit": 30, "offset": 0, "page": 1, "pages": 1}
+        body: bytes = json.dumps(page, indent=1).encode()
+        for size in (1, 2, 5, 64, len(body)):
+            parser: dict = lotr_json_fp.create_docs_parser()
+            docs: list = []
+            for start in range(0, len(body), size):
+                docs.extend(lotr_json_fp.docs_parser_feed(parser, body[start : start + size]))
+            self.assertEqual(docs, quotes)
+            self.assertEqual(lotr_json_fp.docs_parser_close(parser), {**page, "docs": []})
+            # Nothing is held once a document is yielded.
+            self.assertEqual(len(parser["data"]), 0)
+
+        parser = lotr_json_fp.create_docs_parser(decoder=json.loads)
+        self.assertEqual(lotr_json_fp.docs_parser_feed(parser, b'{"success": false, "message": "[x]"}'), [])
+        self.assertEqual(lotr_json_fp.docs_parser_close(parser), {"success": False, "message": "[x]"})
+        parser = lotr_json_fp.create_docs_parser()
+        lotr_json_fp.docs_parser_feed(parser, body[: len(body) // 2])
+        with self.assertRaises(ValueError):
+            lotr_json_fp.docs_parser_close(parser)
+
+        if lotr_json_fp.orjson is not None:
+            self.assertIs(lotr_json_fp.DEFAULT_DECODER, lotr_json_fp.orjson.loads)
+        return
+
+    def test_streaming_and_decoder_hook(self):
+        asyncio.run(main=self.case_streaming_and_decoder_hook())
+        return
+
+    def test_blocking_streaming(self):
+        bodies: list = []
+
+        def decoder(body: bytes) -> dict:
+            bodies.append(body)
+            return json.loads(body)
+
+        with threaded_stub_api_server(quote_count=300) as stub:
+            with lotr_api_fp.api_client(
+                api_key="test-key", base_url=stub["base_url"], decoder=decoder
+            ) as client:
+                self.assertEqual(client["fetch"](endpoint="movie")["total"], 8)
+                self.assertEqual(len(bodies), 1)
+                envelope: dict = {}
+                docs: list = list(
+                    client["stream_docs"](endpoint="quote", filter="limit=300", envelope=envelope)
+                )
+                self.assertEqual(docs, stub["state"]["quotes"])
+                self.assertEqual(envelope["total"], 300)
+                self.assertEqual(len(bodies), 1 + 300 + 1)
+
+                stub["state"]["faults"].append((500, None))
+                with self.assertRaises(requests.HTTPError):
+                    list(client["stream_docs"](endpoint="quote"))
+        return
+
+    async def case_streaming_and_decoder_hook(self):
+        calls: list = []
+
+        def decoder(body: str) -> dict:
+            calls.append(len(body))
+            return json.loads(body)
+
+        async with stub_api_server(quote_count=500) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], decoder=decoder
+            ) as client:
+                output: dict = await client["aio_fetch_all_movies"]()
+                self.assertEqual(output["total"], 8)
+                self.assertEqual(len(calls), 1)
+
+                envelope: dict = {}
+                stream = client["aio_stream_docs"](
+                    endpoint="quote", filter="limit=500", envelope=envelope, chunk_size=1024
+                )
+                docs: list = [doc async for doc in stream]
+                self.assertEqual(docs, stub["state"]["quotes"])
+                self.assertEqual(
+                    envelope, {"docs": [], "total": 500, "limit": 500, "offset": 0, "page": 1, "pages": 1}
+                )
+                # One document decoded at a time, never the whole body.
+                self.assertEqual(len(calls), 1 + 500 + 1)
+                self.assertLess(max(calls[1:]), 1024)
+
+                output = await lotr_api_fp.aio_fetch_data(
+                    endpoint="movie",
+                    api_key="test-key",
+                    id=None,
+                    query=None,
+                    filter=None,
+                    base_url=stub["base_url"],
+                    decoder=decoder,
+                )
+                self.assertEqual(output["total"], 8)
+
+            # A throttled stream takes its key out of rotation.
+            async with lotr_api_fp.aio_api_client(
+                api_key=None,
+                base_url=stub["base_url"],
+                key_pool=lotr_keypool_fp.create_key_pool(["key-0001", "key-0002"]),
+            ) as client:
+                stub["state"]["faults"].append((429, {"Retry-After": "30"}))
+                with self.assertRaises(aiohttp.ClientResponseError):
+                    async for _ in client["aio_stream_docs"](endpoint="movie"):
+                        pass
+                docs = [doc async for doc in client["aio_stream_docs"](endpoint="movie")]
+                self.assertEqual(len(docs), 8)
+                self.assertEqual(
+                    [key["in_rotation"] for key in client["key_pool_stats"]()], [False, True]
+                )
+        return
@@ -0,0 +1,120 @@
+import asyncio
+import time
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_deadline_fp as lotr_deadline_fp
+import api.lotr_keypool_fp as lotr_keypool_fp
+import api.lotr_retry_fp as lotr_retry_fp
+from tests.stub_api_server import stub_api_server, threaded_stub_api_server
+
+
+class TestKeyPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.apiKeys: list = ["key-0001", "key-0002", "key-0003"]
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_key_selection(self):
+        now: list = [0.0]
+        pool: dict = lotr_keypool_fp.create_key_pool(
+            self.apiKeys, strategy=lotr_keypool_fp.STRATEGY_LEAST_THROTTLED, clock=lambda: now[0]
+        )
+        keys: list = [lotr_keypool_fp.select_key(pool)["api_key"] for _ in range(6)]
+        self.assertEqual(keys, self.apiKeys * 2)
+        first: dict = pool["keys"][0]
+        lotr_keypool_fp.record_response(pool, first, 429, {"Retry-After": "30"})
+        self.assertEqual(
+            [lotr_keypool_fp.select_key(pool)["api_key"] for _ in range(2)], self.apiKeys[1:]
+        )
+        # Back in rotation after its Retry-After, a key throttled within the cooldown comes after the others.
+        now[0] = 31.0
+        lotr_keypool_fp.record_response(pool, pool["keys"][1], 429, {})
+        self.assertEqual(
+            [lotr_keypool_fp.select_key(pool)["api_key"] for _ in range(2)], [self.apiKeys[2]] * 2
+        )
+        now[0] = 95.0
+        self.assertEqual(lotr_keypool_fp.select_key(pool)["api_key"], self.apiKeys[0])
+
+        # Each key has its own bucket: the rate grows with the keys.
+        pool = lotr_keypool_fp.create_key_pool(self.apiKeys[:2], rate=1.0, burst=2, clock=lambda: now[0])
+        self.assertEqual(
+            [lotr_keypool_fp.try_select_key(pool)[0]["api_key"] for _ in range(4)],
+            self.apiKeys[:2] * 2,
+        )
+        self.assertEqual(lotr_keypool_fp.try_select_key(pool), (None, 1.0))
+        with self.assertRaises(ValueError):
+            lotr_keypool_fp.create_key_pool([])
+        return
+
+    def test_spread_and_quota(self):
+        asyncio.run(main=self.case_spread_and_quota())
+        return
+
+    def test_throttled_key_out_of_rotation(self):
+        asyncio.run(main=self.case_throttled_key_out_of_rotation())
+        return
+
+    def test_blocking_spread(self):
+        with threaded_stub_api_server() as stub:
+            with lotr_api_fp.api_client(
+                api_key=None,
+                base_url=stub["base_url"],
+                key_pool=lotr_keypool_fp.create_key_pool(self.apiKeys),
+            ) as client:
+                for _ in range(6):
+                    self.assertEqual(client["fetch"](endpoint="movie")["total"], 8)
+                self.assertEqual(stub["state"]["keys"], {key: 2 for key in self.apiKeys})
+        return
+
+    async def case_spread_and_quota(self):
+        async with stub_api_server() as stub:
+            stub["state"]["quota"] = 2
+            async with lotr_api_fp.aio_api_client(
+                api_key=None,
+                base_url=stub["base_url"],
+                key_pool=lotr_keypool_fp.create_key_pool(self.apiKeys),
+                single_flight=False,
+            ) as client:
+                outputs: list = await asyncio.gather(
+                    *[client["aio_fetch_all_movies"]() for _ in range(6)]
+                )
+                self.assertTrue(all(output["total"] == 8 for output in outputs))
+                self.assertEqual(stub["state"]["keys"], {key: 2 for key in self.apiKeys})
+                stats: list = client["key_pool_stats"]()
+                self.assertEqual(
+                    stats[0],
+                    {"key": "...0001", "requests": 2, "throttles": 0, "limit": 2, "remaining": 0, "in_rotation": False},
+                )
+                # Every quota is spent: the call waits for a reset beyond its deadline.
+                start: float = time.monotonic()
+                with lotr_deadline_fp.deadline(0.5):
+                    output: dict = await client["aio_fetch_all_movies"]()
+                self.assertEqual(output, {"error": "Deadline exceeded"})
+                self.assertLess(time.monotonic() - start, 0.1)
+                self.assertEqual(stub["state"]["requests"], 6)
+        return
+
+    async def case_throttled_key_out_of_rotation(self):
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key=None,
+                base_url=stub["base_url"],
+                key_pool=lotr_keypool_fp.create_key_pool(self.apiKeys[:2]),
+                retry=lotr_retry_fp.create_retry_policy(base_delay=0.01),
+            ) as client:
+                stub["state"]["faults"].append((429, {"Retry-After": "30"}))
+                start: float = time.monotonic()
+                output: dict = await client["aio_fetch_all_movies"]()
+                # The retry goes out at once with the other key instead of waiting 30s.
+                self.assertLess(time.monotonic() - start, 0.5)
+                self.assertEqual(output["total"], 8)
+                for _ in range(3):
+                    await client["aio_fetch_all_quotes"]()
+                self.assertEqual(stub["state"]["keys"], {self.apiKeys[0]: 1, self.apiKeys[1]: 4})
+                self.assertEqual(
+                    [(key["throttles"], key["in_rotation"]) for key in client["key_pool_stats"]()],
+                    [(1, False), (0, True)],
+                )
+        return
@@ -0,0 +1,140 @@
+import asyncio
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_filter_fp as lotr_filter_fp
+from tests.stub_api_server import MOVIES, make_quotes, stub_api_server
+
+
+class TestLocalFilter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movieId: str = "5cd95395de30eff6ebccde5d"
+        cls.quoteId: str = "5cd96e05de30eff6ebcce7e9"
+        cls.quotes: list = make_quotes(count=245)
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def names(self, filter: str) -> list:
+        return [doc["name"] for doc in lotr_filter_fp.apply_filter(MOVIES, filter)["docs"]]
+
+    def test_comparisons(self):
+        self.assertEqual(
+            self.names("budgetInMillions<100"),
+            ["The Two Towers", "The Fellowship of the Ring", "The Return of the King"],
+        )
+        self.assertEqual(self.names("runtimeInMinutes>=201"), [
+            "The Lord of the Rings Series", "The Hobbit Series", "The Return of the King"
+        ])
+        self.assertEqual(self.names("academyAwardWins<=0&rottenTomatoesScore>70"), [
+            "The Desolation of Smaug"
+        ])
+        return
+
+    def test_equality_and_lists(self):
+        self.assertEqual(self.names("name=The Two Towers"), ["The Two Towers"])
+        self.assertEqual(self.names("name=The%20Two%20Towers"), ["The Two Towers"])
+        self.assertEqual(self.names("budgetInMillions=94"), [
+            "The Two Towers", "The Return of the King"
+        ])
+        self.assertEqual(self.names("academyAwardWins=0,1&name!=The Hobbit Series"), [
+            "The Unexpected Journey", "The Desolation of Smaug", "The Battle of the Five Armies"
+        ])
+        self.assertEqual(len(self.names("academyAwardWins!=0,1,2")), 3)
+        return
+
+    def test_regex_and_exists(self):
+        self.assertEqual(self.names("name=/el/i"), ["The Fellowship of the Ring"])
+        self.assertEqual(len(self.names("name!=/the/i")), 0)
+        self.assertEqual(len(self.names("name")), 8)
+        self.assertEqual(len(self.names("!name")), 0)
+        self.assertEqual(len(self.names("!dialog")), 8)
+        return
+
+    def test_sort_and_pagination(self):
+        output: dict = lotr_filter_fp.apply_filter(
+            MOVIES, "sort=runtimeInMinutes:desc&limit=2&page=2"
+        )
+        self.assertEqual(
+            [doc["name"] for doc in output["docs"]],
+            ["The Return of the King", "The Two Towers"],
+        )
+        self.assertEqual(
+            {key: value for key, value in output.items() if key != "docs"},
+            {"total": 8, "limit": 2, "offset": 2, "page": 2, "pages": 4},
+        )
+        output = lotr_filter_fp.apply_filter(MOVIES, "sort=budgetInMillions:asc,name:desc&offset=1&limit=2")
+        self.assertEqual(
+            [doc["name"] for doc in output["docs"]],
+            ["The Two Towers", "The Return of the King"],
+        )
+        self.assertEqual((output["page"], output["offset"]), (1, 1))
+        output = lotr_filter_fp.apply_filter(self.quotes, "limit=10")
+        self.assertEqual((output["total"], output["pages"], len(output["docs"])), (245, 25, 10))
+        self.assertEqual(lotr_filter_fp.apply_filter(MOVIES, "name=Bilbo")["pages"], 1)
+        return
+
+    def test_client_answers_locally(self):
+        asyncio.run(main=self.case_client_answers_locally())
+        return
+
+    def test_failed_load_stops_other_crawls(self):
+        asyncio.run(main=self.case_failed_load_stops_other_crawls())
+        return
+
+    async def case_failed_load_stops_other_crawls(self):
+        async with stub_api_server(quote_count=1000, latency=0.01) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+
+                async def fetch(endpoint: str, **kwargs) -> dict:
+                    if endpoint == "movie":
+                        await asyncio.sleep(0.05)
+                        return {"error": "gateway down"}
+                    return await client["aio_fetch"](endpoint=endpoint, **kwargs)
+
+                datasets: dict = {}
+                with self.assertRaises(RuntimeError):
+                    await lotr_api_fp.aio_load_datasets(fetch, datasets, page_size=10, window=2)
+                # A request already sent when the crawl was cancelled may still reach the server.
+                await asyncio.sleep(0.05)
+                requests: int = stub["state"]["requests"]
+                await asyncio.sleep(0.1)
+            # The quote crawl stopped with the failed movie crawl, long before its 100 pages.
+            self.assertEqual(stub["state"]["requests"], requests)
+            self.assertLess(requests, 50)
+            self.assertEqual(datasets, {})
+        return
+
+    async def case_client_answers_locally(self):
+        async with stub_api_server(quote_count=245) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+                counts: dict = await client["aio_load_datasets"](page_size=100)
+                requests: int = stub["state"]["requests"]
+                movies: dict = await client["aio_fetch_all_movies"](filter="budgetInMillions<100")
+                quotes: dict = await client["aio_fetch_all_quotes"](filter="limit=10")
+                quote: dict = await client["aio_fetch_quote_by_id"](
+                    id=self.quoteId, query=None, filter=None
+                )
+                movie_quotes: dict = await client["aio_fetch_movie_quote_by_id"](
+                    id=self.movieId, filter="limit=2"
+                )
+                missing: dict = await client["aio_fetch_quote_by_id"](
+                    id="0" * 24, query=None, filter=None
+                )
+            self.assertEqual(counts, {"movie": 8, "quote": 245})
+            self.assertEqual(requests, 1 + 3)
+            self.assertEqual(stub["state"]["requests"], requests + 1)
+            self.assertEqual(movies["total"], 3)
+            self.assertEqual(quotes["docs"], self.quotes[:10])
+            self.assertEqual(
+                quote,
+                {"docs": self.quotes[:1], "total": 1, "limit": 1000, "offset": 0, "page": 1, "pages": 1},
+            )
+            self.assertEqual(movie_quotes["docs"], self.quotes[20:22])
+            self.assertEqual(movie_quotes["total"], 80)
+            self.assertNotIn("docs", missing)
+        return
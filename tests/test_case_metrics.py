@@ -0,0 +1,141 @@
+import asyncio
+import time
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_cache_fp as lotr_cache_fp
+import api.lotr_metrics_fp as lotr_metrics_fp
+import api.lotr_retry_fp as lotr_retry_fp
+from tests.stub_api_server import stub_api_server, threaded_stub_api_server
+
+
+class TestMetrics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movieId: str = "5cd95395de30eff6ebccde5d"
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_histograms(self):
+        metrics: dict = lotr_metrics_fp.create_metrics(buckets=(0.1, 1.0))
+        for started in (0.0, -0.5, -0.5, -5.0):
+            lotr_metrics_fp.record_request(
+                metrics,
+                {"endpoint": "movie", "id": self.movieId, "query": "quote"},
+                {"ttfb": 0.01, "bytes": 10},
+                started=started + time.perf_counter(),
+                status=200,
+            )
+        histogram: dict = lotr_metrics_fp.metrics_snapshot(metrics)["histograms"]["movie/{id}/quote"]
+        self.assertEqual(histogram["counts"], [1, 2, 1])
+        self.assertEqual(histogram["count"], 4)
+        self.assertEqual(lotr_metrics_fp.histogram_quantile(histogram, 0.5), 1.0)
+        self.assertEqual(lotr_metrics_fp.histogram_quantile(histogram, 1.0), float("inf"))
+        self.assertEqual(lotr_metrics_fp.route("quote"), "quote")
+        return
+
+    def test_exporter_failure(self):
+        def exporter(event: dict) -> None:
+            raise RuntimeError("exporter down")
+
+        metrics: dict = lotr_metrics_fp.create_metrics(exporter=exporter)
+        with self.assertLogs(lotr_metrics_fp.logger, level="ERROR"):
+            lotr_metrics_fp.count(metrics, "retries")
+        self.assertEqual(lotr_metrics_fp.metrics_snapshot(metrics)["counters"]["retries"], 1)
+        return
+
+    def test_aio_metrics(self):
+        asyncio.run(main=self.case_aio_metrics())
+        return
+
+    def test_hedged_metrics(self):
+        asyncio.run(main=self.case_hedged_metrics())
+        return
+
+    def test_blocking_metrics(self):
+        events: list = []
+        metrics: dict = lotr_metrics_fp.create_metrics(exporter=events.append)
+        with threaded_stub_api_server() as stub:
+            with lotr_api_fp.api_client(
+                api_key="test-key", base_url=stub["base_url"], metrics=metrics
+            ) as client:
+                self.assertEqual(client["fetch"](endpoint="movie")["total"], 8)
+        requests: list = [event for event in events if event["event"] == "request"]
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(requests[0]["route"], "movie")
+        self.assertGreater(requests[0]["bytes"], 0)
+        self.assertIsNotNone(requests[0]["phases"]["ttfb"])
+        self.assertIsNotNone(requests[0]["phases"]["body"])
+        self.assertEqual(
+            client["metrics_snapshot"]()["counters"]["bytes_received"], requests[0]["bytes"]
+        )
+        return
+
+    async def case_aio_metrics(self):
+        events: list = []
+        metrics: dict = lotr_metrics_fp.create_metrics(exporter=events.append)
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key",
+                base_url=stub["base_url"],
+                metrics=metrics,
+                response_cache=lotr_cache_fp.create_response_cache(),
+                retry=lotr_retry_fp.create_retry_policy(base_delay=0.01),
+            ) as client:
+                stub["state"]["faults"].append((429, {"Retry-After": "0"}))
+                await client["aio_fetch_movie_by_id"](id=self.movieId, query=None, filter=None)
+                await client["aio_fetch_movie_by_id"](id=self.movieId, query=None, filter=None)
+                await client["aio_fetch_all_quotes"]()
+                snapshot: dict = client["metrics_snapshot"]()
+
+        counters: dict = snapshot["counters"]
+        self.assertEqual(counters["requests"], 3)
+        self.assertEqual(counters["throttled"], 1)
+        self.assertEqual(counters["retries"], 1)
+        self.assertEqual(counters["cache_hits"], 1)
+        self.assertEqual(counters["cache_misses"], 2)
+        self.assertEqual(counters["errors"], 0)
+        self.assertEqual(sorted(snapshot["histograms"]), ["movie/{id}", "quote"])
+        self.assertEqual(snapshot["histograms"]["movie/{id}"]["count"], 2)
+
+        requests: list = [event for event in events if event["event"] == "request"]
+        self.assertEqual([event["status"] for event in requests], [429, 200, 200])
+        self.assertEqual(counters["bytes_received"], sum(event["bytes"] for event in requests))
+        # The first request opens the connection, the next ones reuse it.
+        self.assertFalse(requests[0]["reused"])
+        self.assertIsNotNone(requests[0]["phases"]["connect"])
+        self.assertTrue(requests[1]["reused"])
+        self.assertIsNone(requests[1]["phases"]["connect"])
+        for event in requests:
+            self.assertGreater(event["bytes"], 0)
+            self.assertGreaterEqual(event["phases"]["ttfb"], 0.0)
+            self.assertGreaterEqual(event["phases"]["body"], 0.0)
+            self.assertLessEqual(event["phases"]["ttfb"], event["duration"])
+        return
+
+    async def case_hedged_metrics(self):
+        metrics: dict = lotr_metrics_fp.create_metrics()
+        policy: dict = lotr_retry_fp.create_retry_policy(hedge_percentile=0.5, hedge_min_samples=5)
+        async with stub_api_server(quote_count=40) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], retry=policy, metrics=metrics
+            ) as client:
+                quotes: list = stub["state"]["quotes"]
+                for quote in quotes[:5]:
+                    await client["aio_fetch_quote_by_id"](id=quote["_id"], query=None, filter=None)
+                # The first copy is slow: the hedged one answers and the slow one is cancelled.
+                stub["state"]["delays"].append(1.0)
+                output: dict = await client["aio_fetch_quote_by_id"](id=quotes[5]["_id"], query=None, filter=None)
+                snapshot: dict = client["metrics_snapshot"]()
+
+        self.assertEqual(output["docs"], [quotes[5]])
+        self.assertEqual(client["retry_stats"]()["hedge_wins"], 1)
+        counters: dict = snapshot["counters"]
+        self.assertEqual(counters["errors"], 0)
+        self.assertEqual(counters["cancelled"], 1)
+        self.assertEqual(counters["requests"], 6)
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
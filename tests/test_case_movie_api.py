@@ -37,6 +37,7 @@ class TestMovieAPI(unittest.TestCase):
             self.client["aio_fetch_all_movies"](filter="budgetInMillions<100")
         )
         output: dict = await task
+        await self.client["aio_close"]()
         expected: dict = {
             "docs": [
                 {
@@ -84,6 +85,7 @@ class TestMovieAPI(unittest.TestCase):
             self.client["aio_fetch_all_movies"](filter="name=/el/i")
         )
         output: dict = await task
+        await self.client["aio_close"]()
         expected: dict = {
             "docs": [
                 {
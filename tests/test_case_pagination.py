@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+from tests.stub_api_server import make_quotes, stub_api_server
+
+
+class TestPagination(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movieId: str = "5cd95395de30eff6ebccde5d"
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_iter_all_quotes(self):
+        asyncio.run(main=self.case_iter_all_quotes())
+        return
+
+    def test_iter_movie_quotes(self):
+        asyncio.run(main=self.case_iter_movie_quotes())
+        return
+
+    def test_iter_stops_early(self):
+        asyncio.run(main=self.case_iter_stops_early())
+        return
+
+    async def case_iter_all_quotes(self):
+        async with stub_api_server(quote_count=245) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+                quotes: list = [
+                    quote
+                    async for quote in client["aio_iter_all_quotes"](page_size=20, window=3)
+                ]
+            self.assertListEqual(quotes, make_quotes(count=245))
+            self.assertEqual(stub["state"]["requests"], 13)
+        return
+
+    async def case_iter_movie_quotes(self):
+        async with stub_api_server(quote_count=245) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+                quotes: list = [
+                    quote
+                    async for quote in client["aio_iter_movie_quotes"](
+                        id=self.movieId, page_size=7
+                    )
+                ]
+            expected: list = [
+                quote for quote in make_quotes(count=245) if quote["movie"] == self.movieId
+            ]
+            self.assertListEqual(quotes, expected)
+        return
+
+    async def case_iter_stops_early(self):
+        async with stub_api_server(quote_count=245) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+                iterator = client["aio_iter_all_quotes"](page_size=10, window=2)
+                quotes: list = []
+                async for quote in iterator:
+                    quotes.append(quote)
+                    if len(quotes) == 15:
+                        break
+                await iterator.aclose()
+            self.assertEqual(len(quotes), 15)
+            self.assertLessEqual(stub["state"]["requests"], 4)
+        return
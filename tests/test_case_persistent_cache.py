@@ -0,0 +1,133 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_cache_fp as lotr_cache_fp
+from tests.stub_api_server import stub_api_server, threaded_stub_api_server
+
+
+class TestPersistentCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movieId: str = "5cd95395de30eff6ebccde5d"
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.directory.name, "cache.sqlite")
+        self.now: float = 1000.0
+        return super().setUp()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        return super().tearDown()
+
+    def clock(self) -> float:
+        return self.now
+
+    def test_shared_between_connections(self):
+        writer: dict = lotr_cache_fp.create_sqlite_cache(self.path, clock=self.clock)
+        reader: dict = lotr_cache_fp.create_sqlite_cache(self.path, clock=self.clock)
+        writer["set"]("url", {"docs": [1]}, endpoint="movie", etag='"abc"')
+        entry: dict = reader["get"]("url")
+        self.assertEqual(entry["data"], {"docs": [1]})
+        self.assertEqual(lotr_cache_fp.validators_of(entry), {"If-None-Match": '"abc"'})
+        self.assertTrue(lotr_cache_fp.is_fresh(reader, entry, endpoint="movie"))
+        self.now += 86400
+        self.assertFalse(lotr_cache_fp.is_fresh(reader, entry, endpoint="movie"))
+        writer["close"]()
+        reader["close"]()
+        return
+
+    def test_compaction(self):
+        backend: dict = lotr_cache_fp.create_sqlite_cache(
+            self.path, max_bytes=1000, clock=self.clock
+        )
+        for i in range(20):
+            self.now += 1
+            backend["set"](f"url{i}", {"docs": ["x" * 90]})
+        counters: dict = backend["counters"]()
+        self.assertLessEqual(counters["bytes"], 1000)
+        self.assertGreater(counters["evictions"], 0)
+        self.assertIsNone(backend["get"]("url0"))
+        self.assertIsNotNone(backend["get"]("url19"))
+        backend["close"]()
+        return
+
+    def test_warm_start(self):
+        asyncio.run(main=self.case_warm_start())
+        return
+
+    def test_locked_file_does_not_block_loop(self):
+        asyncio.run(main=self.case_locked_file_does_not_block_loop())
+        return
+
+    def test_blocking_revalidation(self):
+        with threaded_stub_api_server() as stub:
+            backend: dict = lotr_cache_fp.create_sqlite_cache(self.path, ttl=60, clock=self.clock)
+            with lotr_api_fp.api_client(
+                api_key="test-key", base_url=stub["base_url"], persistent_cache=backend
+            ) as client:
+                first: dict = client["fetch"](endpoint="movie")
+                self.now += 120
+                second: dict = client["fetch"](endpoint="movie")
+                third: dict = client["fetch"](endpoint="movie")
+            backend["close"]()
+            self.assertEqual(first, second)
+            self.assertEqual(second, third)
+            self.assertEqual(stub["state"]["requests"], 2)
+            self.assertEqual(stub["state"]["not_modified"], 1)
+        return
+
+    async def case_warm_start(self):
+        async with stub_api_server() as stub:
+            for _ in range(2):
+                # Every iteration stands for a restarted worker process.
+                backend: dict = lotr_cache_fp.create_sqlite_cache(self.path, clock=self.clock)
+                async with lotr_api_fp.aio_api_client(
+                    api_key="test-key", base_url=stub["base_url"], persistent_cache=backend
+                ) as client:
+                    movies: dict = await client["aio_fetch_all_movies"]()
+                    movie: dict = await client["aio_fetch_movie_by_id"](
+                        id=self.movieId, query=None, filter=None
+                    )
+                backend["close"]()
+                self.assertEqual(movies["total"], 8)
+                self.assertEqual(movie["docs"][0]["_id"], self.movieId)
+            self.assertEqual(stub["state"]["requests"], 2)
+        return
+
+    async def case_locked_file_does_not_block_loop(self):
+        backend: dict = lotr_cache_fp.create_sqlite_cache(self.path, clock=self.clock)
+        # Another process holds the write lock of the file for 0.5s.
+        locker: sqlite3.Connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        locker.execute("BEGIN IMMEDIATE")
+        timer: threading.Timer = threading.Timer(0.5, locker.execute, args=("COMMIT",))
+        ticks: list = []
+
+        async def tick() -> None:
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0.01)
+
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], persistent_cache=backend
+            ) as client:
+                ticker: asyncio.Task = asyncio.create_task(tick())
+                timer.start()
+                movies: dict = await client["aio_fetch_all_movies"]()
+                ticker.cancel()
+        timer.join()
+        locker.close()
+        self.assertEqual(movies["total"], 8)
+        # The event loop kept running while the response waited for the lock to be stored.
+        self.assertGreater(len(ticks), 20)
+        self.assertEqual(backend["counters"]()["writes"], 1)
+        backend["close"]()
+        return
@@ -35,6 +35,7 @@ class TestQuoteAPI(unittest.TestCase):
             self.client["aio_fetch_all_quotes"](filter="limit=10")
         )
         output: dict = await task
+        await self.client["aio_close"]()
         expected: dict = {
             "docs": [
                 {
@@ -122,6 +123,7 @@ class TestQuoteAPI(unittest.TestCase):
             self.client["aio_fetch_quote_by_id"](id=self.quoteId, query=None, filter=None)
         )
         output: dict = await task
+        await self.client["aio_close"]()
         expected: dict = {
             "docs": [
                 {
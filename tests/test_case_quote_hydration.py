@@ -0,0 +1,121 @@
+import asyncio
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_cache_fp as lotr_cache_fp
+import api.lotr_loader_fp as lotr_loader_fp
+from tests.stub_api_server import CHARACTERS, MOVIES, stub_api_server
+
+
+class TestQuoteHydration(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movies: dict = {movie["_id"]: movie for movie in MOVIES}
+        cls.characters: dict = {character["_id"]: character for character in CHARACTERS}
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def assertHydrated(self, quotes: list, hydrated: list):
+        self.assertEqual(len(hydrated), len(quotes))
+        for quote, doc in zip(quotes, hydrated):
+            self.assertEqual(doc["movie"], self.movies[quote["movie"]])
+            self.assertEqual(doc["character"], self.characters[quote["character"]])
+            self.assertEqual(doc["dialog"], quote["dialog"])
+        return
+
+    def test_loader_batches_one_tick(self):
+        asyncio.run(main=self.case_loader_batches_one_tick())
+        return
+
+    def test_hydrate_quotes(self):
+        asyncio.run(main=self.case_hydrate_quotes())
+        return
+
+    def test_hydrate_from_cache_and_datasets(self):
+        asyncio.run(main=self.case_hydrate_from_cache_and_datasets())
+        return
+
+    async def case_loader_batches_one_tick(self):
+        batches: list = []
+
+        async def batch_fn(keys: list) -> dict:
+            batches.append(keys)
+            await asyncio.sleep(0.01)
+            return {key: key * 2 for key in keys if key != 3}
+
+        loader: dict = lotr_loader_fp.create_data_loader(batch_fn, max_batch_size=4)
+        values: list = await asyncio.gather(
+            lotr_loader_fp.aio_load_many(loader, [1, 2, 3, 1]),
+            lotr_loader_fp.aio_load(loader, 2),
+            lotr_loader_fp.aio_load_many(loader, [4, 5, 6]),
+        )
+        self.assertEqual(values, [[2, 4, None, 2], 4, [8, 10, 12]])
+        self.assertEqual([sorted(batch) for batch in batches], [[1, 2, 3, 4], [5, 6]])
+        self.assertEqual(await lotr_loader_fp.aio_load(loader, 1), 2)
+        self.assertEqual(lotr_loader_fp.loader_stats(loader), {"loads": 9, "batches": 3, "keys": 7})
+
+        async def failing_batch_fn(keys: list) -> dict:
+            raise RuntimeError("gateway down")
+
+        loader = lotr_loader_fp.create_data_loader(failing_batch_fn, cache=True)
+        with self.assertRaises(RuntimeError):
+            await lotr_loader_fp.aio_load(loader, 1)
+        self.assertEqual(loader["values"], {})
+
+        # A cancelled batch cancels its loads, and the keys can be loaded again.
+        released: asyncio.Event = asyncio.Event()
+
+        async def stalling_batch_fn(keys: list) -> dict:
+            await released.wait()
+            return {key: key * 2 for key in keys}
+
+        loader = lotr_loader_fp.create_data_loader(stalling_batch_fn)
+        load: asyncio.Task = asyncio.ensure_future(lotr_loader_fp.aio_load(loader, 7))
+        while not loader["tasks"]:
+            await asyncio.sleep(0)
+        for task in list(loader["tasks"]):
+            task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await asyncio.wait_for(load, timeout=1)
+        self.assertEqual(loader["loading"], {})
+        released.set()
+        self.assertEqual(await asyncio.wait_for(lotr_loader_fp.aio_load(loader, 7), timeout=1), 14)
+        return
+
+    async def case_hydrate_quotes(self):
+        async with stub_api_server(quote_count=60) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], batch_concurrency=2
+            ) as client:
+                quotes: list = (await client["aio_fetch_all_quotes"]())["docs"]
+                requests: int = stub["state"]["requests"]
+                first, second = await asyncio.gather(
+                    client["aio_hydrate_quotes"](quotes[:30]),
+                    client["aio_hydrate_quotes"](quotes[30:]),
+                )
+                self.assertHydrated(quotes, first + second)
+                # One call per distinct movie (3) and character (4), shared by both pages.
+                self.assertEqual(stub["state"]["requests"] - requests, 7)
+                self.assertTrue(all("/quote" not in path for path in stub["state"]["paths"][requests:]))
+
+                unknown: dict = {**quotes[0], "character": "0" * 24}
+                hydrated: list = await client["aio_hydrate_quotes"]([unknown], fields=("character",))
+                self.assertEqual(hydrated, [unknown])
+        return
+
+    async def case_hydrate_from_cache_and_datasets(self):
+        async with stub_api_server(quote_count=60) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key",
+                base_url=stub["base_url"],
+                response_cache=lotr_cache_fp.create_response_cache(),
+            ) as client:
+                await client["aio_load_datasets"](endpoints=("movie", "quote"))
+                quotes: list = (await client["aio_fetch_all_quotes"]())["docs"]
+                requests: int = stub["state"]["requests"]
+                self.assertHydrated(quotes, await client["aio_hydrate_quotes"](quotes))
+                # The movies are answered by the loaded dataset, only the characters go to the network.
+                self.assertEqual(stub["state"]["requests"] - requests, 4)
+                self.assertHydrated(quotes, await client["aio_hydrate_quotes"](quotes))
+                self.assertEqual(stub["state"]["requests"] - requests, 4)
+        return
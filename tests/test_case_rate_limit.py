@@ -0,0 +1,123 @@
+import asyncio
+import time
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_ratelimit_fp as lotr_ratelimit_fp
+from tests.stub_api_server import stub_api_server, threaded_stub_api_server
+
+
+class TestRateLimit(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movieId: str = "5cd95395de30eff6ebccde5d"
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def setUp(self):
+        self.now: float = 0.0
+        return super().setUp()
+
+    def clock(self) -> float:
+        return self.now
+
+    def test_token_bucket(self):
+        policy: dict = lotr_ratelimit_fp.create_rate_limit_policy(
+            rate=2, burst=3, clock=self.clock
+        )
+        waits: list = [lotr_ratelimit_fp.try_acquire(policy) for _ in range(4)]
+        self.assertEqual(waits, [0, 0, 0, 0.5])
+        self.now = 0.5
+        self.assertEqual(lotr_ratelimit_fp.try_acquire(policy), 0)
+        self.now = 100.0
+        waits = [lotr_ratelimit_fp.try_acquire(policy) for _ in range(4)]
+        self.assertEqual(waits, [0, 0, 0, 0.5])
+        return
+
+    def test_priority_order(self):
+        asyncio.run(main=self.case_priority_order())
+        return
+
+    def test_blocking_waits(self):
+        policy: dict = lotr_ratelimit_fp.create_rate_limit_policy(rate=40, burst=2)
+        with threaded_stub_api_server() as stub:
+            with lotr_api_fp.api_client(
+                api_key="test-key", base_url=stub["base_url"], rate_limit=policy
+            ) as client:
+                start: float = time.monotonic()
+                outputs: list = [client["fetch"](endpoint="movie") for _ in range(6)]
+                elapsed: float = time.monotonic() - start
+        self.assertTrue(all(output["total"] == 8 for output in outputs))
+        self.assertGreaterEqual(elapsed, 0.09)
+        return
+
+    def test_client_crawl_yields_to_lookups(self):
+        asyncio.run(main=self.case_client_crawl_yields_to_lookups())
+        return
+
+    def test_priority_without_rate_limit(self):
+        asyncio.run(main=self.case_priority_without_rate_limit())
+        return
+
+    async def case_priority_order(self):
+        policy: dict = lotr_ratelimit_fp.create_rate_limit_policy(rate=100, burst=1)
+        order: list = []
+
+        async def call(name: str, priority: int) -> None:
+            await lotr_ratelimit_fp.aio_acquire(policy, priority=priority)
+            order.append(name)
+
+        tasks: list = [
+            asyncio.create_task(call(f"bulk{i}", lotr_ratelimit_fp.PRIORITY_BULK))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        tasks += [
+            asyncio.create_task(call(f"lookup{i}", lotr_ratelimit_fp.PRIORITY_INTERACTIVE))
+            for i in range(2)
+        ]
+        await asyncio.gather(*tasks)
+        self.assertEqual(order, ["bulk0", "lookup0", "lookup1", "bulk1", "bulk2"])
+        return
+
+    async def case_client_crawl_yields_to_lookups(self):
+        policy: dict = lotr_ratelimit_fp.create_rate_limit_policy(rate=200, burst=1)
+        async with stub_api_server(quote_count=100) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], rate_limit=policy
+            ) as client:
+                crawl = asyncio.ensure_future(
+                    self.collect(client["aio_iter_all_quotes"](page_size=10, window=5))
+                )
+                await asyncio.sleep(0.02)
+                movie: dict = await client["aio_fetch_movie_by_id"](
+                    id=self.movieId, query=None, filter=None
+                )
+                crawl_done: bool = crawl.done()
+                quotes: list = await crawl
+                stats: dict = client["rate_limit_stats"]()
+            self.assertEqual(movie["docs"][0]["_id"], self.movieId)
+            self.assertFalse(crawl_done)
+            self.assertEqual(len(quotes), 100)
+            self.assertEqual(stats["granted"], 11)
+        return
+
+    async def case_priority_without_rate_limit(self):
+        # The calls take the same keyword arguments with or without a rate limit.
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(api_key="test-key", base_url=stub["base_url"]) as client:
+                movies: dict = await client["aio_fetch_all_movies"](priority=lotr_ratelimit_fp.PRIORITY_BULK)
+                movie: dict = await client["aio_fetch"](
+                    endpoint="movie", id=self.movieId, query=None, filter=None, priority=5
+                )
+            with lotr_api_fp.api_client(api_key="test-key", base_url=stub["base_url"]) as client:
+                output: dict = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: client["fetch"](endpoint="movie", priority=5)
+                )
+        self.assertEqual(movies["total"], 8)
+        self.assertEqual(movie["docs"][0]["_id"], self.movieId)
+        self.assertEqual(output["total"], 8)
+        return
+
+    async def collect(self, iterator) -> list:
+        return [doc async for doc in iterator]
@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_cache_fp as lotr_cache_fp
+from tests.stub_api_server import stub_api_server, threaded_stub_api_server
+
+
+class TestResponseCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movieId: str = "5cd95395de30eff6ebccde5d"
+        cls.quoteId: str = "5cd96e05de30eff6ebcce7e9"
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def setUp(self):
+        self.now: float = 0.0
+        return super().setUp()
+
+    def clock(self) -> float:
+        return self.now
+
+    def test_ttl_per_endpoint(self):
+        cache: dict = lotr_cache_fp.create_response_cache(
+            ttl=10, endpoint_ttls={"movie": 100}, clock=self.clock
+        )
+        lotr_cache_fp.cache_set(cache, "movie-url", {"docs": [1]}, endpoint="movie")
+        lotr_cache_fp.cache_set(cache, "quote-url", {"docs": [2]}, endpoint="quote")
+        self.now = 50.0
+        self.assertEqual(lotr_cache_fp.cache_get(cache, "movie-url"), {"docs": [1]})
+        self.assertIs(lotr_cache_fp.cache_get(cache, "quote-url"), lotr_cache_fp.MISSING)
+        stats: dict = lotr_cache_fp.cache_stats(cache)
+        self.assertEqual(
+            (stats["hits"], stats["misses"], stats["expirations"], stats["entries"]),
+            (1, 1, 1, 1),
+        )
+        return
+
+    def test_lru_limits(self):
+        cache: dict = lotr_cache_fp.create_response_cache(max_entries=2, clock=self.clock)
+        lotr_cache_fp.cache_set(cache, "a", {"docs": ["a"]})
+        lotr_cache_fp.cache_set(cache, "b", {"docs": ["b"]})
+        lotr_cache_fp.cache_get(cache, "a")
+        lotr_cache_fp.cache_set(cache, "c", {"docs": ["c"]})
+        self.assertIs(lotr_cache_fp.cache_get(cache, "b"), lotr_cache_fp.MISSING)
+        self.assertEqual(lotr_cache_fp.cache_get(cache, "a"), {"docs": ["a"]})
+        self.assertEqual(lotr_cache_fp.cache_stats(cache)["evictions"], 1)
+
+        cache = lotr_cache_fp.create_response_cache(max_bytes=40, clock=self.clock)
+        lotr_cache_fp.cache_set(cache, "a", {"docs": ["a" * 10]})
+        lotr_cache_fp.cache_set(cache, "b", {"docs": ["b" * 10]})
+        lotr_cache_fp.cache_set(cache, "c", {"docs": ["c" * 100]})
+        stats: dict = lotr_cache_fp.cache_stats(cache)
+        self.assertEqual((stats["entries"], stats["bytes"], stats["evictions"]), (1, 23, 1))
+        return
+
+    def test_blocking_client_cache(self):
+        cache: dict = lotr_cache_fp.create_response_cache()
+        with threaded_stub_api_server() as stub:
+            with lotr_api_fp.api_client(
+                api_key="test-key", base_url=stub["base_url"], response_cache=cache
+            ) as client:
+                outputs: list = [client["fetch"](endpoint="movie") for _ in range(3)]
+            self.assertTrue(all(output["total"] == 8 for output in outputs))
+            self.assertEqual(stub["state"]["requests"], 1)
+        return
+
+    def test_client_cache(self):
+        asyncio.run(main=self.case_client_cache())
+        return
+
+    async def case_client_cache(self):
+        cache: dict = lotr_cache_fp.create_response_cache()
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], response_cache=cache
+            ) as client:
+                for _ in range(3):
+                    movie: dict = await client["aio_fetch_movie_by_id"](
+                        id=self.movieId, query=None, filter=None
+                    )
+                    quote: dict = await client["aio_fetch_quote_by_id"](
+                        id=self.quoteId, query=None, filter=None
+                    )
+                missing: dict = await client["aio_fetch_quote_by_id"](
+                    id="0" * 24, query=None, filter=None
+                )
+                await client["aio_fetch_quote_by_id"](id="0" * 24, query=None, filter=None)
+                stats: dict = client["cache_stats"]()
+            self.assertEqual(movie["docs"][0]["_id"], self.movieId)
+            self.assertEqual(quote["docs"][0]["_id"], self.quoteId)
+            self.assertNotIn("docs", missing)
+            self.assertEqual(stub["state"]["requests"], 4)
+            self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (4, 4, 2))
+        return
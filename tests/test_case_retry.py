@@ -0,0 +1,183 @@
+import asyncio
+import time
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_deadline_fp as lotr_deadline_fp
+import api.lotr_retry_fp as lotr_retry_fp
+from tests.stub_api_server import stub_api_server, threaded_stub_api_server
+
+
+class TestRetry(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movieId: str = "5cd95395de30eff6ebccde5d"
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_retry_delay(self):
+        policy: dict = lotr_retry_fp.create_retry_policy(
+            max_attempts=4, base_delay=0.5, max_delay=1.5, random=lambda: 1.0
+        )
+        self.assertEqual(
+            [lotr_retry_fp.retry_delay(policy, attempt, status=503) for attempt in range(4)],
+            [0.5, 1.0, 1.5, None],
+        )
+        self.assertIsNone(lotr_retry_fp.retry_delay(policy, 0, status=404))
+        self.assertEqual(
+            lotr_retry_fp.retry_delay(policy, 0, status=429, headers={"Retry-After": "7"}), 7.0
+        )
+        self.assertIsNone(
+            lotr_retry_fp.retry_delay(policy, 0, status=429, headers={"Retry-After": "120"})
+        )
+        # A request that may have been processed is only retried if it could not connect.
+        error: OSError = OSError("reset")
+        self.assertIsNone(lotr_retry_fp.retry_delay(policy, 0, error=error, method="POST"))
+        self.assertIsNone(lotr_retry_fp.retry_delay(policy, 0, status=502, method="POST"))
+        self.assertEqual(
+            lotr_retry_fp.retry_delay(policy, 0, error=error, method="POST", connect_error=True), 0.5
+        )
+        with lotr_deadline_fp.deadline(0.2):
+            self.assertIsNone(lotr_retry_fp.retry_delay(policy, 0, status=503))
+        self.assertEqual(
+            lotr_retry_fp.parse_retry_after("Wed, 21 Oct 2015 07:28:30 GMT", now=lambda: 1445412480),
+            30.0,
+        )
+        self.assertIsNone(lotr_retry_fp.parse_retry_after("soon"))
+
+        policy = lotr_retry_fp.create_retry_policy(hedge_percentile=0.9, hedge_min_samples=10)
+        for latency in range(1, 10):
+            lotr_retry_fp.record_latency(policy, latency / 100)
+        self.assertIsNone(lotr_retry_fp.hedge_threshold(policy))
+        lotr_retry_fp.record_latency(policy, 1.0)
+        self.assertEqual(lotr_retry_fp.hedge_threshold(policy), 0.09)
+        self.assertIsNone(lotr_retry_fp.hedge_threshold(policy, method="POST"))
+        return
+
+    def test_retries(self):
+        asyncio.run(main=self.case_retries())
+        return
+
+    def test_hedged_requests(self):
+        asyncio.run(main=self.case_hedged_requests())
+        return
+
+    def test_blocking_retries_and_hedging(self):
+        policy: dict = lotr_retry_fp.create_retry_policy(
+            base_delay=0.01, hedge_percentile=0.5, hedge_min_samples=3
+        )
+        with threaded_stub_api_server() as stub:
+            with lotr_api_fp.api_client(
+                api_key="test-key", base_url=stub["base_url"], retry=policy
+            ) as client:
+                stub["state"]["faults"].extend([(500, None), (429, {"Retry-After": "0"})])
+                self.assertEqual(client["fetch"](endpoint="movie")["total"], 8)
+                self.assertEqual(stub["state"]["requests"], 3)
+
+                stub["state"]["delays"].append(1.0)
+                start: float = time.monotonic()
+                self.assertEqual(client["fetch"](endpoint="movie")["total"], 8)
+                self.assertLess(time.monotonic() - start, 0.5)
+                self.assertEqual(lotr_retry_fp.retry_stats(policy)["hedge_wins"], 1)
+
+            stub["state"]["faults"].append((503, None))
+            output: dict = lotr_api_fp.fetch_data(
+                endpoint="movie",
+                api_key="test-key",
+                id=self.movieId,
+                query=None,
+                filter=None,
+                base_url=stub["base_url"],
+                retry=lotr_retry_fp.create_retry_policy(base_delay=0.01),
+            )
+            self.assertEqual(output["docs"][0]["_id"], self.movieId)
+        return
+
+    async def case_retries(self):
+        policy: dict = lotr_retry_fp.create_retry_policy(base_delay=0.01, max_retry_after=1.0)
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], retry=policy
+            ) as client:
+                faults: list = stub["state"]["faults"]
+                faults.extend([(503, None), (429, {"Retry-After": "0.2"})])
+                start: float = time.monotonic()
+                output: dict = await client["aio_fetch_movie_by_id"](
+                    id=self.movieId, query=None, filter=None
+                )
+                self.assertGreaterEqual(time.monotonic() - start, 0.2)
+                self.assertEqual(output["docs"][0]["_id"], self.movieId)
+                self.assertEqual(stub["state"]["requests"], 3)
+                self.assertEqual(
+                    client["retry_stats"](),
+                    {"attempts": 3, "retries": 2, "gave_up": 0, "hedges": 0, "hedge_wins": 0},
+                )
+
+                # Once the attempts are spent, the last answer comes back as it is.
+                faults.extend([(502, None)] * 3)
+                output = await client["aio_fetch_all_movies"]()
+                self.assertEqual(output, {"success": False, "message": "Injected failure."})
+                self.assertEqual(faults, [])
+
+                # No retry for a client error, nor for a Retry-After longer than allowed.
+                faults.extend([(404, None), (429, {"Retry-After": "30"})])
+                await client["aio_fetch_all_quotes"]()
+                await client["aio_fetch_all_quotes"]()
+                self.assertEqual(faults, [])
+                self.assertEqual(client["retry_stats"]()["gave_up"], 2)
+
+                # A Retry-After beyond the deadline gives up at once.
+                faults.append((429, {"Retry-After": "0.5"}))
+                start = time.monotonic()
+                with lotr_deadline_fp.deadline(0.3):
+                    output = await client["aio_fetch_all_movies"]()
+                self.assertLess(time.monotonic() - start, 0.2)
+                self.assertEqual(output["message"], "Injected failure.")
+
+            faults.append((500, None))
+            output = await lotr_api_fp.aio_fetch_data(
+                endpoint="movie",
+                api_key="test-key",
+                id=None,
+                query=None,
+                filter=None,
+                base_url=stub["base_url"],
+                retry=policy,
+            )
+            self.assertEqual(output["total"], 8)
+
+        # Errors of the connection are retried too before coming back as an error.
+        policy = lotr_retry_fp.create_retry_policy(base_delay=0.01)
+        async with lotr_api_fp.aio_api_client(
+            api_key="test-key", base_url=stub["base_url"], retry=policy
+        ) as client:
+            output = await client["aio_fetch_all_movies"]()
+            self.assertIn("error", output)
+            self.assertEqual(client["retry_stats"]()["attempts"], 3)
+        return
+
+    async def case_hedged_requests(self):
+        policy: dict = lotr_retry_fp.create_retry_policy(
+            hedge_percentile=0.5, hedge_min_samples=5
+        )
+        async with stub_api_server(quote_count=40) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], retry=policy
+            ) as client:
+                quotes: list = stub["state"]["quotes"]
+                for quote in quotes[:5]:
+                    await client["aio_fetch_quote_by_id"](id=quote["_id"], query=None, filter=None)
+                self.assertIsNotNone(lotr_retry_fp.hedge_threshold(policy))
+
+                # The first copy is slow: the hedged one answers and the slow one is dropped.
+                stub["state"]["delays"].append(1.0)
+                start: float = time.monotonic()
+                output: dict = await client["aio_fetch_quote_by_id"](
+                    id=quotes[5]["_id"], query=None, filter=None
+                )
+                self.assertLess(time.monotonic() - start, 0.5)
+                self.assertEqual(output["docs"], [quotes[5]])
+                self.assertEqual(stub["state"]["requests"], 7)
+                stats: dict = client["retry_stats"]()
+                self.assertEqual((stats["hedges"], stats["hedge_wins"]), (1, 1))
+        return
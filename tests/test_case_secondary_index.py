@@ -0,0 +1,126 @@
+import asyncio
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_filter_fp as lotr_filter_fp
+import api.lotr_store_fp as lotr_store_fp
+from tests.stub_api_server import CHARACTER_IDS, MOVIES, QUOTE_MOVIE_IDS, make_quotes, stub_api_server
+
+
+class TestSecondaryIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.characterId: str = CHARACTER_IDS[1]
+        cls.movieId: str = QUOTE_MOVIE_IDS[2]
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def setUp(self):
+        self.quotes: list = make_quotes(count=245)
+        self.quote_store: dict = lotr_store_fp.create_document_store(
+            self.quotes, **lotr_api_fp.DATASET_INDEXES["quote"]
+        )
+        self.movie_store: dict = lotr_store_fp.create_document_store(
+            MOVIES, **lotr_api_fp.DATASET_INDEXES["movie"]
+        )
+        return super().setUp()
+
+    def assertSameResult(self, store: dict, docs: list, filter: str):
+        self.assertEqual(
+            lotr_filter_fp.apply_filter(lotr_store_fp.records(store), filter),
+            lotr_filter_fp.apply_filter(docs, filter),
+            filter,
+        )
+        return
+
+    def test_lookups(self):
+        positions: set = lotr_store_fp.index_lookup(self.quote_store, "character", [self.characterId])
+        self.assertEqual(positions, {i for i, quote in enumerate(self.quotes) if quote["character"] == self.characterId})
+        self.assertEqual(lotr_store_fp.index_lookup(self.quote_store, "id", [self.quotes[7]["_id"]]), {7})
+        self.assertEqual(lotr_store_fp.index_lookup(self.quote_store, "movie", ["0" * 24]), set())
+        self.assertIsNone(lotr_store_fp.index_lookup(self.quote_store, "dialog", ["Ring!"]))
+        budgets: set = lotr_store_fp.index_range(self.movie_store, "budgetInMillions", "<=", 94)
+        self.assertEqual(
+            sorted(MOVIES[position]["name"] for position in budgets),
+            ["The Fellowship of the Ring", "The Return of the King", "The Two Towers"],
+        )
+        self.assertIsNone(lotr_store_fp.index_range(self.movie_store, "name", ">", 1))
+        return
+
+    def test_same_results_as_scan(self):
+        for filter in (
+            f"character={self.characterId}",
+            f"movie={self.movieId}&character={self.characterId}&sort=dialog:asc&limit=5&page=2",
+            f"movie={QUOTE_MOVIE_IDS[0]},{QUOTE_MOVIE_IDS[1]}&dialog=/ring/i",
+            f"_id={self.quotes[3]['_id']}",
+            "movie=null",
+        ):
+            self.assertSameResult(self.quote_store, self.quotes, filter)
+        for filter in (
+            "budgetInMillions<100",
+            "runtimeInMinutes>=201&sort=runtimeInMinutes:desc",
+            "academyAwardWins<=0&rottenTomatoesScore>70",
+            "academyAwardWins=0,1&name!=The Hobbit Series",
+            "budgetInMillions>93.5&budgetInMillions<=94",
+            "budgetInMillions>abc",
+        ):
+            self.assertSameResult(self.movie_store, MOVIES, filter)
+        return
+
+    def test_incremental_refresh(self):
+        moved: dict = {**self.quotes[4], "movie": QUOTE_MOVIE_IDS[0], "dialog": "Moved to another movie!"}
+        self.quotes[4] = moved
+        self.assertEqual(lotr_store_fp.store_upsert(self.quote_store, moved), 4)
+        removed: dict = self.quotes.pop(10)
+        self.assertTrue(lotr_store_fp.store_remove(self.quote_store, removed["_id"]))
+        self.assertFalse(lotr_store_fp.store_remove(self.quote_store, removed["_id"]))
+        added: dict = {**removed, "_id": "6cd96e05de30eff6ebcce7e9", "id": "6cd96e05de30eff6ebcce7e9"}
+        self.quotes.append(added)
+        self.assertEqual(lotr_store_fp.store_upsert(self.quote_store, added), 245)
+
+        docs: lotr_store_fp.RecordList = lotr_store_fp.records(self.quote_store)
+        self.assertEqual(len(docs), 245)
+        self.assertEqual([dict(doc) for doc in docs], self.quotes)
+        for movie in QUOTE_MOVIE_IDS:
+            self.assertSameResult(self.quote_store, self.quotes, f"movie={movie}")
+        for character in CHARACTER_IDS:
+            self.assertSameResult(self.quote_store, self.quotes, f"character={character}&sort=dialog:desc")
+        self.assertIsNone(lotr_store_fp.find_position(self.quote_store, removed["_id"]))
+
+        movie: dict = {**MOVIES[0], "budgetInMillions": 1}
+        lotr_store_fp.store_upsert(self.movie_store, movie)
+        self.assertEqual(
+            lotr_filter_fp.apply_filter(lotr_store_fp.records(self.movie_store), "budgetInMillions<2")["docs"],
+            [movie],
+        )
+        return
+
+    def test_client_answers_from_indexes(self):
+        asyncio.run(main=self.case_client_answers_from_indexes())
+        return
+
+    async def case_client_answers_from_indexes(self):
+        async with stub_api_server(quote_count=245) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+                expected: dict = await client["aio_fetch_character_quote_by_id"](
+                    id=self.characterId, filter="limit=1000"
+                )
+                self.assertEqual(expected["total"], 61)
+                await client["aio_load_datasets"]()
+                requests: int = stub["state"]["requests"]
+                output: dict = await client["aio_fetch_character_quote_by_id"](
+                    id=self.characterId, filter="limit=1000"
+                )
+                self.assertEqual(output, expected)
+                output = await client["aio_fetch_movie_quote_by_id"](id=self.movieId, filter=None)
+                self.assertEqual(output["total"], 80)
+                output = await client["aio_fetch"](
+                    endpoint="movie", id=None, query=None, filter="academyAwardNominations>=13"
+                )
+                self.assertEqual([doc["name"] for doc in output["docs"]], [
+                    "The Lord of the Rings Series", "The Fellowship of the Ring"
+                ])
+                self.assertEqual(stub["state"]["requests"], requests)
+        return
@@ -0,0 +1,92 @@
+import asyncio
+import gc
+import sys
+from typing import Callable
+import unittest
+import warnings
+
+import api.lotr_api_fp as lotr_api_fp
+from tests.stub_api_server import stub_api_server, threaded_stub_api_server
+
+
+class TestSessionPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movieId: str = "5cd95395de30eff6ebccde5d"
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_connections_reused(self):
+        asyncio.run(main=self.case_connections_reused())
+        return
+
+    def test_context_manager_closes_session(self):
+        asyncio.run(main=self.case_context_manager_closes_session())
+        return
+
+    def test_sessions_closed_with_their_loop(self):
+        unraisable: list = []
+        hook: Callable = sys.unraisablehook
+        sys.unraisablehook = unraisable.append
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                with threaded_stub_api_server() as stub:
+                    pool: dict = lotr_api_fp.create_session_pool()
+                    client: dict = lotr_api_fp.create_api_client(
+                        api_key="test-key", base_url=stub["base_url"], session_pool=pool
+                    )
+                    sessions: list = []
+
+                    async def fetch() -> None:
+                        self.assertEqual((await client["aio_fetch_all_movies"]())["total"], 8)
+                        sessions.append(pool["sessions"][asyncio.get_running_loop()][0])
+                        return
+
+                    # Each asyncio.run() opens its own session, closed when its loop shuts down.
+                    asyncio.run(fetch())
+                    self.assertTrue(sessions[0].closed)
+                    asyncio.run(fetch())
+                    self.assertIsNot(sessions[1], sessions[0])
+                    self.assertTrue(sessions[1].closed)
+                    self.assertEqual(pool["sessions"], {})
+                    asyncio.run(client["aio_close"]())
+                    del sessions
+                    gc.collect()
+        finally:
+            sys.unraisablehook = hook
+        self.assertEqual([str(item.exc_value) for item in unraisable], [])
+        return
+
+    async def case_connections_reused(self):
+        async with stub_api_server() as stub:
+            client: dict = lotr_api_fp.create_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            )
+            for _ in range(5):
+                output: dict = await client["aio_fetch_movie_by_id"](
+                    id=self.movieId, query=None, filter=None
+                )
+                self.assertEqual(output["docs"][0]["name"], "The Return of the King")
+            await client["aio_close"]()
+            self.assertEqual(stub["state"]["requests"], 5)
+            self.assertEqual(len(stub["state"]["peers"]), 1)
+        return
+
+    async def case_context_manager_closes_session(self):
+        pool: dict = lotr_api_fp.create_session_pool(limit=4, limit_per_host=2)
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], session_pool=pool
+            ) as client:
+                results: list = await asyncio.gather(
+                    *[client["aio_fetch_all_movies"]() for _ in range(8)]
+                )
+                self.assertTrue(all(result["total"] == 8 for result in results))
+                session, _ = pool["sessions"][asyncio.get_running_loop()]
+                self.assertEqual(session.connector.limit, 4)
+                self.assertEqual(session.connector.limit_per_host, 2)
+            self.assertTrue(session.closed)
+            self.assertEqual(pool["sessions"], {})
+            self.assertLessEqual(len(stub["state"]["peers"]), 2)
+        return
@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+from tests.stub_api_server import stub_api_server
+
+
+class TestSingleFlight(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movieId: str = "5cd95395de30eff6ebccde5d"
+        cls.quoteId: str = "5cd96e05de30eff6ebcce7e9"
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_coalesced(self):
+        asyncio.run(main=self.case_coalesced())
+        return
+
+    def test_not_coalesced(self):
+        asyncio.run(main=self.case_not_coalesced())
+        return
+
+    def test_caller_after_last_one_left(self):
+        asyncio.run(main=self.case_caller_after_last_one_left())
+        return
+
+    async def case_coalesced(self):
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"]
+            ) as client:
+                tasks: list = [
+                    asyncio.create_task(
+                        client["aio_fetch_movie_by_id"](id=self.movieId, query=None, filter=None)
+                    )
+                    for _ in range(20)
+                ] + [
+                    asyncio.create_task(
+                        client["aio_fetch_quote_by_id"](id=self.quoteId, query=None, filter=None)
+                    )
+                    for _ in range(20)
+                ]
+                # A cancelled caller must not cancel the request shared with the others.
+                tasks[0].cancel()
+                results: list = await asyncio.gather(*tasks[1:])
+                again: dict = await client["aio_fetch_movie_by_id"](
+                    id=self.movieId, query=None, filter=None
+                )
+            self.assertTrue(all(result["total"] == 1 for result in results))
+            self.assertEqual(results[0]["docs"][0]["_id"], self.movieId)
+            self.assertEqual(results[-1]["docs"][0]["_id"], self.quoteId)
+            self.assertEqual(again, results[0])
+            self.assertEqual(stub["state"]["requests"], 3)
+        return
+
+    async def case_not_coalesced(self):
+        async with stub_api_server() as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], single_flight=False
+            ) as client:
+                await asyncio.gather(*[client["aio_fetch_all_movies"]() for _ in range(5)])
+            self.assertEqual(stub["state"]["requests"], 5)
+        return
+
+    async def case_caller_after_last_one_left(self):
+        calls: list = []
+
+        async def fetch(**kwargs) -> dict:
+            calls.append(kwargs)
+            await asyncio.sleep(0.01)
+            return {"total": len(calls)}
+
+        call = lotr_api_fp.__single_flight_api_call__(fetch)
+        first: asyncio.Task = asyncio.create_task(call(endpoint="movie"))
+        await asyncio.sleep(0)
+        # The only caller leaves: its request is cancelled, a new caller does not join it.
+        first.cancel()
+        await asyncio.sleep(0)
+        output: dict = await asyncio.wait_for(call(endpoint="movie"), timeout=1)
+        self.assertTrue(first.cancelled())
+        self.assertEqual(output, {"total": 2})
+        return
@@ -0,0 +1,109 @@
+import asyncio
+import time
+import unittest
+
+import api.lotr_api_fp as lotr_api_fp
+import api.lotr_deadline_fp as lotr_deadline_fp
+from tests.stub_api_server import stub_api_server, threaded_stub_api_server
+
+
+class TestTimeouts(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.movieId: str = "5cd95395de30eff6ebccde5d"
+        cls.maxDiff = None
+        return super().setUpClass()
+
+    def test_request_timeout(self):
+        asyncio.run(main=self.case_request_timeout())
+        return
+
+    def test_deadline_budget(self):
+        asyncio.run(main=self.case_deadline_budget())
+        return
+
+    def test_cancellation_releases_connection(self):
+        asyncio.run(main=self.case_cancellation_releases_connection())
+        return
+
+    def test_blocking_timeout(self):
+        with threaded_stub_api_server(latency=0.5) as stub:
+            with lotr_api_fp.api_client(
+                api_key="test-key",
+                base_url=stub["base_url"],
+                timeout=lotr_deadline_fp.create_timeout(total=0.1),
+            ) as client:
+                start: float = time.monotonic()
+                output: dict = client["fetch"](endpoint="movie")
+                self.assertIn("error", output)
+                self.assertLess(time.monotonic() - start, 0.4)
+                stub["state"]["latency"] = 0
+                with lotr_deadline_fp.deadline(1.0):
+                    self.assertEqual(client["fetch"](endpoint="movie")["total"], 8)
+                with lotr_deadline_fp.deadline(0):
+                    self.assertEqual(client["fetch"](endpoint="movie"), {"error": "Deadline exceeded"})
+        return
+
+    async def case_request_timeout(self):
+        # A single pooled connection: a timed out request must give it back.
+        pool: dict = lotr_api_fp.create_session_pool(limit=1)
+        async with stub_api_server(latency=0.5) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key",
+                base_url=stub["base_url"],
+                session_pool=pool,
+                timeout=lotr_deadline_fp.create_timeout(total=0.1),
+            ) as client:
+                start: float = time.monotonic()
+                outputs: list = await asyncio.gather(
+                    client["aio_fetch_movie_by_id"](id=self.movieId, query=None, filter=None),
+                    client["aio_fetch_all_movies"](),
+                )
+                self.assertLess(time.monotonic() - start, 0.45)
+                self.assertTrue(all("error" in output for output in outputs))
+                stub["state"]["latency"] = 0
+                output: dict = await client["aio_fetch_all_movies"]()
+                self.assertEqual(output["total"], 8)
+        return
+
+    async def case_deadline_budget(self):
+        async with stub_api_server(quote_count=40, latency=0.05) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], batch_concurrency=2
+            ) as client:
+                ids: list = [quote["_id"] for quote in stub["state"]["quotes"][:20]]
+                start: float = time.monotonic()
+                # 20 calls, 2 at once, 50ms each would take 0.5s: the budget cuts the batch short.
+                with lotr_deadline_fp.deadline(0.2):
+                    docs: list = await client["aio_fetch_quotes_by_ids"](ids)
+                self.assertLess(time.monotonic() - start, 0.35)
+                self.assertIsNotNone(docs[0])
+                self.assertEqual(docs[-1], {"error": "Timed out"})
+                self.assertIsNone(lotr_deadline_fp.remaining())
+
+                # The crawl shares the budget of the block it runs in.
+                with lotr_deadline_fp.deadline(5.0):
+                    with lotr_deadline_fp.deadline(0.12) as at:
+                        self.assertLessEqual(at, time.monotonic() + 0.12)
+                        with self.assertRaises(RuntimeError):
+                            async for _ in client["aio_iter_all_quotes"](page_size=5, window=1):
+                                pass
+                    self.assertGreater(lotr_deadline_fp.remaining(), 4.0)
+        return
+
+    async def case_cancellation_releases_connection(self):
+        pool: dict = lotr_api_fp.create_session_pool(limit=1)
+        async with stub_api_server(latency=0.5) as stub:
+            async with lotr_api_fp.aio_api_client(
+                api_key="test-key", base_url=stub["base_url"], session_pool=pool
+            ) as client:
+                task: asyncio.Task = asyncio.ensure_future(client["aio_fetch_all_movies"]())
+                await asyncio.sleep(0.1)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+                stub["state"]["latency"] = 0
+                with lotr_deadline_fp.deadline(0.5):
+                    output: dict = await client["aio_fetch_all_movies"]()
+                self.assertEqual(output["total"], 8)
+        return